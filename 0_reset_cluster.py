@@ -1,6 +1,7 @@
 # File: ./0_reset_cluster.py
 # Run this to delete the workshop data, if you have any, and start from scratch
 from helpers import CollectionName, connect_to_weaviate
+from time_partitions import clear_retention_cutoff
 
 
 # Connect to Weaviate
@@ -8,5 +9,7 @@ client = connect_to_weaviate()  # Uses `weaviate.connect_to_local` under the hoo
 
 # Delete existing collection if it exists
 client.collections.delete(CollectionName.SUPPORTCHAT)
+# And the retention cutoff of its time buckets, which would hide the buckets of a new import
+clear_retention_cutoff(CollectionName.SUPPORTCHAT)
 
 client.close()
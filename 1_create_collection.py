@@ -1,6 +1,9 @@
 # File: ./1_create_collection.py
 from weaviate.classes.config import Property, DataType, Configure
 from helpers import CollectionName, connect_to_weaviate
+from capacity_planner import PROFILES
+from time_partitions import clear_retention_cutoff
+import os
 
 
 # Connect to Weaviate
@@ -8,13 +11,26 @@ client = connect_to_weaviate()  # Uses `weaviate.connect_to_local` under the hoo
 
 # Delete existing collection if it exists
 client.collections.delete(CollectionName.SUPPORTCHAT)
+# And the retention cutoff of its time buckets, which would hide the buckets of a new import
+clear_retention_cutoff(CollectionName.SUPPORTCHAT)
 
-# Try different vector index configurations and see how they affect the speed, memory usage & recall
-default_vindex_config = Configure.VectorIndex.hnsw(
-    # quantizer=Configure.VectorIndex.Quantizer.bq()
-    # quantizer=Configure.VectorIndex.Quantizer.sq(training_limit=25000)
-    # quantizer=Configure.VectorIndex.Quantizer.pq(training_limit=25000)
-)
+# Try different vector index profiles (e.g. `INDEX_PROFILE=bq`) and see how they affect the speed, memory usage & recall.
+# `python capacity_planner.py plan` estimates the memory each one needs, and recommends one that fits
+index_profile = PROFILES[os.environ.get("INDEX_PROFILE", "default")]
+default_vindex_config = index_profile.vector_index_config()
+print(f"Using the {index_profile.name} index profile: {index_profile.description}")
+
+# `COLLECTION_LAYOUT=company-partitioned` gives each high-volume company a tenant (and HNSW graph) of its own,
+# with a catch-all tenant for the rest, so company-scoped searches don't need a filter.
+# Import with `python 2_add_data_with_vectors.py --partitioned`; `helpers.partitioned_query` routes the searches.
+# `COLLECTION_LAYOUT=time-partitioned` stores each month or quarter of `created_at` in its own tenant instead.
+# Import with `--time-partitioned month`; see `time_partitions.py` for the query router & retention
+layout = os.environ.get("COLLECTION_LAYOUT", "filtered")
+if layout not in ("filtered", "company-partitioned", "time-partitioned"):
+    raise ValueError(
+        f"Unknown COLLECTION_LAYOUT {layout!r}; use 'filtered', 'company-partitioned' or 'time-partitioned'"
+    )
+print(f"Using the {layout} layout")
 
 # Create a new collection with specified properties and vectorizer configuration
 chunks = client.collections.create(
@@ -70,9 +86,13 @@ chunks = client.collections.create(
     ],
     generative_config=Configure.Generative.cohere(model="command-r"),
     # END_Provider
+    # Tenants are created by the importer
+    multi_tenancy_config=(
+        Configure.multi_tenancy(enabled=True) if layout != "filtered" else None
+    ),
     #
     # ================================================================================
-    # Uncomment this section to enable multi-tenancy
+    # Uncomment this section (instead of the one above) to enable multi-tenancy
     # ================================================================================
     # multi_tenancy_config=Configure.multi_tenancy(
     #     enabled=True,
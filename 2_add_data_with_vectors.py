@@ -1,70 +1,105 @@
-from helpers import CollectionName, connect_to_weaviate
-import h5py
-import json
-from tqdm import tqdm
-import numpy as np
-
-
-tenant_names = ["AcmeCo", "Globex", "Initech", "UmbrellaCorp", "WayneEnterprises"]
-
-
-def import_from_hdf5(file_path: str):
-    # Connect to Weaviate
-
-    with connect_to_weaviate() as client:
-
-        collection = client.collections.get(CollectionName.SUPPORTCHAT)
-
-        if collection.config.get().multi_tenancy_config.enabled:
-            use_multi_tenancy = True
-        else:
-            use_multi_tenancy = False
-
-        # Open the HDF5 file
-        with h5py.File(file_path, "r") as hf:
-            # Get the total number of objects for the progress bar
-            total_objects = len(hf.keys())
-
-            # Use batch import for efficiency
-            with client.batch.fixed_size(batch_size=200) as batch:
-                for uuid in tqdm(
-                    hf.keys(), total=total_objects, desc="Importing objects"
-                ):
-                    group = hf[uuid]
-
-                    # Get the object properties
-                    properties = json.loads(group["object"][()])
-
-                    # Get the vector(s)
-                    vectors = {}
-                    for key in group.keys():
-                        if key.startswith("vector_"):
-                            vector_name = key.split("_", 1)[1]
-                            vectors[vector_name] = np.asarray(group[key])
-
-                    # If using multi-tenancy, assign a tenant (arbitrarily based on the company author length)
-                    if use_multi_tenancy:
-                        tenant_index = len(properties['company_author']) % 5
-                        tenant = tenant_names[tenant_index]
-                    else:
-                        tenant = None
-
-                    # Add the object to the batch
-                    batch.add_object(
-                        collection=CollectionName.SUPPORTCHAT,
-                        uuid=uuid,
-                        properties=properties,
-                        vector={"text_with_metadata": vectors["text_with_metadata"]},
-                        tenant=tenant,
-                    )
-
-    print(f"Import completed. {total_objects} objects imported.")
-    if len(client.batch.failed_objects) > 0:
-        print("*" * 80)
-        print(f"***** Failed to add {len(client.batch.failed_objects)} objects *****")
-        print("*" * 80)
-        print(client.batch.failed_objects[:3])
+from pathlib import Path
+
+import click
+from checkpoints import state_dir_for
+from ingest import collection_is_partitioned, collection_uses_multi_tenancy, parallel_import, retry_dead_letters
+from tenant_import import (
+    DEFAULT_PARTITION_MIN_OBJECTS,
+    TENANT_FUNCTIONS,
+    partitioned_import,
+    tenant_import,
+    tenant_state_dir_for,
+    time_partitioned_import,
+)
+
+
+def import_from_hdf5(file_path: str, workers: int = 1, resume: bool = False, adaptive: bool = False):
+    # Each worker opens its own Weaviate connection & batcher, and imports a range of the file
+    summary = parallel_import(file_path, workers=workers, resume=resume, adaptive=adaptive)
+    summary.print()
+    return summary
+
+
+@click.command()
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    help="Number of import processes. Use more to keep a multi-node cluster busy.",
+)
+@click.option("--resume", is_flag=True, help="Skip objects committed by an earlier, interrupted run.")
+@click.option("--retry-dead-letters", "retry_dead_letters_only", is_flag=True, help="Only replay the objects that failed in earlier runs.")
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Tune batch size & concurrency from batch latency, errors and indexing queues.",
+)
+@click.option("--file-path", default=None, help="Import another export file, e.g. a compacted delta export base.")
+@click.option(
+    "--per-tenant",
+    is_flag=True,
+    help="Multi-tenancy: create all tenants up front and send each tenant's objects in their own batches.",
+)
+@click.option(
+    "--tenancy",
+    type=click.Choice(list(TENANT_FUNCTIONS)),
+    default="author-length",
+    show_default=True,
+    help="How objects are assigned to tenants with --per-tenant.",
+)
+@click.option(
+    "--partitioned",
+    is_flag=True,
+    help="Multi-tenancy: one tenant per high-volume company, and a catch-all tenant for the rest.",
+)
+@click.option(
+    "--partition-min-objects",
+    default=DEFAULT_PARTITION_MIN_OBJECTS,
+    show_default=True,
+    help="Objects a company needs for a partition of its own, with --partitioned.",
+)
+@click.option(
+    "--time-partitioned",
+    type=click.Choice(["month", "quarter"]),
+    default=None,
+    help="Multi-tenancy: one tenant per month or quarter of created_at.",
+)
+def main(workers, resume, retry_dead_letters_only, adaptive, file_path, per_tenant, tenancy, partitioned, partition_min_objects, time_partitioned):
+    if resume and (per_tenant or partitioned or time_partitioned):
+        raise click.UsageError("--resume isn't supported with --per-tenant, --partitioned or --time-partitioned.")
+    if retry_dead_letters_only:
+        retry_dead_letters(state_dir_for(file_path or "data/twitter_customer_support.h5"))
+        tenant_state_dir = tenant_state_dir_for(file_path or "data/twitter_customer_support.h5")
+        if Path(tenant_state_dir).is_dir():
+            retry_dead_letters(tenant_state_dir)
+    elif partitioned:
+        if not collection_uses_multi_tenancy():
+            raise click.UsageError("--partitioned needs a collection with multi-tenancy enabled.")
+        summary = partitioned_import(
+            file_path or "data/twitter_customer_support.h5", partition_min_objects, workers=workers
+        )
+        summary.print()
+    elif time_partitioned:
+        if not collection_uses_multi_tenancy():
+            raise click.UsageError("--time-partitioned needs a collection with multi-tenancy enabled.")
+        summary = time_partitioned_import(
+            file_path or "data/twitter_customer_support.h5", time_partitioned, workers=workers
+        )
+        summary.print()
+    elif per_tenant:
+        if not collection_uses_multi_tenancy():
+            raise click.UsageError("--per-tenant needs a collection with multi-tenancy enabled.")
+        summary = tenant_import(
+            file_path or "data/twitter_customer_support.h5", TENANT_FUNCTIONS[tenancy], workers=workers
+        )
+        summary.print()
+    elif collection_is_partitioned():
+        raise click.UsageError("The collection is partitioned; import into it with --partitioned or --time-partitioned.")
+    else:
+        import_from_hdf5(
+            file_path or "data/twitter_customer_support.h5", workers=workers, resume=resume, adaptive=adaptive
+        )
 
 
 if __name__ == "__main__":
-    import_from_hdf5("data/twitter_customer_support.h5")
+    main()
@@ -0,0 +1,262 @@
+"""Feedback-driven batch settings for imports (additive increase, multiplicative decrease).
+
+Fixed settings (`fixed_size(batch_size=200)`, `rate_limit(requests_per_minute=4800)`)
+are either too cautious for a healthy cluster or too aggressive for a struggling one.
+The controller instead picks the settings for each batch context (each slab) from what
+happened during the previous one:
+
+- objects rejected with a 429 / rate-limit message, or more than `max_error_rate`
+  failures: cut batch size, concurrency & rate by `decrease_factor`;
+- request latency well above the best seen so far, or a node's async indexing queue
+  over `max_queue_length` and still growing (see `cluster.nodes(output="verbose")`):
+  cut them by the gentler `soft_decrease_factor`;
+- otherwise, grow them by one step. If throughput drops after an increase, the
+  increase is undone and the controller holds for `cooldown_windows` before probing
+  again.
+
+Every decision is logged, and `best` is the setting with the highest throughput seen.
+
+    controller = AdaptiveBatchController(queue_length=node_queue_length(client))
+    for slab in slabs:
+        t0 = time.perf_counter()
+        with controller.batch(client.batch) as batch:
+            ...
+        controller.observe(len(slab), client.batch.failed_objects, time.perf_counter() - t0)
+"""
+
+from dataclasses import dataclass, replace
+from typing import Callable, List, Literal, Optional, Sequence
+import time
+
+from tqdm import tqdm
+
+from helpers import CollectionName
+
+
+BatchMode = Literal["fixed_size", "rate_limit"]
+
+THROTTLE_MARKERS = ("429", "rate limit", "too many requests")
+
+
+@dataclass
+class BatchSettings:
+    batch_size: int = 200
+    concurrent_requests: int = 2
+    requests_per_minute: int = 4800
+
+    def describe(self, mode: BatchMode) -> str:
+        if mode == "rate_limit":
+            return f"{self.requests_per_minute} requests/min"
+        return f"batch_size={self.batch_size}, concurrent_requests={self.concurrent_requests}"
+
+
+@dataclass
+class AdaptiveLimits:
+    min_batch_size: int = 50
+    max_batch_size: int = 2000
+    batch_size_step: int = 100
+    min_concurrency: int = 1
+    max_concurrency: int = 8
+    min_requests_per_minute: int = 600
+    max_requests_per_minute: int = 60_000
+    requests_per_minute_step: int = 1200
+    decrease_factor: float = 0.5
+    soft_decrease_factor: float = 0.75
+    max_error_rate: float = 0.01
+    latency_factor: float = 2.0
+    max_queue_length: int = 50_000
+    throughput_tolerance: float = 0.1
+    cooldown_windows: int = 3
+
+
+@dataclass
+class Decision:
+    window: int
+    action: Literal["increase", "decrease", "revert", "hold"]
+    reason: str
+    settings: BatchSettings
+    objects_per_second: float
+    queue_length: Optional[int]
+
+
+def is_throttled(message: str) -> bool:
+    message = message.lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def node_queue_length(
+    client, collection_name: str = CollectionName.SUPPORTCHAT, min_interval: float = 5.0
+) -> Callable[[], Optional[int]]:
+    """A sampler for the longest per-node vector indexing queue, polled at most every `min_interval`s.
+
+    The longest queue rather than the total, so that one slow node is enough to back off.
+    """
+    last = {"at": 0.0, "value": None}
+
+    def sample() -> Optional[int]:
+        now = time.monotonic()
+        if now - last["at"] >= min_interval:
+            last["at"] = now
+            try:
+                nodes = client.cluster.nodes(collection=collection_name, output="verbose")
+                last["value"] = max(
+                    (sum(s.vector_queue_length for s in n.shards or []) for n in nodes), default=0
+                )
+            except Exception:
+                # Keep the last value; a failed poll is not a reason to change the settings
+                pass
+        return last["value"]
+
+    return sample
+
+
+class AdaptiveBatchController:
+    def __init__(
+        self,
+        initial: Optional[BatchSettings] = None,
+        limits: Optional[AdaptiveLimits] = None,
+        mode: BatchMode = "fixed_size",
+        queue_length: Optional[Callable[[], Optional[int]]] = None,
+        name: str = "adaptive",
+        log: Optional[Callable[[str], None]] = tqdm.write,
+    ):
+        self.settings = initial or BatchSettings()
+        self.limits = limits or AdaptiveLimits()
+        self.mode = mode
+        self.queue_length = queue_length
+        self.name = name
+        self.log = log
+        self.decisions: List[Decision] = []
+
+        self.best: Optional[BatchSettings] = None
+        self.best_objects_per_second = 0.0
+        self._baseline_latency: Optional[float] = None
+        self._previous_queue: Optional[int] = None
+        self._previous_objects_per_second: Optional[float] = None
+        self._before_increase: Optional[BatchSettings] = None
+        self._cooldown = 0
+
+    def batch(self, batcher):
+        """Open a batch context on `client.batch` (or `collection.batch`) with the current settings."""
+        if self.mode == "rate_limit":
+            return batcher.rate_limit(requests_per_minute=self.settings.requests_per_minute)
+        return batcher.fixed_size(
+            batch_size=self.settings.batch_size,
+            concurrent_requests=self.settings.concurrent_requests,
+        )
+
+    def _latency_per_object(self, n_objects: int, seconds: float) -> float:
+        # Each in-flight request waits this long per object it carries
+        return seconds * self.settings.concurrent_requests / n_objects
+
+    def _scaled(self, factor: float) -> BatchSettings:
+        lim = self.limits
+        return BatchSettings(
+            batch_size=max(lim.min_batch_size, int(self.settings.batch_size * factor)),
+            concurrent_requests=max(lim.min_concurrency, int(self.settings.concurrent_requests * factor)),
+            requests_per_minute=max(lim.min_requests_per_minute, int(self.settings.requests_per_minute * factor)),
+        )
+
+    def _increased(self) -> BatchSettings:
+        lim, s = self.limits, self.settings
+        if self.mode == "rate_limit":
+            rpm = s.requests_per_minute + lim.requests_per_minute_step
+            return replace(s, requests_per_minute=min(lim.max_requests_per_minute, rpm))
+        # Bigger batches first (cheaper per object), then more requests in flight
+        if s.batch_size < lim.max_batch_size:
+            return replace(s, batch_size=min(lim.max_batch_size, s.batch_size + lim.batch_size_step))
+        return replace(s, concurrent_requests=min(lim.max_concurrency, s.concurrent_requests + 1))
+
+    def _congestion(self, n_objects: int, failed: Sequence, seconds: float, queue: Optional[int]):
+        """(factor, reason) if the last window shows congestion, else None."""
+        lim = self.limits
+        throttled = sum(1 for f in failed if is_throttled(str(f.message)))
+        if throttled:
+            return lim.decrease_factor, f"{throttled} throttled (429) objects"
+        if failed and len(failed) / n_objects > lim.max_error_rate:
+            return lim.decrease_factor, f"error rate {len(failed) / n_objects:.1%}"
+
+        growing = self._previous_queue is None or (queue or 0) > self._previous_queue
+        if queue is not None and queue > lim.max_queue_length and growing:
+            return lim.soft_decrease_factor, f"indexing queue growing ({queue})"
+
+        if self.mode == "fixed_size":
+            latency = self._latency_per_object(n_objects, seconds)
+            if self._baseline_latency is not None and latency > lim.latency_factor * self._baseline_latency:
+                return (
+                    lim.soft_decrease_factor,
+                    f"latency {1000 * latency:.1f} ms/object vs {1000 * self._baseline_latency:.1f} ms baseline",
+                )
+        return None
+
+    def observe(self, n_objects: int, failed: Sequence, seconds: float) -> Decision:
+        """Record one batch context (`n_objects` sent in `seconds`, `failed` error objects) and pick the next settings."""
+        objects_per_second = (n_objects - len(failed)) / seconds if seconds > 0 else 0.0
+        queue = self.queue_length() if self.queue_length is not None else None
+        previous = self._previous_objects_per_second
+        empty = n_objects == 0 or seconds <= 0
+        congestion = None if empty else self._congestion(n_objects, failed, seconds, queue)
+
+        if empty:
+            action, reason, settings = "hold", "empty window", self.settings
+        elif congestion is not None:
+            factor, reason = congestion
+            action, settings = "decrease", self._scaled(factor)
+            self._before_increase = None
+            self._cooldown = self.limits.cooldown_windows
+        elif (
+            self._before_increase is not None
+            and previous is not None
+            and objects_per_second < (1 - self.limits.throughput_tolerance) * previous
+        ):
+            action, settings = "revert", self._before_increase
+            reason = f"throughput fell to {objects_per_second:.0f}/s from {previous:.0f}/s"
+            self._before_increase = None
+            self._cooldown = self.limits.cooldown_windows
+        elif self._cooldown > 0:
+            self._cooldown -= 1
+            action, reason, settings = "hold", "cooling down", self.settings
+            self._before_increase = None
+        else:
+            settings = self._increased()
+            if settings == self.settings:
+                action, reason = "hold", "at the upper limits"
+            else:
+                action, reason = "increase", "no congestion"
+            self._before_increase = self.settings if action == "increase" else None
+
+        if not empty and not failed:
+            if objects_per_second > self.best_objects_per_second:
+                self.best, self.best_objects_per_second = self.settings, objects_per_second
+            if self.mode == "fixed_size":
+                latency = self._latency_per_object(n_objects, seconds)
+                self._baseline_latency = min(latency, self._baseline_latency or latency)
+
+        decision = Decision(
+            window=len(self.decisions),
+            action=action,
+            reason=reason,
+            settings=settings,
+            objects_per_second=objects_per_second,
+            queue_length=queue,
+        )
+        self.decisions.append(decision)
+        if self.log is not None and action != "hold":
+            self.log(
+                f"[{self.name}] {objects_per_second:.0f} objects/s"
+                + (f", queue {queue}" if queue is not None else "")
+                + f": {action} to {settings.describe(self.mode)} ({reason})"
+            )
+
+        self.settings = settings
+        self._previous_queue = queue
+        self._previous_objects_per_second = objects_per_second
+        return decision
+
+    def summary(self) -> str:
+        if self.best is None:
+            return f"[{self.name}] no successful batches yet"
+        return (
+            f"[{self.name}] best {self.best_objects_per_second:.0f} objects/s at {self.best.describe(self.mode)}; "
+            f"ended at {self.settings.describe(self.mode)} after {len(self.decisions)} batches"
+        )
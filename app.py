@@ -4,22 +4,37 @@ import streamlit as st
 from helpers import (
     CollectionName,
     STREAMLIT_STYLING,
-    connect_to_weaviate,
+    get_partitions,
     get_top_companies,
+    partitioned_query,
+    partitioned_top_companies,
     weaviate_query,
-    get_pprof_results,
+    query_cache,
 )
 import plotly.graph_objs as go
-from datetime import datetime
-import time
-import re
+from datetime import datetime, timedelta, timezone
+from dataclasses import asdict
+from functools import partial
 from random import randint
+from client_pool import get_pool
+from telemetry import get_sampler
+from tenant_lifecycle import get_lifecycle_manager
+from import_stats import get_stats_store
+from time_partitions import get_time_partitions, time_partitioned_query
+import helpers
 
 st.set_page_config(page_title="Gen AI: Prototyping to Production", layout="wide")
 
 st.markdown(STREAMLIT_STYLING, unsafe_allow_html=True)
 
-with connect_to_weaviate() as client:
+# Clients are shared by all sessions & fragments, and are not closed at the end of a rerun
+client_pool = get_pool()
+# One background thread per process samples the cluster stats for all sessions
+telemetry = get_sampler(CollectionName.SUPPORTCHAT)
+# Dataset statistics written by the importers, reconciled with the cluster in the background
+dataset_stats = get_stats_store(CollectionName.SUPPORTCHAT)
+
+with client_pool.client() as client:
     st.markdown(
         "<div class='stHeader'><h1>Gen AI: Prototyping to Production</h1><h4>🤖 SupportBuddy AI</h4></div>",
         unsafe_allow_html=True,
@@ -30,19 +45,50 @@ with connect_to_weaviate() as client:
 
     config = collection.config.get()
     mt_enabled = config.multi_tenancy_config.enabled
+    # Company-partitioned layout: searches are routed to the companies' tenants, not to a selected one
+    partitions = get_partitions(collection) if mt_enabled else None
+    query_fn = partitioned_query if partitions is not None else weaviate_query
+    # Time-partitioned layout: searches go to the `created_at` buckets in the selected date range
+    time_layout = get_time_partitions(collection) if mt_enabled and partitions is None else None
+    if time_layout is not None:
+        query_fn = time_partitioned_query
+    # Idle tenants are deactivated in the background, and reactivated when queried
+    lifecycle = get_lifecycle_manager(collection_name) if mt_enabled else None
+    helpers.tenant_access_hook = lifecycle.on_access if lifecycle is not None else None
 
     # Create two main columns
     col1, col2 = st.columns([2, 1], gap="large")
 
     with col1:
-        if mt_enabled:
+        if partitions is not None:
+            tenant = None
+            collection_tenant = collection
+            st.caption(
+                f"Company-partitioned: {len(partitions.tenants)} companies have a partition of their own"
+            )
+        elif time_layout is not None:
+            tenant = None
+            collection_tenant = collection
+            st.caption(f"Time-partitioned: {len(time_layout.buckets)} buckets")
+        elif mt_enabled:
             tenants = sorted(collection.tenants.get().keys())
             tenant = st.selectbox("Select tenant", tenants)
 
             collection_tenant = collection.with_tenant(tenant)
-            top_companies = get_top_companies(collection_tenant, 10, recalculate_stats=True, save_outputs=False)
         else:
+            tenant = None
             collection_tenant = collection
+        if partitions is not None:
+            scope_stats = None
+            top_companies = partitioned_top_companies(collection, 10)
+        elif time_layout is not None:
+            scope_stats = None
+            top_companies = partitioned_top_companies(collection, 10, list(time_layout.prune()))
+        else:
+            scope_stats = dataset_stats.get(tenant)
+            top_companies = dataset_stats.top_companies(tenant, 10)
+        if top_companies is None:
+            # No import statistics for this collection/tenant; aggregate instead
             top_companies = get_top_companies(collection_tenant, 10)
 
         # ===== Search inputs =====
@@ -65,13 +111,28 @@ with connect_to_weaviate() as client:
                 horizontal=True,
                 index=0,
             )
+            if time_layout is not None and time_layout.buckets:
+                first = time_layout.buckets[0].start.date()
+                last = time_layout.buckets[-1].end.date() - timedelta(days=1)
+                created_range = st.date_input(
+                    "Created between", value=(first, last), min_value=first, max_value=last
+                )
+                # Only a complete range prunes the buckets; while picking, search all of them
+                if len(created_range) == 2:
+                    query_fn = partial(
+                        time_partitioned_query,
+                        created_after=datetime.combine(created_range[0], datetime.min.time(), timezone.utc),
+                        created_before=datetime.combine(
+                            created_range[1] + timedelta(days=1), datetime.min.time(), timezone.utc
+                        ),
+                    )
 
         # ===== Search and display results =====
 
         st.markdown("**Results**")
 
         with st.container(height=250):
-            search_response = weaviate_query(
+            search_response = query_fn(
                 collection_tenant, query, company_filter, limit, search_type
             )
 
@@ -99,7 +160,7 @@ with connect_to_weaviate() as client:
 
             if st.button("Generate response"):
                 with st.spinner("Generating response..."):
-                    search_response = weaviate_query(
+                    search_response = query_fn(
                         collection_tenant, query, company_filter, limit, search_type, rag_query
                     )
 
@@ -116,78 +177,95 @@ with connect_to_weaviate() as client:
 
         with st.expander("Cluster statistics", expanded=True):
 
+            # Fragments only read the shared sampler's buffers; they don't query the cluster
             with st.container(border=True):
-                @st.fragment(run_every=2)
+                @st.fragment(run_every=telemetry.interval)
                 def update_cluster_stats():
-                    with connect_to_weaviate() as stats_client:
-                        stats_collection = stats_client.collections.get(collection_name)
-                        if mt_enabled:
-                            tenants = stats_collection.tenants.get()
-                            st.metric(label="Tenant count", value=len(tenants))
-                        else:
-                            obj_count = stats_collection.aggregate.over_all(total_count=True).total_count
-                            st.metric(label="Object count", value=obj_count)
-                    time.sleep(2)
+                    sample = telemetry.latest()
+                    if sample is None and scope_stats is not None:
+                        st.metric(
+                            label="Object count",
+                            value=scope_stats.objects,
+                            help="From the import statistics, until the first cluster sample arrives",
+                        )
+                    elif sample is None:
+                        st.caption("Waiting for the first sample...")
+                    elif mt_enabled:
+                        st.metric(label="Tenant count", value=sample.tenant_count)
+                    else:
+                        st.metric(label="Object count", value=sample.object_count)
+
+                    if sample is not None and sample.nodes is not None:
+                        st.metric(
+                            label="Nodes",
+                            value=len(sample.nodes),
+                            help=", ".join(f"{n.name}: {n.status}" for n in sample.nodes),
+                        )
+                    if sample is not None and sample.shards:
+                        st.metric(
+                            label="Vector indexing queue",
+                            value=sample.queue_length,
+                            help=f"Across {len(sample.shards)} shards",
+                        )
+                        with st.expander("Shards"):
+                            st.dataframe(
+                                [asdict(s) for s in sample.shards],
+                                hide_index=True,
+                                use_container_width=True,
+                            )
 
                 update_cluster_stats()
 
             with st.container(border=True):
-                node_data = client.cluster.nodes(output="verbose")
-                st.metric(label="Nodes", value=len(node_data))
+                conn_stats = client_pool.stats
+                st.metric(
+                    label="Connections opened",
+                    value=conn_stats.connections_opened,
+                    help=f"Mean setup time {conn_stats.mean_connect_ms:.0f} ms, "
+                    f"{conn_stats.reconnects} reconnects, {conn_stats.checkouts} checkouts",
+                )
+
+            with st.container(border=True):
+                cache_stats = query_cache.stats
+                st.metric(
+                    label="Query cache hit rate",
+                    value=f"{cache_stats.hit_rate:.0%}",
+                    help=f"{cache_stats.hits} hits, {cache_stats.misses} misses, "
+                    f"{cache_stats.evictions} evictions, {cache_stats.invalidations} invalidated",
+                )
+
+            if lifecycle is not None:
+                with st.container(border=True):
+                    lifecycle_stats = lifecycle.stats
+                    st.metric(
+                        label="Active tenants",
+                        value=len(lifecycle.active_tenants()),
+                        help=f"Hit rate {lifecycle_stats.hit_rate:.0%}, "
+                        f"{lifecycle_stats.activations} activations "
+                        f"(mean {lifecycle_stats.mean_activation_ms:.0f} ms, "
+                        f"max {1000 * lifecycle_stats.max_activation_seconds:.0f} ms), "
+                        f"{lifecycle_stats.deactivations} deactivations",
+                    )
 
             # with st.container(border=True):
-            #     result = get_pprof_results()
-
-            #     if result.returncode == 0:
-            #         match = re.search(
-            #             r"Showing nodes accounting for (\d+\.?\d*)MB, (\d+\.?\d*)% of (\d+\.?\d*)MB total",
-            #             result.stdout,
-            #         )
-            #         if match:
-            #             total_mb = float(match.group(3))
-            #             st.metric(label="Memory usage", value=f"{total_mb:.1f} MB")
+            #     sample = telemetry.latest()
+
+            #     if sample is not None and sample.memory_mb is not None:
+            #         st.metric(label="Memory usage", value=f"{sample.memory_mb:.1f} MB")
             #     else:
-            #         st.error("Error running pprof")
+            #         st.error("Error reading the heap profile")
 
             with st.container(border=True):
 
-                @st.fragment(run_every=2)
+                @st.fragment(run_every=telemetry.interval)
                 def update_memory_chart():
-                    # Initialize data for the plot
-                    if "memory_data" not in st.session_state:
-                        st.session_state.memory_data = {"time": [], "usage": []}
-
-                    # Function to update memory data
-                    def update_memory_data():
-                        result = get_pprof_results()
-                        if result.returncode == 0:
-                            match = re.search(
-                                r"Showing nodes accounting for (\d+\.?\d*)MB, (\d+\.?\d*)% of (\d+\.?\d*)MB total",
-                                result.stdout,
-                            )
-                            if match:
-                                total_mb = float(match.group(3))
-                                current_time = datetime.now().strftime("%H:%M:%S")
-                                st.session_state.memory_data["time"].append(current_time)
-                                st.session_state.memory_data["usage"].append(total_mb)
-
-                                # Keep only the last 50 data points
-                                if len(st.session_state.memory_data["time"]) > 50:
-                                    st.session_state.memory_data[
-                                        "time"
-                                    ] = st.session_state.memory_data["time"][-50:]
-                                    st.session_state.memory_data[
-                                        "usage"
-                                    ] = st.session_state.memory_data["usage"][-50:]
-
-                    # Update memory data
-                    update_memory_data()
+                    times, usage = telemetry.series("memory_mb")
 
                     # Create and display the plot
                     fig = go.Figure(
                         data=go.Scatter(
-                            x=st.session_state.memory_data["time"],
-                            y=st.session_state.memory_data["usage"],
+                            x=[datetime.fromtimestamp(t).strftime("%H:%M:%S") for t in times],
+                            y=usage,
                             mode="lines+markers",
                         ),
                     )
@@ -207,11 +285,26 @@ with connect_to_weaviate() as client:
                         fig, use_container_width=True, config={"displayModeBar": False}
                     )
 
-                    # Rerun this fragment after a delay
-                    time.sleep(2)
-
                 update_memory_chart()
 
+        if scope_stats is not None and scope_stats.objects > 0:
+            with st.expander("Dataset statistics"):
+                st.metric(
+                    label="Mean text length",
+                    value=f"{scope_stats.mean_text_length:.0f} chars",
+                    help=f"Longest {scope_stats.text_length_max} chars. Reconciled with the cluster at "
+                    f"{scope_stats.reconciled_at}" if scope_stats.reconciled_at else "From the import statistics",
+                )
+                months = sorted(scope_stats.created_at_months.items())
+                fig = go.Figure(data=go.Bar(x=[m for m, _ in months], y=[n for _, n in months]))
+                fig.update_layout(title="Messages per month", height=250, margin=dict(l=50, r=10, t=30, b=30))
+                st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+
+                lengths = scope_stats.text_length_histogram()
+                fig = go.Figure(data=go.Bar(x=[b for b, _ in lengths], y=[n for _, n in lengths]))
+                fig.update_layout(title="Text length (chars)", height=250, margin=dict(l=50, r=10, t=30, b=30))
+                st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+
             # st.markdown("### Under the hood")
             # with st.expander("Weaviate configuration (JSON)"):
             #     with st.container(height=300):
@@ -0,0 +1,135 @@
+"""Async counterparts of the `helpers` query & stats functions.
+
+Built on `WeaviateAsyncClient`, so several searches or aggregations can be in flight at
+once. `gather_limited` runs many of them concurrently with a cap, so loading a
+dashboard takes about as long as its slowest call rather than the sum of all calls.
+
+    async with await connect_to_weaviate_async() as client:
+        chats = client.collections.get(CollectionName.SUPPORTCHAT)
+        responses = await gather_limited(
+            [weaviate_query_async(chats, q, "Any", 5, "Hybrid") for q in queries]
+        )
+"""
+
+from typing import Any, Awaitable, Dict, Iterable, List, Literal, Optional, TypeVar
+import asyncio
+import os
+import time
+
+import weaviate
+from weaviate import WeaviateAsyncClient
+from weaviate.collections import CollectionAsync
+
+import helpers
+from helpers import (
+    TARGET_VECTOR,
+    _cached_top_companies,
+    _search_options,
+    _store_top_companies,
+    _top_companies_metrics,
+)
+
+
+T = TypeVar("T")
+
+
+async def connect_to_weaviate_async(
+    host: str = "localhost",
+    port: int = 8080,  # For Kubernetes, use 80
+    grpc_port: int = 50051,
+) -> WeaviateAsyncClient:
+    client = weaviate.use_async_with_local(
+        host=host,
+        port=port,
+        grpc_port=grpc_port,
+        headers={
+            "X-ANTHROPIC-API-KEY": os.environ["ANTHROPIC_API_KEY"],
+            "X-OPENAI-API-KEY": os.environ["OPENAI_API_KEY"],
+            "X-COHERE-API-KEY": os.environ["COHERE_API_KEY"],
+        },
+    )
+    await client.connect()
+    return client
+
+
+async def gather_limited(aws: Iterable[Awaitable[T]], concurrency: int = 8) -> List[T]:
+    """Like `asyncio.gather`, but with at most `concurrency` awaitables running at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
+async def weaviate_query_async(
+    collection: CollectionAsync,
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    rag_query: Optional[str] = None,
+):
+    company_filter_obj, alpha = _search_options(company_filter, search_type)
+
+    # The embedding cache may call out to the embedding provider, so keep it off the event loop
+    if helpers.embedding_cache is not None and alpha > 0:
+        vector = await asyncio.to_thread(helpers.embedding_cache.get, query)
+    else:
+        vector = None
+
+    if rag_query:
+        return await collection.generate.hybrid(
+            query=query,
+            vector=vector,
+            target_vector=TARGET_VECTOR,
+            filters=company_filter_obj,
+            alpha=alpha,
+            limit=limit,
+            grouped_task=rag_query,
+        )
+    return await collection.query.hybrid(
+        query=query,
+        vector=vector,
+        target_vector=TARGET_VECTOR,
+        filters=company_filter_obj,
+        alpha=alpha,
+        limit=limit,
+    )
+
+
+async def get_object_count_async(collection: CollectionAsync) -> int:
+    return (await collection.aggregate.over_all(total_count=True)).total_count
+
+
+async def get_top_companies_async(
+    collection: CollectionAsync, top_n: int, ttl_seconds: float = 60.0
+) -> Dict[str, int]:
+    """Async `helpers.get_top_companies`; shares its cache."""
+    key = (collection.name, collection.tenant)
+    cached, fresh = _cached_top_companies(key, top_n, ttl_seconds)
+
+    if cached is not None and fresh:
+        return dict(cached.top_companies[:top_n])
+
+    if cached is not None and await get_object_count_async(collection) == cached.object_count:
+        cached.fetched_at = time.monotonic()
+        return dict(cached.top_companies[:top_n])
+
+    response = await collection.aggregate.over_all(
+        total_count=True, return_metrics=_top_companies_metrics(top_n)
+    )
+    return _store_top_companies(key, top_n, response)
+
+
+async def get_dashboard_stats_async(
+    client: WeaviateAsyncClient, collection: CollectionAsync, top_n: int = 10
+) -> Dict[str, Any]:
+    """Everything the dashboard's stats panel needs, fetched concurrently."""
+    top_companies, object_count, nodes = await asyncio.gather(
+        get_top_companies_async(collection, top_n),
+        get_object_count_async(collection),
+        client.cluster.nodes(output="verbose"),
+    )
+    return {"top_companies": top_companies, "object_count": object_count, "nodes": nodes}
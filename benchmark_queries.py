@@ -0,0 +1,309 @@
+"""Query latency & throughput benchmark for `weaviate_query`.
+
+Replays a set of queries for each search type, with and without `company_author`
+filters, at one or more concurrency levels, and reports QPS and latency percentiles.
+Each run is written to `benchmarks/<label>-<timestamp>.json` and appended to
+`benchmarks/results.csv`, so runs against different index/quantizer configurations
+and dataset sizes can be compared side by side.
+
+    python benchmark_queries.py --label hnsw-bq-100k --concurrency 1 --concurrency 8
+
+A company-partitioned collection (see `helpers.partitioned_query`) is queried through
+the partition router, and its index config is suffixed with `/company-partitioned`.
+Run the same options against both layouts, with `--tail-companies` for the selective
+filters, to compare them in `results.csv`. Likewise, a time-partitioned collection (see
+`time_partitions`) is queried through its router (`/time-partitioned`). `--since` adds
+a `created_at` range to every query, to compare bucket pruning with a date filter.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import csv
+import json
+import time
+
+import click
+import numpy as np
+from weaviate.collections import Collection
+
+import helpers
+from helpers import (
+    TARGET_VECTOR,
+    CollectionName,
+    connect_to_weaviate,
+    get_partitions,
+    get_top_companies,
+    partitioned_query,
+    partitioned_top_companies,
+    weaviate_query,
+)
+from embeddings import EmbeddingCache, embedder_from_spec
+from time_partitions import get_time_partitions, time_partitioned_query
+
+
+DEFAULT_QUERIES = [
+    "returns",
+    "delivery problem",
+    "refund not received",
+    "flight delayed",
+    "lost baggage",
+    "app keeps crashing",
+    "reset my password",
+    "order cancelled without notice",
+    "charged twice",
+    "slow internet connection",
+    "cannot log in to my account",
+    "train was late",
+    "package damaged",
+    "change my booking",
+    "customer service was rude",
+    "battery drains quickly",
+    "subscription cancellation",
+    "wrong item delivered",
+    "seat upgrade",
+    "store opening hours",
+]
+
+SEARCH_TYPES = ["Hybrid", "Vector", "Keyword"]
+RESULTS_DIR = Path("benchmarks")
+ALL_COMPANIES = 1000
+
+
+@dataclass
+class BenchmarkResult:
+    label: str
+    search_type: str
+    company_filter: str
+    concurrency: int
+    requests: int
+    errors: int
+    seconds: float
+    qps: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    object_count: int
+    index_config: str
+    timestamp: str
+
+
+def measure(
+    run_one: Callable[[str], object], queries: Sequence[str], concurrency: int
+) -> Dict[str, float]:
+    """Run `run_one(query)` for every query with `concurrency` threads; return timing stats.
+
+    QPS and latencies only cover the queries that succeeded; failures are counted in `errors`.
+    """
+
+    failures: List[Exception] = []
+
+    def timed(query: str) -> Optional[float]:
+        t0 = time.perf_counter()
+        try:
+            run_one(query)
+        except Exception as e:
+            failures.append(e)
+            return None
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, queries))
+    seconds = time.perf_counter() - t0
+
+    if failures:
+        print(f"  {len(failures)} of {len(queries)} queries failed, e.g. {failures[0]!r}")
+
+    ok = np.array([l for l in latencies if l is not None]) * 1000
+    succeeded = len(ok)
+    if succeeded == 0:
+        ok = np.array([np.nan])
+    return {
+        "requests": len(queries),
+        "errors": len(queries) - succeeded,
+        "seconds": seconds,
+        # Failed queries are reported as errors, not counted as throughput
+        "qps": succeeded / seconds if seconds else 0.0,
+        "mean_ms": float(np.mean(ok)),
+        "p50_ms": float(np.percentile(ok, 50)),
+        "p95_ms": float(np.percentile(ok, 95)),
+        "p99_ms": float(np.percentile(ok, 99)),
+    }
+
+
+def describe_index(collection: Collection) -> str:
+    """A short description of the target vector's index & quantizer, e.g. `hnsw+bq`."""
+    config = collection.config.get()
+    vector_config = (config.vector_config or {}).get(TARGET_VECTOR)
+    if vector_config is None:
+        return "unknown"
+    index_config = vector_config.vector_index_config
+    quantizer = getattr(index_config, "quantizer", None)
+    name = type(index_config).__name__.replace("_VectorIndexConfig", "").lower()
+    if quantizer is not None:
+        name += "+" + type(quantizer).__name__.replace("_", "").replace("Config", "").lower()
+    return name
+
+
+def count_objects(collection: Collection) -> int:
+    """The object count of a collection or tenant, or of all tenants of a partitioned collection."""
+    if collection.tenant is not None or not collection.config.get().multi_tenancy_config.enabled:
+        return collection.aggregate.over_all(total_count=True).total_count
+    return sum(
+        collection.with_tenant(t).aggregate.over_all(total_count=True).total_count
+        for t in collection.tenants.get()
+    )
+
+
+def run_benchmark(
+    collection: Collection,
+    queries: Sequence[str],
+    search_types: Sequence[str] = SEARCH_TYPES,
+    company_filters: Sequence[str] = ("Any",),
+    concurrency_levels: Sequence[int] = (1,),
+    repeats: int = 3,
+    limit: int = 5,
+    use_cache: bool = False,
+    label: str = "default",
+    query_fn: Optional[Callable[..., object]] = None,
+) -> List[BenchmarkResult]:
+    """Benchmark every (search type, filter, concurrency) combination.
+
+    `query_fn` defaults to `weaviate_query`; pass another function with the same signature
+    to benchmark an alternative query path against the same query set.
+    """
+    query_fn = query_fn or weaviate_query
+    object_count = count_objects(collection)
+    index_config = describe_index(collection)
+    if query_fn is partitioned_query:
+        index_config += "/company-partitioned"
+    elif getattr(query_fn, "func", query_fn) is time_partitioned_query:
+        index_config += "/time-partitioned"
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    results = []
+    for search_type in search_types:
+        for company_filter in company_filters:
+
+            def run_one(query: str):
+                return query_fn(
+                    collection, query, company_filter, limit, search_type, use_cache=use_cache
+                )
+
+            # Warm-up pass, not measured (also fills the embedding cache, if there is one)
+            measure(run_one, queries, concurrency=1)
+
+            for concurrency in concurrency_levels:
+                stats = measure(run_one, list(queries) * repeats, concurrency)
+                result = BenchmarkResult(
+                    label=label,
+                    search_type=search_type,
+                    company_filter=company_filter,
+                    concurrency=concurrency,
+                    object_count=object_count,
+                    index_config=index_config,
+                    timestamp=timestamp,
+                    **stats,
+                )
+                results.append(result)
+                print(
+                    f"{search_type:8} {company_filter:20} c={concurrency:<3} "
+                    f"{result.qps:8.1f} QPS  p50 {result.p50_ms:7.1f} ms  "
+                    f"p95 {result.p95_ms:7.1f} ms  p99 {result.p99_ms:7.1f} ms  errors {result.errors}"
+                )
+    return results
+
+
+def write_results(results: List[BenchmarkResult], label: str, results_dir: Path = RESULTS_DIR) -> Path:
+    """Write the run as JSON, and append it to the cumulative `results.csv`."""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    json_path = results_dir / f"{label}-{stamp}.json"
+    with open(json_path, "w") as f:
+        json.dump([asdict(r) for r in results], f, indent=2)
+
+    csv_path = results_dir / "results.csv"
+    is_new = not csv_path.exists()
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(BenchmarkResult.__dataclass_fields__))
+        if is_new:
+            writer.writeheader()
+        writer.writerows(asdict(r) for r in results)
+    return json_path
+
+
+@click.command()
+@click.option("--label", default="default", help="Name for this run, e.g. the quantizer & dataset size.")
+@click.option("--queries-file", type=click.Path(exists=True), help="Text file with one query per line.")
+@click.option("--search-type", "search_types", multiple=True, type=click.Choice(SEARCH_TYPES), help="Default: all.")
+@click.option("--concurrency", "concurrency_levels", multiple=True, type=int, help="Default: 1, 4 and 16.")
+@click.option("--filtered-companies", default=3, show_default=True, help="Also run with a filter on each of the top N companies.")
+@click.option("--tail-companies", default=0, show_default=True, help="Also run with a filter on each of the N least common companies.")
+@click.option("--repeats", default=3, show_default=True, help="Passes over the query set per measurement.")
+@click.option("--limit", default=5, show_default=True)
+@click.option("--tenant", default=None, help="Tenant to query, for multi-tenant collections.")
+@click.option("--use-cache", is_flag=True, help="Measure with the query result cache enabled.")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Only search objects created since this date.")
+@click.option(
+    "--embedder",
+    default=None,
+    help="Embed queries client-side (e.g. 'hashing:384' for a free, deterministic stand-in) instead of calling the vectorizer.",
+)
+def main(label, queries_file, search_types, concurrency_levels, filtered_companies, tail_companies, repeats, limit, tenant, use_cache, since, embedder):
+    """Benchmark query latency & throughput against the workshop collection."""
+    if queries_file:
+        with open(queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+
+    if embedder:
+        helpers.embedding_cache = EmbeddingCache(embedder_from_spec(embedder))
+
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        if tenant:
+            collection = collection.with_tenant(tenant)
+            partitions = time_partitions = None
+        else:
+            partitions = get_partitions(collection)
+            time_partitions = get_time_partitions(collection)
+
+        top_n = ALL_COMPANIES if tail_companies else filtered_companies
+        if partitions is not None:
+            # Company-partitioned layout: the router picks the partition(s) of each search
+            query_fn = partial(partitioned_query, created_after=since) if since else partitioned_query
+            companies = list(partitioned_top_companies(collection, top_n))
+        elif time_partitions is not None:
+            # Time-partitioned layout: the router skips the buckets before `--since`
+            query_fn = partial(time_partitioned_query, created_after=since)
+            companies = list(partitioned_top_companies(collection, top_n, list(time_partitions.prune())))
+        else:
+            query_fn = partial(weaviate_query, created_after=since) if since else weaviate_query
+            companies = list(get_top_companies(collection, top_n))
+        tail = companies[filtered_companies:][-tail_companies:] if tail_companies else []
+        company_filters = ["Any"] + companies[:filtered_companies] + tail
+        results = run_benchmark(
+            collection,
+            queries,
+            search_types=search_types or SEARCH_TYPES,
+            company_filters=company_filters,
+            concurrency_levels=concurrency_levels or (1, 4, 16),
+            repeats=repeats,
+            limit=limit,
+            use_cache=use_cache,
+            label=label,
+            query_fn=query_fn,
+        )
+
+    path = write_results(results, label)
+    print(f"Results written to {path} and {RESULTS_DIR / 'results.csv'}")
+
+
+if __name__ == "__main__":
+    main()
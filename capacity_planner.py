@@ -0,0 +1,348 @@
+"""Named vector index profiles, and a memory planner to choose between them.
+
+`1_create_collection.py` builds its vector index from one of `PROFILES` (set
+`INDEX_PROFILE`, default `default`). The planner estimates each profile's memory per
+node from the dataset (or the live collection), node count & replication factor, and
+recommends the best one that fits the pod memory limit:
+
+    python capacity_planner.py plan --values values.yaml
+    python capacity_planner.py plan --live
+    python capacity_planner.py validate     # after an import: estimate vs. measured heap
+
+The estimates follow Weaviate's rules of thumb. Each object costs its in-memory vector
+(float32, or the compressed code with a quantizer; the full vectors then stay on disk
+for rescoring) plus about 10 bytes per HNSW connection, with `2 * maxConnections`
+connections on the base layer. SQ & PQ keep uncompressed vectors until `training_limit`
+objects have been imported. Go's garbage collector needs up to `GC_OVERHEAD` times the
+live heap. `ef` only affects query speed & recall, not memory.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Tuple
+import math
+import re
+
+import click
+import yaml
+from weaviate.classes.config import Configure
+from weaviate.classes.tenants import TenantActivityStatus
+
+from heap_profile import MIB, PPROF_HEAP_URL
+from hdf5_io import count_objects, read_slabs
+from helpers import CollectionName, connect_to_weaviate, get_heap_profile
+
+
+QuantizerName = Literal["none", "bq", "sq", "pq"]
+
+BYTES_PER_CONNECTION = 10
+GC_OVERHEAD = 2.0
+BASE_MB = 300.0  # Process, LSM memtables & inverted index of an almost empty node
+DEFAULT_HEADROOM = 0.2
+VECTOR_NAME = "text_with_metadata"
+
+
+@dataclass(frozen=True)
+class IndexProfile:
+    name: str
+    description: str
+    quantizer: QuantizerName = "none"
+    max_connections: int = 32
+    ef: int = -1  # -1: dynamic ef
+    ef_construction: int = 128
+    training_limit: int = 25_000
+    pq_segments: Optional[int] = None  # None: Weaviate's default for the dimensions
+
+    def vector_index_config(self):
+        quantizer = None
+        if self.quantizer == "bq":
+            quantizer = Configure.VectorIndex.Quantizer.bq()
+        elif self.quantizer == "sq":
+            quantizer = Configure.VectorIndex.Quantizer.sq(training_limit=self.training_limit)
+        elif self.quantizer == "pq":
+            quantizer = Configure.VectorIndex.Quantizer.pq(
+                training_limit=self.training_limit, segments=self.pq_segments
+            )
+        return Configure.VectorIndex.hnsw(
+            max_connections=self.max_connections,
+            ef=self.ef,
+            ef_construction=self.ef_construction,
+            quantizer=quantizer,
+        )
+
+
+# In order of preference: the planner recommends the first one that fits
+PROFILES: Dict[str, IndexProfile] = {
+    p.name: p
+    for p in [
+        IndexProfile("high-recall", "Uncompressed, denser graph & larger ef", max_connections=64, ef=256, ef_construction=256),
+        IndexProfile("default", "Uncompressed, Weaviate's defaults"),
+        IndexProfile("sq", "8-bit scalar quantization (4x smaller vectors)", quantizer="sq"),
+        IndexProfile("lean", "Uncompressed, sparser graph", max_connections=16),
+        IndexProfile("pq", "Product quantization", quantizer="pq"),
+        IndexProfile("bq", "Binary quantization (32x smaller vectors)", quantizer="bq"),
+        IndexProfile("bq-lean", "Binary quantization, sparser graph", quantizer="bq", max_connections=16),
+    ]
+}
+
+
+@dataclass
+class DatasetShape:
+    objects: int
+    dimensions: int
+    source: str
+
+
+@dataclass
+class ClusterShape:
+    nodes: int = 1
+    replication_factor: int = 1
+    memory_limit_mb: Optional[float] = None
+
+    @property
+    def copies_per_node(self) -> float:
+        """Share of the collection stored on each node (shards are spread evenly)."""
+        return min(self.replication_factor, self.nodes) / self.nodes
+
+
+@dataclass
+class MemoryEstimate:
+    profile: IndexProfile
+    objects_per_node: int
+    vectors_mb: float
+    graph_mb: float
+    training_mb: float  # Uncompressed vectors held until the quantizer is trained
+
+    @property
+    def live_mb(self) -> float:
+        """Expected live heap, i.e. what the heap profile's `inuse_space` should show."""
+        return BASE_MB + self.vectors_mb + self.graph_mb
+
+    @property
+    def total_mb(self) -> float:
+        """Memory to provision, incl. garbage collection and the pre-training peak."""
+        return BASE_MB + GC_OVERHEAD * (max(self.vectors_mb, self.training_mb) + self.graph_mb)
+
+    def fits(self, limit_mb: float, headroom: float = DEFAULT_HEADROOM) -> bool:
+        return self.total_mb <= limit_mb * (1 - headroom)
+
+
+def bytes_per_vector(profile: IndexProfile, dimensions: int) -> float:
+    if profile.quantizer == "bq":
+        return math.ceil(dimensions / 8)
+    if profile.quantizer == "sq":
+        return dimensions
+    if profile.quantizer == "pq":
+        # One byte per segment (256 centroids); assume a quarter of the dimensions by default
+        return profile.pq_segments or max(1, dimensions // 4)
+    return 4 * dimensions
+
+
+def estimate(profile: IndexProfile, dataset: DatasetShape, cluster: ClusterShape) -> MemoryEstimate:
+    objects = math.ceil(dataset.objects * cluster.copies_per_node)
+    vectors = objects * bytes_per_vector(profile, dataset.dimensions)
+    graph = objects * 2 * profile.max_connections * BYTES_PER_CONNECTION
+    training = 0
+    if profile.quantizer in ("sq", "pq"):
+        # Each shard replica on the node trains separately
+        shards_per_node = max(1, min(cluster.replication_factor, cluster.nodes))
+        training = min(objects, profile.training_limit * shards_per_node) * 4 * dataset.dimensions
+    return MemoryEstimate(
+        profile=profile,
+        objects_per_node=objects,
+        vectors_mb=vectors / MIB,
+        graph_mb=graph / MIB,
+        training_mb=training / MIB,
+    )
+
+
+def recommend(
+    estimates: List[MemoryEstimate], limit_mb: Optional[float], headroom: float = DEFAULT_HEADROOM
+) -> Optional[MemoryEstimate]:
+    """The first (most preferred) profile that fits, or None if none does."""
+    if limit_mb is None:
+        return estimates[0] if estimates else None
+    return next((e for e in estimates if e.fits(limit_mb, headroom)), None)
+
+
+def parse_memory_mb(quantity: str) -> float:
+    """A Kubernetes memory quantity (e.g. `3000Mi`, `4Gi`, `2G`) in MiB."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]i?)?\s*", str(quantity))
+    if match is None:
+        raise ValueError(f"Unrecognized memory quantity: {quantity}")
+    value, unit = float(match.group(1)), match.group(2) or ""
+    binary = {"Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40}
+    decimal = {"K": 1e3, "M": 1e6, "G": 1e9, "T": 1e12}
+    factor = binary.get(unit) or decimal.get(unit) or 1
+    return value * factor / MIB
+
+
+def cluster_from_values(path: str, replication_factor: int = 1) -> ClusterShape:
+    """Node count & pod memory limit from a Helm values file."""
+    with open(path) as f:
+        values = yaml.safe_load(f)
+    limit = (values.get("resources") or {}).get("limits", {}).get("memory")
+    return ClusterShape(
+        nodes=int(values.get("replicas", 1)),
+        replication_factor=replication_factor,
+        memory_limit_mb=parse_memory_mb(limit) if limit else None,
+    )
+
+
+def dataset_shape(file_path: str, vector_name: str = VECTOR_NAME) -> DatasetShape:
+    first = next(read_slabs(file_path, slab_size=1))
+    return DatasetShape(
+        objects=count_objects(file_path),
+        dimensions=int(first.vectors[vector_name].shape[1]),
+        source=file_path,
+    )
+
+
+def live_shapes(vector_name: str = VECTOR_NAME) -> Tuple[DatasetShape, ClusterShape, IndexProfile]:
+    """The live collection's size, the cluster's node count & replication, and the index profile in use.
+
+    Only active tenants are counted: inactive & offloaded ones can't be queried, and
+    aren't in memory.
+    """
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        config = collection.config.get()
+        source = f"collection {collection.name}"
+        if config.multi_tenancy_config.enabled:
+            tenants = collection.tenants.get()
+            active = sorted(n for n, t in tenants.items() if t.activity_status == TenantActivityStatus.ACTIVE)
+            parts = [collection.with_tenant(t) for t in active]
+            if len(active) < len(tenants):
+                source += f", {len(active)} of {len(tenants)} tenants active"
+        else:
+            parts = [collection]
+        objects = sum(len(part) for part in parts)
+
+        dimensions = 0
+        for part in parts:
+            response = part.query.fetch_objects(limit=1, include_vector=[vector_name])
+            if response.objects:
+                dimensions = len(response.objects[0].vector[vector_name])
+                break
+
+        dataset = DatasetShape(objects=objects, dimensions=dimensions, source=source)
+        cluster = ClusterShape(
+            nodes=len(client.cluster.nodes()), replication_factor=config.replication_config.factor
+        )
+        return dataset, cluster, profile_from_config(config.vector_config[vector_name].vector_index_config)
+
+
+def profile_from_config(index_config) -> IndexProfile:
+    """The named profile matching a live HNSW config, or an unnamed one with its settings."""
+    quantizer = type(index_config.quantizer).__name__.lower() if index_config.quantizer else ""
+    quantizer_name = next((q for q in ("bq", "sq", "pq") if f"_{q}" in quantizer), "none")
+    for profile in PROFILES.values():
+        if (profile.quantizer, profile.max_connections, profile.ef) == (
+            quantizer_name,
+            index_config.max_connections,
+            index_config.ef,
+        ):
+            return profile
+    return IndexProfile(
+        "custom",
+        "The collection's own settings",
+        quantizer=quantizer_name,
+        max_connections=index_config.max_connections,
+        ef=index_config.ef,
+        ef_construction=index_config.ef_construction,
+    )
+
+
+def print_plan(dataset: DatasetShape, cluster: ClusterShape, headroom: float) -> Optional[MemoryEstimate]:
+    print(
+        f"{dataset.objects} objects x {dataset.dimensions} dimensions ({dataset.source}), "
+        f"{cluster.nodes} node(s), replication factor {cluster.replication_factor}"
+    )
+    limit = cluster.memory_limit_mb
+    if limit is not None:
+        print(f"Pod memory limit {limit:.0f} MiB, keeping {headroom:.0%} headroom")
+    print(f"\n{'profile':12} {'vectors':>9} {'graph':>9} {'training':>9} {'live heap':>10} {'provision':>10}")
+    estimates = [estimate(p, dataset, cluster) for p in PROFILES.values()]
+    for e in estimates:
+        fit = "" if limit is None else ("fits" if e.fits(limit, headroom) else "too large")
+        print(
+            f"{e.profile.name:12} {e.vectors_mb:8.0f}M {e.graph_mb:8.0f}M {e.training_mb:8.0f}M "
+            f"{e.live_mb:9.0f}M {e.total_mb:9.0f}M  {fit}"
+        )
+
+    best = recommend(estimates, limit, headroom)
+    print()
+    if best is not None:
+        print(f"Recommended: INDEX_PROFILE={best.profile.name} ({best.profile.description})")
+    else:
+        smallest = min(estimates, key=lambda e: e.total_mb)
+        print(
+            f"No profile fits. The smallest ({smallest.profile.name}) needs a memory limit of at least "
+            f"{smallest.total_mb / (1 - headroom):.0f}Mi, or more nodes."
+        )
+    return best
+
+
+@click.group()
+def cli():
+    """Estimate memory per node for each index profile, and check estimates against the heap."""
+
+
+@cli.command()
+@click.option("--file-path", default="data/twitter_customer_support.h5", show_default=True)
+@click.option("--live", is_flag=True, help="Size the live collection & cluster instead of the file.")
+@click.option("--vector-name", default=VECTOR_NAME, show_default=True)
+@click.option("--objects", type=int, default=None, help="Plan for this many objects, e.g. a larger dataset than the file.")
+@click.option("--values", "values_path", default=None, help="Helm values file to read replicas & the memory limit from.")
+@click.option("--nodes", type=int, default=None, help="Node count (overrides --values / the live cluster).")
+@click.option("--replication-factor", type=int, default=None)
+@click.option("--memory-limit", default=None, help="Pod memory limit, e.g. 3000Mi (overrides --values).")
+@click.option("--headroom", default=DEFAULT_HEADROOM, show_default=True)
+def plan(file_path, live, vector_name, objects, values_path, nodes, replication_factor, memory_limit, headroom):
+    """Estimate memory per node for every profile and recommend one."""
+    if live:
+        dataset, cluster, _ = live_shapes(vector_name)
+    else:
+        dataset, cluster = dataset_shape(file_path, vector_name), ClusterShape()
+    if objects is not None:
+        dataset.objects = objects
+    if values_path:
+        from_values = cluster_from_values(values_path)
+        cluster.nodes, cluster.memory_limit_mb = from_values.nodes, from_values.memory_limit_mb
+    if nodes is not None:
+        cluster.nodes = nodes
+    if replication_factor is not None:
+        cluster.replication_factor = replication_factor
+    if memory_limit is not None:
+        cluster.memory_limit_mb = parse_memory_mb(memory_limit)
+    print_plan(dataset, cluster, headroom)
+
+
+@cli.command()
+@click.option("--vector-name", default=VECTOR_NAME, show_default=True)
+@click.option("--url", default=PPROF_HEAP_URL, show_default=True, help="pprof endpoint of one node.")
+def validate(vector_name, url):
+    """Compare the live collection's estimate with one node's measured heap."""
+    dataset, cluster, profile = live_shapes(vector_name)
+    heap = get_heap_profile(url)
+    if heap is None:
+        raise click.ClickException(f"Could not read a heap profile from {url}")
+
+    e = estimate(profile, dataset, cluster)
+    measured = heap.total("inuse_space") / MIB
+    subsystems = heap.by_subsystem("inuse_space")
+    index_measured = (subsystems.get("hnsw", 0) + subsystems.get("compression", 0)) / MIB
+
+    print(f"Profile {profile.name}: {e.objects_per_node} objects on this node")
+    print(f"  Live heap:     estimated {e.live_mb:8.0f} MiB, measured {measured:8.0f} MiB ({measured / e.live_mb:.2f}x)")
+    print(
+        f"  Vector index:  estimated {e.vectors_mb + e.graph_mb:8.0f} MiB, measured {index_measured:8.0f} MiB "
+        "(hnsw + compression)"
+    )
+    print(f"  To provision:  {e.total_mb:.0f} MiB incl. garbage collection overhead")
+
+
+main = cli
+
+
+if __name__ == "__main__":
+    main()
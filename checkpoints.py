@@ -0,0 +1,133 @@
+"""Checkpoints & dead letters for resumable imports.
+
+Each import range records the offset up to which its objects have been flushed to
+Weaviate (`checkpoint-<start>-<stop>.json`), and appends any objects Weaviate rejected
+to a dead-letter file (`deadletter-<start>-<stop>.jsonl`) with everything needed to
+send them again. Files are per range, so parallel workers never write to the same file.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+STATE_ROOT = "import_state"
+
+
+def state_dir_for(source: str) -> str:
+    """The state directory used for a data file (or other named source)."""
+    return str(Path(STATE_ROOT) / Path(source).stem)
+
+
+def clear_state(state_dir: str):
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def _json_default(obj: Any):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dead_letter_record(error_object) -> Dict[str, Any]:
+    """Turn a batch `ErrorObject` into a JSON-ready record of the full object."""
+    obj = error_object.object_
+    return {
+        "uuid": str(obj.uuid),
+        "collection": obj.collection,
+        "tenant": obj.tenant,
+        "properties": obj.properties,
+        "vector": obj.vector,
+        "message": error_object.message,
+    }
+
+
+def write_dead_letters(path: Path, records: Iterable[Dict[str, Any]]):
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, default=_json_default) + "\n")
+
+
+def read_dead_letters(state_dir: str) -> List[Dict[str, Any]]:
+    records = []
+    for path in sorted(Path(state_dir).glob("deadletter-*.jsonl")):
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+class ImportCheckpoint:
+    """Committed offset & dead-letter file for the import range `[start, stop)`."""
+
+    def __init__(self, state_dir: str, start: int, stop: int, total: int):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.start = start
+        self.stop = stop
+        self.total = total
+        self.path = self.state_dir / f"checkpoint-{start}-{stop}.json"
+        self.dead_letter_path = self.state_dir / f"deadletter-{start}-{stop}.jsonl"
+        self.committed = start
+
+    def commit(self, offset: int, failed_objects: Optional[list] = None):
+        """Record that objects up to `offset` are flushed; rejected ones go to the dead-letter file."""
+        if failed_objects:
+            write_dead_letters(
+                self.dead_letter_path, (dead_letter_record(f) for f in failed_objects)
+            )
+        self.committed = offset
+
+        # Write & rename, so a crash never leaves a half-written checkpoint behind
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"start": self.start, "stop": self.stop, "committed": offset, "total": self.total}, f
+            )
+        os.replace(tmp_path, self.path)
+
+
+def load_committed(state_dir: str, total: int) -> List[Tuple[int, int]]:
+    """Committed `[start, committed)` intervals from earlier runs, merged & sorted."""
+    intervals = []
+    for path in Path(state_dir).glob("checkpoint-*.json"):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["total"] != total:
+            raise ValueError(
+                f"Checkpoint {path} was written for {checkpoint['total']} objects, "
+                f"but the source has {total}. Start a fresh import instead of resuming."
+            )
+        if checkpoint["committed"] > checkpoint["start"]:
+            intervals.append((checkpoint["start"], checkpoint["committed"]))
+
+    merged: List[Tuple[int, int]] = []
+    for start, stop in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def remaining_intervals(committed: List[Tuple[int, int]], total: int) -> List[Tuple[int, int]]:
+    """The parts of `[0, total)` not covered by the (merged, sorted) `committed` intervals."""
+    remaining, cursor = [], 0
+    for start, stop in committed:
+        if start > cursor:
+            remaining.append((cursor, start))
+        cursor = max(cursor, stop)
+    if cursor < total:
+        remaining.append((cursor, total))
+    return remaining
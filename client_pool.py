@@ -0,0 +1,150 @@
+"""Process-wide, shared Weaviate clients for the Streamlit app.
+
+Streamlit reruns `app.py` for every widget change and every fragment tick, in every
+browser session. Rather than connecting (HTTP + gRPC channel setup) each time, the app
+borrows a long-lived client from the pool. Clients are health-checked periodically
+and reconnected when a node stops responding.
+
+Set `WEAVIATE_NODES` to spread sessions over several nodes, e.g. for the three-node
+Docker setup:
+
+    export WEAVIATE_NODES="localhost:8080:50051,localhost:8081:50052,localhost:8082:50053"
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import itertools
+import os
+import threading
+import time
+
+from weaviate import WeaviateClient
+
+from helpers import connect_to_weaviate
+
+
+@dataclass(frozen=True)
+class NodeTarget:
+    host: str = "localhost"
+    port: int = 8080
+    grpc_port: int = 50051
+
+    def __str__(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def targets_from_env(value: Optional[str] = None) -> List[NodeTarget]:
+    """Parse `host:port:grpc_port,...` (from `WEAVIATE_NODES` by default)."""
+    value = os.environ.get("WEAVIATE_NODES", "") if value is None else value
+    targets = []
+    for entry in filter(None, (e.strip() for e in value.split(","))):
+        host, port, grpc_port = entry.split(":")
+        targets.append(NodeTarget(host, int(port), int(grpc_port)))
+    return targets or [NodeTarget()]
+
+
+@dataclass
+class ConnectionStats:
+    connections_opened: int = 0
+    connect_seconds_total: float = 0.0
+    last_connect_seconds: float = 0.0
+    reconnects: int = 0
+    health_check_failures: int = 0
+    checkouts: int = 0
+
+    @property
+    def mean_connect_ms(self) -> float:
+        if self.connections_opened == 0:
+            return 0.0
+        return 1000 * self.connect_seconds_total / self.connections_opened
+
+
+@dataclass
+class _PooledClient:
+    client: WeaviateClient
+    checked_at: float
+
+
+@dataclass
+class ClientPool:
+    """One shared, connected client per node target."""
+
+    targets: List[NodeTarget] = field(default_factory=targets_from_env)
+    health_check_interval: float = 10.0
+    stats: ConnectionStats = field(default_factory=ConnectionStats)
+
+    def __post_init__(self):
+        self._clients: Dict[NodeTarget, _PooledClient] = {}
+        self._lock = threading.Lock()
+        self._round_robin = itertools.cycle(range(len(self.targets)))
+
+    def _connect(self, target: NodeTarget) -> _PooledClient:
+        t0 = time.perf_counter()
+        client = connect_to_weaviate(host=target.host, port=target.port, grpc_port=target.grpc_port)
+        elapsed = time.perf_counter() - t0
+
+        self.stats.connections_opened += 1
+        self.stats.connect_seconds_total += elapsed
+        self.stats.last_connect_seconds = elapsed
+        return _PooledClient(client=client, checked_at=time.monotonic())
+
+    def _is_healthy(self, pooled: _PooledClient) -> bool:
+        try:
+            return pooled.client.is_connected() and pooled.client.is_ready()
+        except Exception:
+            return False
+
+    def get(self, node: Optional[int] = None) -> WeaviateClient:
+        """A connected client for `node` (an index into `targets`), or for the next node in turn.
+
+        The client is shared: do not close it.
+        """
+        with self._lock:
+            self.stats.checkouts += 1
+            candidates = [node] if node is not None else [next(self._round_robin) for _ in self.targets]
+
+            last_error = None
+            for i in candidates:
+                target = self.targets[i]
+                pooled = self._clients.get(target)
+                try:
+                    if pooled is None:
+                        pooled = self._clients[target] = self._connect(target)
+                    elif time.monotonic() - pooled.checked_at > self.health_check_interval:
+                        if not self._is_healthy(pooled):
+                            self.stats.health_check_failures += 1
+                            self.stats.reconnects += 1
+                            pooled.client.close()
+                            del self._clients[target]
+                            pooled = self._clients[target] = self._connect(target)
+                        pooled.checked_at = time.monotonic()
+                    return pooled.client
+                except Exception as e:
+                    # Try the next node, if there is one
+                    last_error = e
+            raise last_error
+
+    @contextmanager
+    def client(self, node: Optional[int] = None) -> Iterator[WeaviateClient]:
+        """Like `connect_to_weaviate()` in a `with` block, but the client stays open afterwards."""
+        yield self.get(node)
+
+    def close_all(self):
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.client.close()
+            self._clients.clear()
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ClientPool:
+    """The process-wide pool, shared by every Streamlit session & fragment."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool()
+        return _pool
@@ -0,0 +1,42 @@
+import click
+from pathlib import Path
+from hdf5_io import convert_in_place
+from workshop_setup import record_local_checksum
+
+
+@click.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option("--data-dir", default="data", help="Directory to scan when no files are given.")
+@click.option(
+    "--vector-dtype",
+    type=click.Choice(["float32", "float16", "int8"]),
+    default="float32",
+    show_default=True,
+    help="Store vectors as float16, or int8 with per-dimension scaling, for smaller files.",
+)
+@click.option("--report", is_flag=True, help="Report the cosine error & neighbour recall of the quantized vectors.")
+def convert(files, data_dir, vector_dtype, report):
+    """Convert downloaded (legacy layout) HDF5 files to the columnar layout, in place."""
+    paths = [Path(f) for f in files] or sorted(Path(data_dir).glob("*.h5"))
+
+    if not paths:
+        print(f"No .h5 files found in {data_dir}/")
+        return
+
+    before_replace = None
+    if report:
+        from evaluate_recall import quantization_report
+
+        before_replace = lambda original, converted: quantization_report(original, converted).print()  # noqa: E731
+
+    for path in paths:
+        if convert_in_place(str(path), vector_dtype=vector_dtype, before_replace=before_replace):
+            print(f"Converted {path} to the columnar layout ({vector_dtype} vectors)")
+            # Otherwise workshop_setup.py would take the converted file for a corrupt download
+            record_local_checksum(path)
+        else:
+            print(f"{path} already uses the columnar layout with {vector_dtype} vectors; skipping")
+
+
+if __name__ == "__main__":
+    convert()
@@ -0,0 +1,130 @@
+"""Bulk existence checks, so deduplicated ingestion doesn't cost a request per object.
+
+`ExistenceIndex` keeps a local set of UUIDs known to be in the collection (warmed with
+a cursor over the collection, and saved to disk for a resumed run). Candidates missing
+from the local set are confirmed against Weaviate in pages of `Filter.by_id().contains_any`
+queries, so thousands of UUIDs are resolved per round trip.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Union
+from uuid import UUID
+import json
+
+import numpy as np
+from weaviate.classes.query import Filter
+from weaviate.collections import Collection
+
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+@dataclass
+class DedupStats:
+    candidates: int = 0
+    known_locally: int = 0
+    found_remotely: int = 0
+    new: int = 0
+    requests: int = 0
+    warm_requests: int = 0
+
+    @property
+    def round_trips_saved(self) -> int:
+        """Compared to one `data.exists` call per candidate."""
+        return self.candidates - self.requests - self.warm_requests
+
+    def print(self):
+        print(
+            f"Dedup: {self.candidates} candidates, {self.new} new, "
+            f"{self.known_locally} known locally, {self.found_remotely} found in Weaviate. "
+            f"{self.requests + self.warm_requests} requests instead of {self.candidates} "
+            f"({self.round_trips_saved} round trips saved)."
+        )
+
+
+class ExistenceIndex:
+    """Local UUID set for a collection, persisted as an `(N, 16)` uint8 `.npy` file."""
+
+    def __init__(
+        self,
+        collection: Collection,
+        path: Union[str, Path],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        run_id: Optional[str] = None,
+    ):
+        self.collection = collection
+        self.path = Path(path)
+        self.run_id = run_id
+        self.meta_path = self.path.with_suffix(".json")
+        self.page_size = page_size
+        self.stats = DedupStats()
+        self._known: Set[bytes] = set()
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def load_or_warm(self) -> "ExistenceIndex":
+        """Load the set this import run (`run_id`) saved, if the object count still matches; else rebuild it.
+
+        The count alone can't tell that objects were deleted and others added since, so a
+        set saved by another run (or without a run ID) is never trusted.
+        """
+        if self.run_id is not None and self.path.exists() and self.meta_path.exists():
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta.get("run_id") == self.run_id and meta["object_count"] == len(self.collection):
+                data = np.load(self.path).tobytes()
+                self._known = {data[i : i + 16] for i in range(0, len(data), 16)}
+                return self
+        return self.warm()
+
+    def warm(self) -> "ExistenceIndex":
+        """Read every UUID in the collection with a cursor (no properties or vectors)."""
+        self._known = set()
+        for obj in self.collection.iterator(return_properties=[], cache_size=self.page_size):
+            self._known.add(obj.uuid.bytes)
+        self.stats.warm_requests += len(self._known) // self.page_size + 1
+        return self
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = np.frombuffer(b"".join(sorted(self._known)), dtype=np.uint8).reshape(-1, 16)
+        np.save(self.path, data)
+        with open(self.meta_path, "w") as f:
+            json.dump({"object_count": len(self.collection), "run_id": self.run_id}, f)
+
+    def add(self, uuids: Iterable[Union[str, UUID]]):
+        self._known.update(UUID(str(u)).bytes for u in uuids)
+
+    def _fetch_existing(self, uuids: List[str]) -> Set[bytes]:
+        existing = set()
+        for i in range(0, len(uuids), self.page_size):
+            page = uuids[i : i + self.page_size]
+            response = self.collection.query.fetch_objects(
+                filters=Filter.by_id().contains_any(page),
+                limit=len(page),
+                return_properties=[],
+            )
+            self.stats.requests += 1
+            existing.update(o.uuid.bytes for o in response.objects)
+        return existing
+
+    def filter_new(self, uuids: List[str]) -> List[str]:
+        """Return the UUIDs (in order, without repeats) that are not in the collection yet.
+
+        Call `add` with the ones that were imported successfully, so that they are
+        known locally from then on.
+        """
+        self.stats.candidates += len(uuids)
+
+        unknown = [u for u in dict.fromkeys(uuids) if UUID(u).bytes not in self._known]
+        self.stats.known_locally += len(uuids) - len(unknown)
+
+        existing = self._fetch_existing(unknown) if unknown else set()
+        self.stats.found_remotely += len(existing)
+        self._known.update(existing)
+
+        new = [u for u in unknown if UUID(u).bytes not in existing]
+        self.stats.new += len(new)
+        return new
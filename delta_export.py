@@ -0,0 +1,272 @@
+"""Incremental exports: only objects created or updated since the last snapshot.
+
+A snapshot is a base file plus a list of delta segments, described by a JSON manifest
+next to them. Each delta export:
+
+1. scans the collection for UUIDs and `last_update_time` only (no properties or
+   vectors), which is cheap even for a large collection;
+2. fetches the full objects, with vectors, for those updated at or after the manifest's
+   high-water mark, in pages of `Filter.by_id().contains_any`, and writes them to a new
+   columnar segment;
+3. records UUIDs that disappeared since the previous export as deletions, and moves
+   the high-water mark to the newest update time seen, but no later than the start of
+   the scan.
+
+`compact` merges the base and all segments (later versions win, deletions applied) into
+a new base file, which the importer reads like any other export.
+
+The high-water mark comes from Weaviate's own timestamps, and is inclusive, so an object
+updated in the same millisecond as the scan is exported next time rather than missed.
+The scan isn't atomic: an object written during it, behind the cursor, can have an
+older update time than objects seen later. So the mark is capped at the time the scan
+started (which assumes the local and server clocks roughly agree), and UUIDs that
+weren't there at the previous export are exported whatever their update time. The
+manifest keeps the UUIDs already exported at the mark, so those aren't exported again,
+and a run without changes writes no segment.
+"""
+
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import json
+import os
+import time
+
+import numpy as np
+from tqdm import tqdm
+from weaviate.classes.query import Filter, MetadataQuery
+from weaviate.collections import Collection
+
+from exporter import EXPORT_DIR, EXPORT_PREFIX
+from hdf5_io import ColumnarWriter, read_slabs
+
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+@dataclass
+class Segment:
+    path: Optional[str]  # None if the segment only has deletions
+    count: int
+    since: Optional[str]
+    until: str
+    deleted: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Manifest:
+    path: str
+    base: Optional[str] = None
+    base_count: int = 0
+    high_water_mark: Optional[str] = None
+    # The UUIDs exported with an update time equal to the mark
+    mark_uuids: List[str] = field(default_factory=list)
+    segments: List[Segment] = field(default_factory=list)
+
+    @property
+    def uuids_path(self) -> Path:
+        """The collection's UUIDs at the last export, to detect deletions."""
+        return Path(self.path).with_suffix(".uuids.npy")
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path) as f:
+            data = json.load(f)
+        data["segments"] = [Segment(**s) for s in data.get("segments", [])]
+        return cls(path=path, **{k: v for k, v in data.items() if k != "path"})
+
+    def save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({k: v for k, v in asdict(self).items() if k != "path"}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def load_uuids(self) -> Set[str]:
+        if not self.uuids_path.exists():
+            return set()
+        return {str(UUID(bytes=row.tobytes())) for row in np.load(self.uuids_path)}
+
+    def save_uuids(self, uuids: Set[str]):
+        packed = b"".join(UUID(u).bytes for u in uuids)
+        np.save(self.uuids_path, np.frombuffer(packed, dtype=np.uint8).reshape(-1, 16))
+
+
+@dataclass
+class DeltaSummary:
+    scanned: int
+    changed: int
+    deleted: int
+    segment: Optional[str]
+    seconds: float
+
+    def print(self):
+        print(
+            f"Scanned {self.scanned} objects in {self.seconds:.1f}s: {self.changed} created/updated, "
+            f"{self.deleted} deleted."
+        )
+        if self.segment:
+            print(f"Wrote {self.segment}")
+
+
+def manifest_path(model_suffix: str, tenant: Optional[str] = None, export_dir: str = EXPORT_DIR) -> str:
+    tenant_suffix = f"_{tenant}" if tenant else ""
+    return f"{export_dir}/{EXPORT_PREFIX}_{model_suffix}{tenant_suffix}.manifest.json"
+
+
+def _parse_mark(mark: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(mark) if mark else None
+
+
+def scan_update_times(collection: Collection, cache_size: int = 10_000) -> Dict[str, datetime]:
+    """UUID -> last update time of every object, without transferring properties or vectors."""
+    return {
+        str(obj.uuid): obj.metadata.last_update_time
+        for obj in tqdm(
+            collection.iterator(
+                return_properties=[],
+                return_metadata=MetadataQuery(last_update_time=True),
+                cache_size=cache_size,
+            ),
+            desc="Scanning update times",
+            unit="obj",
+        )
+    }
+
+
+def fetch_objects(collection: Collection, uuids: List[str], page_size: int = DEFAULT_PAGE_SIZE):
+    """Yield the full objects, with vectors, for `uuids`."""
+    for i in range(0, len(uuids), page_size):
+        page = uuids[i : i + page_size]
+        response = collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(page), include_vector=True, limit=len(page)
+        )
+        yield from response.objects
+
+
+def export_delta(
+    collection: Collection,
+    manifest: Manifest,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> DeltaSummary:
+    """Export objects changed since `manifest.high_water_mark` as a new segment (or the base, on the first run)."""
+    t0 = time.perf_counter()
+    scan_started = datetime.now(timezone.utc)
+    update_times = scan_update_times(collection)
+    since = _parse_mark(manifest.high_water_mark)
+
+    previous = manifest.load_uuids()
+    exported_at_mark = set(manifest.mark_uuids)
+    changed = sorted(
+        u
+        for u, t in update_times.items()
+        if since is None
+        or t > since
+        or (t == since and u not in exported_at_mark)
+        or (previous and u not in previous)
+    )
+    deleted = sorted(previous - update_times.keys()) if previous else []
+    # Objects written during the scan may be behind the cursor, with older update times
+    until = min(max(update_times.values(), default=since or scan_started), scan_started)
+    if since is not None:
+        until = max(until, since)
+
+    segment_path = None
+    count = 0
+    stem = Path(manifest.path).name.replace(".manifest.json", "")
+    if changed:
+        Path(manifest.path).parent.mkdir(parents=True, exist_ok=True)
+        if manifest.base is None:
+            segment_path = str(Path(manifest.path).parent / f"{stem}.base.h5")
+        else:
+            n = len(manifest.segments) + 1
+            segment_path = str(Path(manifest.path).parent / f"{stem}.delta-{n:04d}.h5")
+
+        with ColumnarWriter(segment_path) as writer:
+            if since is None:
+                # Everything is new: a plain cursor is cheaper than fetching by ID
+                objects = collection.iterator(include_vector=True)
+            else:
+                objects = fetch_objects(collection, changed, page_size)
+            for obj in tqdm(objects, total=len(changed), desc="Exporting changes", unit="obj"):
+                writer.add(str(obj.uuid), obj.properties, obj.vector)
+        count = writer.count
+
+    if manifest.base is None:
+        if segment_path is not None:
+            manifest.base, manifest.base_count = segment_path, count
+    elif changed or deleted:
+        manifest.segments.append(
+            Segment(
+                path=segment_path,
+                count=count,
+                since=manifest.high_water_mark,
+                until=until.isoformat(),
+                deleted=deleted,
+            )
+        )
+
+    # Commit the segment before moving the mark, so an interrupted run just repeats itself
+    manifest.high_water_mark = until.isoformat()
+    manifest.mark_uuids = sorted(u for u, t in update_times.items() if t == until)
+    manifest.save()
+    manifest.save_uuids(set(update_times))
+
+    return DeltaSummary(
+        scanned=len(update_times),
+        changed=len(changed),
+        deleted=len(deleted),
+        segment=segment_path,
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def _latest_locations(manifest: Manifest) -> Dict[str, int]:
+    """UUID -> index of the file (0 = base, then segments) holding its latest version."""
+    files = [manifest.base] + [s.path for s in manifest.segments]
+    deletions = [[]] + [s.deleted for s in manifest.segments]
+
+    latest: Dict[str, int] = {}
+    for i, (path, deleted) in enumerate(zip(files, deletions)):
+        for uuid in deleted:
+            latest.pop(uuid, None)
+        if path is not None and os.path.exists(path):
+            for slab in read_slabs(path):
+                for uuid in slab.uuids:
+                    latest[uuid] = i
+    return latest
+
+
+def compact(manifest: Manifest) -> Tuple[str, int]:
+    """Merge the base & segments into a new base file; returns (path, object count)."""
+    if manifest.base is None:
+        raise ValueError(f"Nothing to compact: {manifest.path} has no base export yet.")
+
+    files = [manifest.base] + [s.path for s in manifest.segments]
+    latest = _latest_locations(manifest)
+
+    tmp_path = f"{manifest.base}.compacting"
+    with ColumnarWriter(tmp_path) as writer:
+        for i, path in enumerate(files):
+            if path is None or not os.path.exists(path):
+                continue
+            for slab in read_slabs(path):
+                for uuid, properties, vectors in slab.rows():
+                    if latest.get(uuid) == i:
+                        writer.add(uuid, properties, vectors)
+    count = writer.count
+
+    os.replace(tmp_path, manifest.base)
+    old_segments = [s.path for s in manifest.segments]
+    manifest.base_count = count
+    manifest.segments = []
+    manifest.save()
+
+    for path in old_segments:
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+    return manifest.base, count
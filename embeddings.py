@@ -0,0 +1,199 @@
+"""Client-side query embeddings, cached so repeated searches skip the vectorizer.
+
+Weaviate normally vectorizes the query text with the collection's vectorizer module on
+every hybrid/vector search. `EmbeddingCache` looks the query up in memory (LRU) and,
+optionally, in an on-disk SQLite store; on a miss it asks its `Embedder` for the vector.
+`weaviate_query` then passes the vector with `vector=`. If there is no embedder, or it
+fails, the query is sent without a vector and Weaviate vectorizes it as before.
+
+The embedder must use the same model as the collection's vectorizer, or the query
+vectors won't be comparable to the stored ones.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Protocol, Sequence, Union
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+import requests
+
+
+class Embedder(Protocol):
+    model_name: str
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        ...
+
+
+class HashingEmbedder:
+    """Deterministic, offline stand-in for tests & benchmarks (feature hashing of tokens)."""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.model_name = f"hashing-{dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().split():
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                vectors[i, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1, norms)).tolist()
+
+
+class CohereEmbedder:
+    def __init__(self, model: str = "embed-multilingual-light-v3.0"):
+        self.model_name = f"cohere/{model}"
+        self.model = model
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        response = requests.post(
+            "https://api.cohere.com/v1/embed",
+            headers={"Authorization": f"Bearer {os.environ['COHERE_API_KEY']}"},
+            json={
+                "model": self.model,
+                "texts": list(texts),
+                "input_type": "search_query",
+                "embedding_types": ["float"],
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]["float"]
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model_name = f"openai/{model}"
+        self.model = model
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        response = requests.post(
+            "https://api.openai.com/v1/embeddings",
+            headers={"Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}"},
+            json={"model": self.model, "input": list(texts)},
+            timeout=30,
+        )
+        response.raise_for_status()
+        return [d["embedding"] for d in sorted(response.json()["data"], key=lambda d: d["index"])]
+
+
+class OllamaEmbedder:
+    def __init__(self, model: str = "nomic-embed-text", host: str = "http://localhost:11434"):
+        self.model_name = f"ollama/{model}"
+        self.model = model
+        self.host = host
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        import ollama
+
+        client = ollama.Client(host=self.host)
+        return [client.embeddings(model=self.model, prompt=text)["embedding"] for text in texts]
+
+
+def embedder_from_spec(spec: str) -> Embedder:
+    """Build an embedder from `provider[:model]`, e.g. `cohere:embed-multilingual-light-v3.0` or `hashing:384`."""
+    provider, _, model = spec.partition(":")
+    if provider == "hashing":
+        return HashingEmbedder(int(model) if model else 384)
+    embedders = {"cohere": CohereEmbedder, "openai": OpenAIEmbedder, "ollama": OllamaEmbedder}
+    if provider not in embedders:
+        raise ValueError(f"Unknown embedder '{provider}'. Choose from {['hashing', *embedders]}")
+    return embedders[provider](model) if model else embedders[provider]()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+@dataclass
+class EmbeddingCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    embed_failures: int = 0
+    embed_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_entries: int = 4096,
+        disk_path: Optional[Union[str, Path]] = None,
+    ):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.stats = EmbeddingCacheStats()
+
+        self._memory: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT, query TEXT, vector BLOB, PRIMARY KEY (model, query))"
+            )
+
+    def _remember(self, key: tuple, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """The query's vector, or None if it isn't cached and couldn't be computed."""
+        key = (self.embedder.model_name, normalize_query(query))
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND query = ?", key
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    self._remember(key, vector)
+                    self.stats.disk_hits += 1
+                    return vector
+            self.stats.misses += 1
+
+        t0 = time.perf_counter()
+        try:
+            vector = self.embedder.embed([key[1]])[0]
+        except Exception:
+            # Let Weaviate vectorize the query instead
+            self.stats.embed_failures += 1
+            return None
+        finally:
+            self.stats.embed_seconds += time.perf_counter() - t0
+
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                    (*key, np.asarray(vector, dtype=np.float32).tobytes()),
+                )
+                self._db.commit()
+        return vector
@@ -0,0 +1,309 @@
+"""Recall@k vs. latency of the live collection, against exact ground truth.
+
+Query vectors are sampled from the HDF5 dataset, and their exact nearest neighbours
+(cosine) are computed with NumPy, one block of the dataset at a time so that memory
+stays bounded for 200k+ vectors. The ground truth is cached in `cache/ground_truth/`,
+so it is only computed once per dataset & sample.
+
+The same query vectors are then sent to the collection with `near_vector`, optionally
+for several HNSW `ef` values, and recall@k is reported next to the query latency.
+Results are appended to `benchmarks/recall.csv`, alongside the index/quantizer
+description, so configurations from `1_create_collection.py` can be compared.
+
+    python evaluate_recall.py --label hnsw-sq --k 10 --ef 32 --ef 64 --ef 128
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+import csv
+import hashlib
+import os
+import time
+
+import click
+import h5py
+import numpy as np
+from weaviate.classes.config import Reconfigure
+from weaviate.collections import Collection
+
+from benchmark_queries import RESULTS_DIR, describe_index
+from hdf5_io import read_vectors
+from helpers import TARGET_VECTOR, CollectionName, connect_to_weaviate
+
+
+GROUND_TRUTH_DIR = Path("cache/ground_truth")
+
+
+@dataclass
+class RecallResult:
+    label: str
+    index_config: str
+    ef: Optional[int]
+    k: int
+    queries: int
+    recall: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    qps: float
+    object_count: int
+    timestamp: str
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def exact_neighbors(
+    vectors: np.ndarray, query_idx: np.ndarray, k: int, block_size: int = 20_000
+) -> np.ndarray:
+    """Indices of the exact top-`k` cosine neighbours of `vectors[query_idx]`, excluding the query itself.
+
+    The dataset is processed `block_size` rows at a time, keeping a running top-k, so memory
+    use is about `len(query_idx) * (block_size + k)` floats on top of the dataset. With fewer
+    than `k + 1` vectors, every query has fewer neighbours, and only those are returned.
+    """
+    k = min(k, len(vectors) - 1)
+    if k < 1:
+        raise ValueError(f"Need at least 2 vectors to find neighbours, got {len(vectors)}.")
+    queries = _normalize(vectors[query_idx].astype(np.float32))
+    n_queries = len(query_idx)
+
+    best_sims = np.full((n_queries, k), -np.inf, dtype=np.float32)
+    best_idx = np.full((n_queries, k), -1, dtype=np.int64)
+
+    for start in range(0, len(vectors), block_size):
+        block = _normalize(vectors[start : start + block_size].astype(np.float32))
+        sims = queries @ block.T
+        # Exclude each query from its own neighbours
+        own = (query_idx >= start) & (query_idx < start + len(block))
+        sims[np.nonzero(own)[0], query_idx[own] - start] = -np.inf
+
+        # Merge this block's candidates with the running top-k
+        cand_sims = np.concatenate([best_sims, sims], axis=1)
+        cand_idx = np.concatenate(
+            [best_idx, np.broadcast_to(np.arange(start, start + len(block)), sims.shape)], axis=1
+        )
+        top = np.argpartition(-cand_sims, k - 1, axis=1)[:, :k]
+        best_sims = np.take_along_axis(cand_sims, top, axis=1)
+        best_idx = np.take_along_axis(cand_idx, top, axis=1)
+
+    order = np.argsort(-best_sims, axis=1)
+    return np.take_along_axis(best_idx, order, axis=1)
+
+
+def load_ground_truth(
+    file_path: str, vector_name: str, n_queries: int, k: int, seed: int
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Return (uuids, vectors, query indices, neighbour indices), using the on-disk cache when possible."""
+    uuids, vectors = read_vectors(file_path, vector_name)
+
+    stat = os.stat(file_path)
+    file_id = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    cache_key = hashlib.sha1(f"{file_id}:{vector_name}:{n_queries}:{k}:{seed}".encode()).hexdigest()[:16]
+    cache_path = GROUND_TRUTH_DIR / f"{Path(file_path).stem}-{cache_key}.npz"
+
+    if cache_path.exists():
+        cached = np.load(cache_path)
+        return uuids, vectors, cached["query_idx"], cached["neighbors"]
+
+    rng = np.random.default_rng(seed)
+    query_idx = np.sort(rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False))
+
+    t0 = time.perf_counter()
+    neighbors = exact_neighbors(vectors, query_idx, k)
+    print(f"Computed exact top-{k} for {len(query_idx)} queries in {time.perf_counter() - t0:.1f}s")
+
+    GROUND_TRUTH_DIR.mkdir(parents=True, exist_ok=True)
+    np.savez(cache_path, query_idx=query_idx, neighbors=neighbors)
+    return uuids, vectors, query_idx, neighbors
+
+
+@dataclass
+class QuantizationReport:
+    original_bytes: int
+    quantized_bytes: int
+    encoding: str
+    mean_cosine_error: float
+    max_cosine_error: float
+    recall: float
+    k: int
+    queries: int
+
+    def print(self):
+        print(
+            f"{self.encoding}: {self.quantized_bytes / 1e6:.1f} MB vs {self.original_bytes / 1e6:.1f} MB "
+            f"({self.original_bytes / max(self.quantized_bytes, 1):.1f}x smaller)"
+        )
+        print(
+            f"  1 - cosine(original, dequantized): mean {self.mean_cosine_error:.2e}, "
+            f"max {self.max_cosine_error:.2e}"
+        )
+        print(f"  Neighbour recall@{self.k} vs. float32 ({self.queries} queries): {self.recall:.4f}")
+
+
+def quantization_report(
+    original_path: str,
+    quantized_path: str,
+    vector_name: str = TARGET_VECTOR,
+    n_queries: int = 200,
+    k: int = 10,
+    seed: int = 42,
+) -> QuantizationReport:
+    """Compare the vectors of a quantized file with the float32 original.
+
+    Recall is measured by exact search over each file: the top-`k` neighbours found with
+    the dequantized vectors, against those found with the original vectors.
+    """
+    uuids, original = read_vectors(original_path, vector_name)
+    quantized_uuids, quantized = read_vectors(quantized_path, vector_name)
+    if quantized_uuids != uuids:
+        raise ValueError(f"{original_path} and {quantized_path} don't hold the same objects in the same order.")
+
+    cosine = np.sum(_normalize(original) * _normalize(quantized), axis=1)
+
+    rng = np.random.default_rng(seed)
+    query_idx = np.sort(rng.choice(len(original), size=min(n_queries, len(original)), replace=False))
+    expected = exact_neighbors(original, query_idx, k)
+    found = exact_neighbors(quantized, query_idx, k)
+    k = expected.shape[1]
+    recall = np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)])
+
+    with h5py.File(quantized_path, "r") as hf:
+        quantized_bytes = hf["vectors"][vector_name].id.get_storage_size()
+        encoding = hf["vectors"][vector_name].attrs.get("encoding", "float32")
+    return QuantizationReport(
+        original_bytes=original.nbytes,
+        quantized_bytes=quantized_bytes,
+        encoding=encoding,
+        mean_cosine_error=float(np.mean(1 - cosine)),
+        max_cosine_error=float(np.max(1 - cosine)),
+        recall=float(recall),
+        k=k,
+        queries=len(query_idx),
+    )
+
+
+def get_ef(collection: Collection) -> int:
+    """The target vector's current HNSW `ef` (-1 for dynamic ef)."""
+    vector_config = collection.config.get().vector_config[TARGET_VECTOR]
+    return vector_config.vector_index_config.ef
+
+
+def set_ef(collection: Collection, ef: int):
+    collection.config.update(
+        vectorizer_config=[
+            Reconfigure.NamedVectors.update(
+                name=TARGET_VECTOR, vector_index_config=Reconfigure.VectorIndex.hnsw(ef=ef)
+            )
+        ]
+    )
+
+
+def evaluate(
+    collection: Collection,
+    uuids: List[str],
+    vectors: np.ndarray,
+    query_idx: np.ndarray,
+    neighbors: np.ndarray,
+    k: int,
+) -> Tuple[float, np.ndarray, float]:
+    """Mean recall@k, per-query latencies (s) and total seconds for `near_vector` queries.
+
+    `k` is capped at the number of true neighbours (see `exact_neighbors`).
+    """
+    k = min(k, neighbors.shape[1])
+    recalls, latencies = [], []
+    t_start = time.perf_counter()
+    for qi, true_idx in zip(query_idx, neighbors):
+        t0 = time.perf_counter()
+        response = collection.query.near_vector(
+            near_vector=vectors[qi].tolist(),
+            target_vector=TARGET_VECTOR,
+            limit=k + 1,  # The query vector itself is in the collection, too
+            return_properties=[],
+        )
+        latencies.append(time.perf_counter() - t0)
+
+        found = [str(o.uuid) for o in response.objects if str(o.uuid) != uuids[qi]][:k]
+        expected = {uuids[i] for i in true_idx[:k]}
+        recalls.append(len(expected.intersection(found)) / k)
+    return float(np.mean(recalls)), np.array(latencies), time.perf_counter() - t_start
+
+
+def write_recall_results(results: List[RecallResult]) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    csv_path = RESULTS_DIR / "recall.csv"
+    is_new = not csv_path.exists()
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(RecallResult.__dataclass_fields__))
+        if is_new:
+            writer.writeheader()
+        writer.writerows(asdict(r) for r in results)
+    return csv_path
+
+
+@click.command()
+@click.option("--file-path", default="data/twitter_customer_support.h5", show_default=True)
+@click.option("--label", default="default", help="Name for this run, e.g. the quantizer in use.")
+@click.option("--k", default=10, show_default=True)
+@click.option("--queries", "n_queries", default=200, show_default=True, help="Number of sampled query vectors.")
+@click.option("--seed", default=42, show_default=True)
+@click.option("--ef", "ef_values", multiple=True, type=int, help="HNSW ef values to sweep. Default: leave as configured.")
+def main(file_path, label, k, n_queries, seed, ef_values):
+    """Measure recall@k & latency of the live collection against exact NumPy ground truth."""
+    results = []
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        if collection.config.get().multi_tenancy_config.enabled:
+            # The ground truth covers the whole file, but a search only covers one tenant
+            raise click.UsageError(
+                f"{CollectionName.SUPPORTCHAT.value} uses multi-tenancy; measure recall on a collection without it."
+            )
+        uuids, vectors, query_idx, neighbors = load_ground_truth(file_path, TARGET_VECTOR, n_queries, k, seed)
+        if neighbors.shape[1] < k:
+            print(f"Only {len(vectors)} objects; measuring recall@{neighbors.shape[1]} instead of recall@{k}")
+            k = neighbors.shape[1]
+        object_count = collection.aggregate.over_all(total_count=True).total_count
+        index_config = describe_index(collection)
+        timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+        # The sweep reconfigures the shared collection; put its ef back afterwards
+        original_ef = get_ef(collection) if ef_values else None
+        try:
+            for ef in ef_values or [None]:
+                if ef is not None:
+                    set_ef(collection, ef)
+                recall, latencies, seconds = evaluate(collection, uuids, vectors, query_idx, neighbors, k)
+                result = RecallResult(
+                    label=label,
+                    index_config=index_config,
+                    ef=ef,
+                    k=k,
+                    queries=len(query_idx),
+                    recall=recall,
+                    mean_ms=float(latencies.mean() * 1000),
+                    p50_ms=float(np.percentile(latencies, 50) * 1000),
+                    p95_ms=float(np.percentile(latencies, 95) * 1000),
+                    qps=len(query_idx) / seconds,
+                    object_count=object_count,
+                    timestamp=timestamp,
+                )
+                results.append(result)
+                print(
+                    f"{index_config:10} ef={str(ef):5} recall@{k} {recall:.3f}  "
+                    f"p50 {result.p50_ms:6.1f} ms  p95 {result.p95_ms:6.1f} ms  {result.qps:6.1f} QPS"
+                )
+        finally:
+            if original_ef is not None:
+                set_ef(collection, original_ef)
+                print(f"Restored ef={original_ef}")
+
+    print(f"Results appended to {write_recall_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Export engine: stream a collection once and write several size tiers in one pass.
+
+The UUID space is split into contiguous ranges. Each range (per tenant, with
+multi-tenancy) is read with its own cursor (`iterator(after=...)`) and connection in a
+worker process, and written to a columnar part file with buffered, chunked appends.
+Since the cursor returns objects in UUID order, concatenating the parts in range order
+gives the same order as a single cursor over the whole collection. The tier files (the
+first 10k, 50k, ... objects) are then all filled from one sequential read of the parts.
+
+    summary = parallel_export([10_000, 50_000], "cohere-embed-multilingual-light-v3.0", workers=4)
+    summary.print()
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import itertools
+import multiprocessing
+import os
+import queue
+import shutil
+import time
+import uuid as uuid_lib
+
+import numpy as np
+from tqdm import tqdm
+
+from helpers import CollectionName, connect_to_weaviate
+from hdf5_io import ColumnarWriter, VectorDtype, count_objects, read_slabs, scan_vector_ranges
+
+
+EXPORT_DIR = "export"
+EXPORT_PREFIX = "twitter_customer_support_weaviate_export"
+
+
+@dataclass
+class ExportRange:
+    """Objects with `after < uuid <= last` (either bound may be open), of one tenant."""
+
+    index: int
+    tenant: Optional[str]
+    after: Optional[str]
+    last: Optional[str]
+
+    def contains(self, uuid: uuid_lib.UUID) -> bool:
+        return self.last is None or uuid.int <= uuid_lib.UUID(self.last).int
+
+
+@dataclass
+class RangeExport:
+    range: ExportRange
+    part_path: str
+    exported: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ExportSummary:
+    workers: int
+    scan_seconds: float
+    write_seconds: float
+    ranges: List[RangeExport]
+    outputs: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def exported(self) -> int:
+        return sum(r.exported for r in self.ranges)
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.exported / self.scan_seconds if self.scan_seconds else 0.0
+
+    def print(self):
+        print(
+            f"Read {self.exported} objects with {self.workers} workers in {self.scan_seconds:.1f}s "
+            f"({self.objects_per_second:.0f} objects/s)."
+        )
+        written = sum(os.path.getsize(p) for p in self.outputs if os.path.exists(p))
+        print(
+            f"Wrote {len(self.outputs)} files ({written / 1e6:.1f} MB) in {self.write_seconds:.1f}s:"
+        )
+        for path, count in self.outputs.items():
+            print(f"  {path}: {count} objects")
+
+
+def uuid_ranges(parts: int, tenant: Optional[str] = None, first_index: int = 0) -> List[ExportRange]:
+    """Split the UUID space into `parts` equal, contiguous ranges."""
+    bounds = [(i * (1 << 128)) // parts - 1 for i in range(1, parts)]
+    lasts = [str(uuid_lib.UUID(int=b)) for b in bounds] + [None]
+    afters = [None] + lasts[:-1]
+    return [
+        ExportRange(first_index + i, tenant, after, last)
+        for i, (after, last) in enumerate(zip(afters, lasts))
+    ]
+
+
+def export_range(
+    export_range: ExportRange,
+    part_path: str,
+    cache_size: int = 1000,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> RangeExport:
+    """Stream one range of the collection into a columnar part file."""
+    result = RangeExport(range=export_range, part_path=part_path)
+    t0 = time.perf_counter()
+    with connect_to_weaviate() as client, ColumnarWriter(part_path) as writer:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        if export_range.tenant is not None:
+            collection = collection.with_tenant(export_range.tenant)
+
+        pending = 0
+        for obj in collection.iterator(
+            include_vector=True, after=export_range.after, cache_size=cache_size
+        ):
+            if not export_range.contains(obj.uuid):
+                break
+            writer.add(str(obj.uuid), obj.properties, obj.vector)
+            result.exported += 1
+            pending += 1
+            if on_progress and pending >= cache_size:
+                on_progress(pending)
+                pending = 0
+        if on_progress and pending:
+            on_progress(pending)
+
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def _export_worker(args) -> RangeExport:
+    export_range_, part_path, cache_size, progress_queue = args
+    return export_range(export_range_, part_path, cache_size, on_progress=progress_queue.put)
+
+
+def output_path(size: int, model_suffix: str, tenant: Optional[str] = None, export_dir: str = EXPORT_DIR) -> str:
+    tenant_suffix = f"_{tenant}" if tenant else ""
+    return f"{export_dir}/{EXPORT_PREFIX}_{size}_{model_suffix}{tenant_suffix}.h5"
+
+
+def _merged_vector_ranges(part_paths: Sequence[str]):
+    ranges = {}
+    for part_path in part_paths:
+        if count_objects(part_path) == 0:
+            continue
+        for name, (low, high) in scan_vector_ranges(part_path).items():
+            if name in ranges:
+                low, high = np.minimum(ranges[name][0], low), np.maximum(ranges[name][1], high)
+            ranges[name] = (low, high)
+    return ranges
+
+
+def write_tiers(
+    part_paths: Sequence[str], tier_paths: Dict[int, str], vector_dtype: VectorDtype = "float32"
+) -> Dict[str, int]:
+    """Fill every tier file (`size -> path`) with the first `size` objects of the concatenated parts."""
+    # int8 scales are calibrated on all exported vectors (the parts are float32)
+    ranges = _merged_vector_ranges(part_paths) if vector_dtype == "int8" else None
+    writers = {
+        size: ColumnarWriter(path, vector_dtype=vector_dtype, vector_ranges=ranges)
+        for size, path in tier_paths.items()
+    }
+    try:
+        for part_path in part_paths:
+            if all(len(w) >= size for size, w in writers.items()):
+                break  # Every tier is full; the remaining parts aren't needed
+            if count_objects(part_path) == 0:
+                continue  # A UUID range can be empty (e.g. several workers on a small collection)
+            for slab in read_slabs(part_path):
+                open_writers = [(size, w) for size, w in writers.items() if len(w) < size]
+                if not open_writers:
+                    break
+                for size, writer in open_writers:
+                    needed = size - len(writer)
+                    if needed >= len(slab):
+                        writer.add_slab(slab)
+                    else:
+                        for uuid, properties, vectors in itertools.islice(slab.rows(), needed):
+                            writer.add(uuid, properties, vectors)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {tier_paths[size]: writers[size].count for size in tier_paths}
+
+
+def tenant_object_counts(tenants: Optional[Sequence[str]] = None) -> Dict[Optional[str], int]:
+    """Object count per tenant (all tenants unless given), or `{None: count}` without multi-tenancy."""
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        if not collection.config.get().multi_tenancy_config.enabled:
+            return {None: len(collection)}
+        tenants = tenants or sorted(collection.tenants.get().keys())
+        return {t: len(collection.with_tenant(t)) for t in tenants}
+
+
+def parallel_export(
+    sizes: Sequence[int],
+    model_suffix: str,
+    workers: int = 1,
+    tenants: Optional[Sequence[str]] = None,
+    cache_size: int = 1000,
+    export_dir: str = EXPORT_DIR,
+    overwrite: bool = False,
+    vector_dtype: VectorDtype = "float32",
+) -> ExportSummary:
+    """Export the first `size` objects for every size in `sizes`, reading the collection once.
+
+    With multi-tenancy, each tenant (all of them unless `tenants` is given) gets its own
+    set of tier files. `vector_dtype` sets how the tier files store vectors (see `hdf5_io`).
+    """
+    counts = tenant_object_counts(tenants)
+    Path(export_dir).mkdir(parents=True, exist_ok=True)
+
+    # Tiers larger than the collection collapse into one file of everything
+    tier_paths: Dict[Optional[str], Dict[int, str]] = {}
+    for tenant, count in counts.items():
+        paths = tier_paths[tenant] = {}
+        for size in sorted(set(sizes)):
+            actual = min(size, count)
+            if actual > 0:
+                paths.setdefault(actual, output_path(actual, model_suffix, tenant, export_dir))
+    for paths in tier_paths.values():
+        for path in paths.values():
+            if os.path.exists(path) and not overwrite:
+                raise FileExistsError(f"File {path} already exists. Please remove it first.")
+
+    parts_dir = Path(export_dir) / f".parts-{os.getpid()}"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    ranges: List[ExportRange] = []
+    for tenant in counts:
+        ranges += uuid_ranges(max(1, workers), tenant, first_index=len(ranges))
+    jobs = [(r, str(parts_dir / f"part-{r.index:04d}.h5"), cache_size) for r in ranges]
+
+    t0 = time.perf_counter()
+    progress_bar = tqdm(total=sum(counts.values()), desc="Exporting objects", unit="obj")
+    try:
+        if workers == 1:
+            results = [
+                export_range(r, path, cache_size, on_progress=progress_bar.update) for r, path, _ in jobs
+            ]
+        else:
+            # gRPC channels don't survive fork(), so always start fresh interpreters
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Manager() as manager, ProcessPoolExecutor(
+                max_workers=workers, mp_context=ctx
+            ) as executor:
+                progress_queue = manager.Queue()
+                futures = [executor.submit(_export_worker, (*job, progress_queue)) for job in jobs]
+                while not all(f.done() for f in futures) or not progress_queue.empty():
+                    try:
+                        progress_bar.update(progress_queue.get(timeout=0.5))
+                    except queue.Empty:
+                        continue
+                    progress_bar.set_postfix(rate=f"{progress_bar.n / (time.perf_counter() - t0):.0f}/s")
+                results = [f.result() for f in futures]
+        progress_bar.close()
+        scan_seconds = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        outputs: Dict[str, int] = {}
+        for tenant, paths in tier_paths.items():
+            part_paths = [r.part_path for r in results if r.range.tenant == tenant]
+            outputs.update(write_tiers(part_paths, paths, vector_dtype))
+        write_seconds = time.perf_counter() - t1
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    return ExportSummary(
+        workers=workers,
+        scan_seconds=scan_seconds,
+        write_seconds=write_seconds,
+        ranges=results,
+        outputs=outputs,
+    )
@@ -0,0 +1,490 @@
+"""Read & write the HDF5 export files used by the workshop import scripts.
+
+Two layouts are supported:
+
+- "legacy": one group per object UUID, each holding `vector_<name>`, a JSON `object`
+  dataset and a `uuid` dataset. This is what the original pre-vectorized downloads use.
+- "columnar" (format version 2): a `/uuid` column, one contiguous `(N, dim)` float32
+  dataset per named vector under `/vectors`, and one chunked, compressed column per
+  property under `/properties`. A boolean column per property under `/nulls` marks
+  the objects without that property; they are read back as None.
+- "columnar" with quantized vectors (format version 3): as above, but vectors may be
+  stored as float16, or as int8 with a per-dimension `scale` & `offset` (dataset
+  attributes). They are dequantized back to float32 as slabs are read.
+
+Both layouts are read through `read_slabs`, so the importers don't need to care which
+one they were given.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+import json
+import os
+
+import h5py
+import numpy as np
+
+
+FORMAT_NAME = "weaviate-columnar-export"
+FORMAT_VERSION = 3
+# Files with float32 vectors are still written as version 2, so older readers can use them
+FLOAT32_FORMAT_VERSION = 2
+
+DEFAULT_SLAB_SIZE = 10_000
+DEFAULT_CHUNK_ROWS = 4096
+
+UUID_DTYPE = "S36"
+TEXT_DTYPE = h5py.string_dtype(encoding="utf-8")
+
+Layout = Literal["columnar", "legacy"]
+VectorDtype = Literal["float32", "float16", "int8"]
+
+INT8_LEVELS = 127
+
+
+@dataclass
+class Slab:
+    """A contiguous range of objects, held column-wise."""
+
+    start: int
+    uuids: List[str]
+    properties: Dict[str, List[Any]]
+    vectors: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def rows(self) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, np.ndarray]]]:
+        """Yield (uuid, properties, vectors) per object; vectors are views into the slab."""
+        columns = list(self.properties.items())
+        for i, uuid in enumerate(self.uuids):
+            properties = {k: col[i] for k, col in columns if col[i] is not None}
+            vectors = {name: arr[i] for name, arr in self.vectors.items()}
+            yield uuid, properties, vectors
+
+    def row(self, i: int) -> Tuple[str, Dict[str, Any], Dict[str, np.ndarray]]:
+        """The (uuid, properties, vectors) of the `i`-th object of the slab."""
+        properties = {k: col[i] for k, col in self.properties.items() if col[i] is not None}
+        return self.uuids[i], properties, {name: arr[i] for name, arr in self.vectors.items()}
+
+
+def _column_kind(value: Any) -> str:
+    # bool is a subclass of int, so check it first
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, datetime):
+        return "date"
+    return "text"
+
+
+_KIND_DTYPES = {
+    "bool": np.bool_,
+    "int": np.int64,
+    "float": np.float64,
+    "date": TEXT_DTYPE,
+    "text": TEXT_DTYPE,
+}
+
+# Placeholders for missing values; the `/nulls` columns tell them apart from real ones
+_KIND_EMPTY = {"bool": False, "int": 0, "float": float("nan"), "date": "", "text": ""}
+
+
+def _to_column_value(value: Any, kind: str) -> Any:
+    if value is None:
+        return _KIND_EMPTY[kind]
+    if kind == "date" and isinstance(value, datetime):
+        return value.isoformat()
+    if kind == "text" and not isinstance(value, str):
+        return json.dumps(value)
+    return value
+
+
+def vector_ranges(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-dimension (min, max) of an `(N, dim)` array."""
+    return vectors.min(axis=0), vectors.max(axis=0)
+
+
+def int8_params(low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(scale, offset) mapping `[low, high]` onto `[-127, 127]`, per dimension."""
+    offset = (high + low) / 2
+    scale = (high - low) / (2 * INT8_LEVELS)
+    return np.where(scale > 0, scale, 1.0).astype(np.float32), offset.astype(np.float32)
+
+
+def quantize(vectors: np.ndarray, dtype: VectorDtype, scale=None, offset=None) -> np.ndarray:
+    if dtype == "float32":
+        return np.asarray(vectors, dtype=np.float32)
+    if dtype == "float16":
+        return np.asarray(vectors, dtype=np.float16)
+    q = np.rint((np.asarray(vectors, dtype=np.float32) - offset) / scale)
+    # Values outside the calibrated range are clipped
+    return np.clip(q, -INT8_LEVELS, INT8_LEVELS).astype(np.int8)
+
+
+def dequantize(ds: h5py.Dataset, stored: np.ndarray) -> np.ndarray:
+    """float32 vectors from a slice of a (possibly quantized) vector dataset."""
+    if ds.attrs.get("encoding") == "int8":
+        return stored.astype(np.float32) * ds.attrs["scale"] + ds.attrs["offset"]
+    return stored.astype(np.float32, copy=False)
+
+
+def vector_encoding(file_path: str) -> Optional[str]:
+    """How a columnar file stores its vectors (`float32`, `float16` or `int8`), or None for legacy files."""
+    with h5py.File(file_path, "r") as hf:
+        if detect_layout(hf) != "columnar" or "vectors" not in hf:
+            return None
+        encodings = {ds.attrs.get("encoding", "float32") for ds in hf["vectors"].values()}
+        return encodings.pop() if len(encodings) == 1 else "mixed"
+
+
+def detect_layout(hf: h5py.File) -> Layout:
+    """Tell the columnar and the legacy (group-per-object) layouts apart."""
+    if hf.attrs.get("format") == FORMAT_NAME:
+        version = int(hf.attrs["format_version"])
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"{hf.filename} uses format version {version}; "
+                f"this reader only supports up to version {FORMAT_VERSION}."
+            )
+        return "columnar"
+    return "legacy"
+
+
+def _columnar_count(hf: h5py.File) -> int:
+    # Files written without any object may lack the datasets altogether
+    return hf["uuid"].shape[0] if "uuid" in hf else 0
+
+
+def count_objects(file_path: str) -> int:
+    with h5py.File(file_path, "r") as hf:
+        if detect_layout(hf) == "columnar":
+            return _columnar_count(hf)
+        return len(hf.keys())
+
+
+# A contiguous range of rows, or ascending row indices
+Selection = Union[slice, np.ndarray]
+
+
+def _read_column(hf: h5py.File, name: str, selection: Selection) -> List[Any]:
+    ds = hf["properties"][name]
+    values = (ds.asstr()[selection] if ds.dtype.kind == "O" else ds[selection]).tolist()
+    if "nulls" in hf and name in hf["nulls"]:
+        nulls = hf["nulls"][name][selection]
+        values = [None if null else value for value, null in zip(values, nulls)]
+    return values
+
+
+def _read_columnar_slab(hf: h5py.File, start: int, selection: Selection) -> Slab:
+    uuids = hf["uuid"][selection].astype(f"U{UUID_DTYPE[1:]}").tolist()
+    properties = {name: _read_column(hf, name, selection) for name in hf["properties"]}
+
+    vectors = {name: dequantize(ds, ds[selection]) for name, ds in hf["vectors"].items()}
+    return Slab(start=start, uuids=uuids, properties=properties, vectors=vectors)
+
+
+def _read_legacy_slab(hf: h5py.File, start: int, keys: Sequence[str]) -> Slab:
+    objects = []
+    vectors: Dict[str, List[np.ndarray]] = {}
+    for uuid in keys:
+        group = hf[uuid]
+        objects.append(json.loads(group["object"][()]))
+        for key in group.keys():
+            if key.startswith("vector_"):
+                vectors.setdefault(key.split("_", 1)[1], []).append(group[key][()])
+
+    names = list(dict.fromkeys(k for obj in objects for k in obj))
+    properties = {name: [obj.get(name) for obj in objects] for name in names}
+    return Slab(
+        start=start,
+        uuids=list(keys),
+        properties=properties,
+        vectors={name: np.stack(vs).astype(np.float32, copy=False) for name, vs in vectors.items()},
+    )
+
+
+def read_slabs(
+    file_path: str,
+    slab_size: int = DEFAULT_SLAB_SIZE,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[Slab]:
+    """Yield objects `[start, stop)` from an export file, `slab_size` objects at a time."""
+    with h5py.File(file_path, "r") as hf:
+        if detect_layout(hf) == "columnar":
+            total = _columnar_count(hf)
+            read_slab = lambda a, b: _read_columnar_slab(hf, a, slice(a, b))  # noqa: E731
+        else:
+            keys = list(hf.keys())
+            total = len(keys)
+            read_slab = lambda a, b: _read_legacy_slab(hf, a, keys[a:b])  # noqa: E731
+
+        stop = total if stop is None else min(stop, total)
+        for slab_start in range(start, stop, slab_size):
+            yield read_slab(slab_start, min(slab_start + slab_size, stop))
+
+
+def read_rows(file_path: str, indices: Sequence[int], slab_size: int = DEFAULT_SLAB_SIZE) -> Iterator[Slab]:
+    """Yield the objects at `indices` (ascending), `slab_size` at a time, reading only those rows.
+
+    The slabs are not contiguous: `start` is the index of their first object, and the
+    objects are in the order of `indices`.
+    """
+    with h5py.File(file_path, "r") as hf:
+        columnar = detect_layout(hf) == "columnar"
+        keys = None if columnar else list(hf.keys())
+        for i in range(0, len(indices), slab_size):
+            selection = np.asarray(indices[i : i + slab_size], dtype=np.int64)
+            if columnar:
+                yield _read_columnar_slab(hf, int(selection[0]), selection)
+            else:
+                yield _read_legacy_slab(hf, int(selection[0]), [keys[j] for j in selection])
+
+
+def read_property(file_path: str, name: str, slab_size: int = DEFAULT_SLAB_SIZE) -> List[Any]:
+    """One property of every object, without reading the vectors of columnar files."""
+    with h5py.File(file_path, "r") as hf:
+        if detect_layout(hf) == "columnar":
+            total = _columnar_count(hf)
+            if total == 0 or name not in hf["properties"]:
+                return [None] * total
+            return _read_column(hf, name, slice(0, total))
+    return [value for slab in read_slabs(file_path, slab_size=slab_size) for value in slab.properties.get(name, [None] * len(slab))]
+
+
+def read_vectors(
+    file_path: str, vector_name: str, slab_size: int = DEFAULT_SLAB_SIZE
+) -> Tuple[List[str], np.ndarray]:
+    """All UUIDs and the `(N, dim)` float32 array of one named vector."""
+    with h5py.File(file_path, "r") as hf:
+        if detect_layout(hf) == "columnar":
+            if _columnar_count(hf) == 0:
+                return [], np.zeros((0, 0), dtype=np.float32)
+            uuids = hf["uuid"][:].astype(f"U{UUID_DTYPE[1:]}").tolist()
+            ds = hf["vectors"][vector_name]
+            return uuids, dequantize(ds, ds[:])
+
+    uuids, blocks = [], []
+    for slab in read_slabs(file_path, slab_size=slab_size):
+        uuids.extend(slab.uuids)
+        blocks.append(slab.vectors[vector_name])
+    return uuids, np.concatenate(blocks)
+
+
+class ColumnarWriter:
+    """Buffered writer for the columnar layout.
+
+    Objects are collected in memory and appended to resizable, chunked datasets
+    `buffer_rows` at a time. Vector dimensions are fixed by the first flush; a property
+    first seen later gets a column of its own, null for the objects before it.
+
+    With `vector_dtype="int8"`, each dimension is scaled to its range, so `vector_ranges`
+    (name -> (min, max) arrays over all the vectors to be written, e.g. from
+    `scan_vector_ranges`) is required: values outside it would be clipped.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        buffer_rows: int = DEFAULT_SLAB_SIZE,
+        compression: Optional[str] = "gzip",
+        vector_dtype: VectorDtype = "float32",
+        vector_ranges: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+    ):
+        self.file_path = file_path
+        self.chunk_rows = chunk_rows
+        self.buffer_rows = buffer_rows
+        self.compression = compression
+        if vector_dtype == "int8" and vector_ranges is None:
+            raise ValueError("int8 vectors need vector_ranges, e.g. from scan_vector_ranges().")
+        self.vector_dtype = vector_dtype
+        self.vector_ranges = vector_ranges or {}
+        self.count = 0
+
+        self._hf = h5py.File(file_path, "w")
+        self._hf.attrs["format"] = FORMAT_NAME
+        self._hf.attrs["format_version"] = (
+            FLOAT32_FORMAT_VERSION if vector_dtype == "float32" else FORMAT_VERSION
+        )
+        self._kinds: Dict[str, str] = {}
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._uuids: List[str] = []
+        self._properties: List[Dict[str, Any]] = []
+        self._vectors: Dict[str, List[Any]] = {}
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        """Objects added so far, including those not flushed yet."""
+        return self.count + len(self._uuids)
+
+    def add(self, uuid: str, properties: Dict[str, Any], vectors: Dict[str, Any]):
+        self._uuids.append(str(uuid))
+        self._properties.append(properties)
+        for name, vector in vectors.items():
+            self._vectors.setdefault(name, []).append(vector)
+        if len(self._uuids) >= self.buffer_rows:
+            self.flush()
+
+    def add_slab(self, slab: Slab):
+        for uuid, properties, vectors in slab.rows():
+            self.add(uuid, properties, vectors)
+
+    def _create_datasets(self):
+        self._hf.create_dataset(
+            "uuid", shape=(0,), maxshape=(None,), dtype=UUID_DTYPE, chunks=(self.chunk_rows,)
+        )
+
+        self._hf.create_group("properties")
+        self._hf.create_group("nulls")
+
+        vectors_group = self._hf.create_group("vectors")
+        for name, vectors in self._vectors.items():
+            dim = len(vectors[0])
+            ds = vectors_group.create_dataset(
+                name,
+                shape=(0, dim),
+                maxshape=(None, dim),
+                dtype=np.dtype(self.vector_dtype),
+                chunks=(min(self.chunk_rows, 1024), dim),
+            )
+            ds.attrs["encoding"] = self.vector_dtype
+            if self.vector_dtype == "int8":
+                if name not in self.vector_ranges:
+                    raise ValueError(f"No int8 range for vector '{name}'.")
+                ds.attrs["scale"], ds.attrs["offset"] = int8_params(*self.vector_ranges[name])
+
+    def _add_property_columns(self):
+        for obj in self._properties:
+            for name, value in obj.items():
+                if name in self._kinds or value is None:
+                    continue
+                kind = self._kinds[name] = _column_kind(value)
+                # Objects written before this property appeared don't have it
+                ds = self._hf["properties"].create_dataset(
+                    name,
+                    shape=(self.count,),
+                    maxshape=(None,),
+                    dtype=_KIND_DTYPES[kind],
+                    chunks=(self.chunk_rows,),
+                    compression=self.compression,
+                )
+                ds.attrs["kind"] = kind
+                self._hf["nulls"].create_dataset(
+                    name,
+                    shape=(self.count,),
+                    maxshape=(None,),
+                    dtype=np.bool_,
+                    chunks=(self.chunk_rows,),
+                    compression=self.compression,
+                    fillvalue=True,
+                )
+
+    def flush(self):
+        n = len(self._uuids)
+        if n == 0:
+            return
+        if "uuid" not in self._hf:
+            self._create_datasets()
+        self._add_property_columns()
+
+        start, stop = self.count, self.count + n
+
+        uuid_ds = self._hf["uuid"]
+        uuid_ds.resize((stop,))
+        uuid_ds[start:stop] = np.array(self._uuids, dtype=UUID_DTYPE)
+
+        for name, kind in self._kinds.items():
+            ds = self._hf["properties"][name]
+            ds.resize((stop,))
+            ds[start:stop] = np.array(
+                [_to_column_value(obj.get(name), kind) for obj in self._properties],
+                dtype=_KIND_DTYPES[kind],
+            )
+            nulls = self._hf["nulls"][name]
+            nulls.resize((stop,))
+            nulls[start:stop] = np.array([obj.get(name) is None for obj in self._properties])
+
+        for name, vectors in self._vectors.items():
+            if len(vectors) != n:
+                raise ValueError(f"Vector '{name}' is missing for some objects.")
+            ds = self._hf["vectors"][name]
+            ds.resize((stop, ds.shape[1]))
+            ds[start:stop] = quantize(
+                vectors, self.vector_dtype, ds.attrs.get("scale"), ds.attrs.get("offset")
+            )
+
+        self.count = stop
+        self._reset_buffer()
+
+    def close(self):
+        if self._hf.id.valid:
+            self.flush()
+            if "uuid" not in self._hf:
+                # Readable (as zero objects) even if nothing was added
+                self._create_datasets()
+            self._hf.attrs["count"] = self.count
+            self._hf.close()
+
+
+def scan_vector_ranges(file_path: str, slab_size: int = DEFAULT_SLAB_SIZE) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Per-dimension (min, max) of every named vector in a file, for int8 calibration."""
+    ranges: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for slab in read_slabs(file_path, slab_size=slab_size):
+        for name, vectors in slab.vectors.items():
+            low, high = vector_ranges(vectors)
+            if name in ranges:
+                low, high = np.minimum(ranges[name][0], low), np.maximum(ranges[name][1], high)
+            ranges[name] = (low, high)
+    return ranges
+
+
+def convert_to_columnar(
+    src_path: str,
+    dst_path: str,
+    slab_size: int = DEFAULT_SLAB_SIZE,
+    vector_dtype: VectorDtype = "float32",
+) -> int:
+    """Rewrite an export file (of either layout) in the columnar layout."""
+    ranges = scan_vector_ranges(src_path, slab_size) if vector_dtype == "int8" else None
+    with ColumnarWriter(
+        dst_path, buffer_rows=slab_size, vector_dtype=vector_dtype, vector_ranges=ranges
+    ) as writer:
+        for slab in read_slabs(src_path, slab_size=slab_size):
+            writer.add_slab(slab)
+    return writer.count
+
+
+def convert_in_place(
+    file_path: str,
+    slab_size: int = DEFAULT_SLAB_SIZE,
+    vector_dtype: VectorDtype = "float32",
+    before_replace: Optional[Callable[[str, str], None]] = None,
+) -> bool:
+    """Convert a file to the columnar layout with `vector_dtype` vectors, replacing it.
+
+    `before_replace(original, converted)` is called before the original is replaced, e.g.
+    to compare the two. Returns False if the file already was in that form.
+    """
+    if vector_encoding(file_path) == vector_dtype:
+        return False
+
+    tmp_path = str(Path(file_path).with_suffix(".columnar.part"))
+    convert_to_columnar(file_path, tmp_path, slab_size=slab_size, vector_dtype=vector_dtype)
+    if before_replace is not None:
+        before_replace(file_path, tmp_path)
+    os.replace(tmp_path, file_path)
+    return True
@@ -0,0 +1,335 @@
+"""Read Weaviate's Go heap profiles (`/debug/pprof/heap`) without the Go toolchain.
+
+The endpoint returns a gzipped `profile.proto` message. `parse_profile` decodes the
+handful of fields needed for heap analysis straight from the protobuf wire format, and
+`HeapProfile` gives totals, top allocation sites (flat or cumulative) and a breakdown by
+Weaviate subsystem. `diff_profiles` compares two snapshots, e.g. before & after an import.
+
+    python heap_profile.py top
+    python heap_profile.py save before.pb.gz
+    ... run the import ...
+    python heap_profile.py diff before.pb.gz
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Tuple
+import gzip
+import time
+
+import click
+import requests
+
+
+PPROF_HEAP_URL = "http://localhost:6060/debug/pprof/heap"
+
+# Package path fragments -> subsystem, checked in order against each frame's function name
+SUBSYSTEMS = [
+    ("compressionhelpers", "compression"),
+    ("vector/hnsw", "hnsw"),
+    ("vector/flat", "flat index"),
+    ("vector/dynamic", "dynamic index"),
+    ("lsmkv", "lsm store"),
+    ("inverted", "inverted index"),
+    ("/modules/", "modules"),
+    ("usecases/objects", "objects"),
+    ("adapters/handlers", "api handlers"),
+    ("google.golang.org/grpc", "grpc"),
+    ("cluster", "cluster / raft"),
+]
+OTHER_SUBSYSTEM = "other"
+
+MIB = 1024 * 1024
+
+
+def _varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield (field number, wire type, value) for one protobuf message.
+
+    Varints are returned as ints and length-delimited fields as bytes; fixed-width fields
+    are skipped, as profile.proto doesn't use them.
+    """
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _varint(buf, pos)
+            value = buf[pos : pos + length]
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+            continue
+        elif wire_type == 5:
+            pos += 4
+            continue
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield number, wire_type, value
+
+
+def _packed(wire_type: int, value) -> List[int]:
+    """Repeated integer fields may be packed (one bytes value) or not (one varint each)."""
+    if wire_type == 0:
+        return [value]
+    out, pos = [], 0
+    while pos < len(value):
+        v, pos = _varint(value, pos)
+        out.append(v)
+    return out
+
+
+def _signed(v: int) -> int:
+    # int64 values are encoded as 64-bit two's complement varints
+    return v - (1 << 64) if v >= 1 << 63 else v
+
+
+def subsystem_of(function_name: str) -> str:
+    for fragment, subsystem in SUBSYSTEMS:
+        if fragment in function_name:
+            return subsystem
+    return OTHER_SUBSYSTEM
+
+
+@dataclass
+class HeapProfile:
+    """A decoded heap profile. Each sample is (stack, values); stacks are leaf-first function names."""
+
+    sample_types: List[str]
+    samples: List[Tuple[Tuple[str, ...], Tuple[int, ...]]]
+    time_nanos: int = 0
+    _totals: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def _index(self, sample_type: str) -> int:
+        if sample_type not in self.sample_types:
+            raise KeyError(f"'{sample_type}' not in profile; available: {self.sample_types}")
+        return self.sample_types.index(sample_type)
+
+    def total(self, sample_type: str = "inuse_space") -> int:
+        if sample_type not in self._totals:
+            i = self._index(sample_type)
+            self._totals[sample_type] = sum(values[i] for _, values in self.samples)
+        return self._totals[sample_type]
+
+    def by_function(self, sample_type: str = "inuse_space", cumulative: bool = False) -> Dict[str, int]:
+        """Bytes (or objects) per function: allocated directly (flat), or anywhere below it (cumulative)."""
+        i = self._index(sample_type)
+        totals: Dict[str, int] = defaultdict(int)
+        for stack, values in self.samples:
+            if not stack:
+                continue
+            if cumulative:
+                # Count recursive functions once per sample
+                for name in set(stack):
+                    totals[name] += values[i]
+            else:
+                totals[stack[0]] += values[i]
+        return dict(totals)
+
+    def top(
+        self, n: int = 10, sample_type: str = "inuse_space", cumulative: bool = False
+    ) -> List[Tuple[str, int]]:
+        totals = self.by_function(sample_type, cumulative)
+        return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+    def by_subsystem(self, sample_type: str = "inuse_space") -> Dict[str, int]:
+        """Attribute each sample to the innermost frame that belongs to a known subsystem."""
+        i = self._index(sample_type)
+        totals: Dict[str, int] = defaultdict(int)
+        for stack, values in self.samples:
+            subsystem = next(
+                (s for s in map(subsystem_of, stack) if s != OTHER_SUBSYSTEM), OTHER_SUBSYSTEM
+            )
+            totals[subsystem] += values[i]
+        return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def parse_profile(data: bytes) -> HeapProfile:
+    """Decode a (optionally gzipped) pprof `profile.proto` message."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+
+    strings: List[bytes] = []
+    sample_types: List[Tuple[int, int]] = []
+    raw_samples: List[Tuple[List[int], List[int]]] = []
+    locations: Dict[int, List[int]] = {}
+    functions: Dict[int, int] = {}
+    time_nanos = 0
+
+    for number, wire_type, value in _fields(data):
+        if number == 1:  # sample_type: ValueType
+            vt = {n: v for n, _, v in _fields(value)}
+            sample_types.append((vt.get(1, 0), vt.get(2, 0)))
+        elif number == 2:  # sample
+            location_ids, values = [], []
+            for n, wt, v in _fields(value):
+                if n == 1:
+                    location_ids.extend(_packed(wt, v))
+                elif n == 2:
+                    values.extend(_signed(x) for x in _packed(wt, v))
+            raw_samples.append((location_ids, values))
+        elif number == 4:  # location
+            location_id, function_ids = 0, []
+            for n, _, v in _fields(value):
+                if n == 1:
+                    location_id = v
+                elif n == 4:  # line: function_id is field 1
+                    function_ids.extend(fv for fn, _, fv in _fields(v) if fn == 1)
+            # Lines are innermost-first, matching the leaf-first order of the sample's locations
+            locations[location_id] = function_ids
+        elif number == 5:  # function
+            fields = {n: v for n, _, v in _fields(value)}
+            functions[fields.get(1, 0)] = fields.get(2, 0)
+        elif number == 6:  # string_table
+            strings.append(value)
+        elif number == 9:
+            time_nanos = value
+
+    def text(index: int) -> str:
+        return strings[index].decode("utf-8", "replace") if index < len(strings) else ""
+
+    function_names = {fid: text(name) for fid, name in functions.items()}
+    stacks: Dict[Tuple[int, ...], Tuple[str, ...]] = {}
+    samples = []
+    for location_ids, values in raw_samples:
+        key = tuple(location_ids)
+        if key not in stacks:
+            stacks[key] = tuple(
+                function_names.get(fid, "?") for lid in location_ids for fid in locations.get(lid, [])
+            )
+        samples.append((stacks[key], tuple(values)))
+
+    return HeapProfile(
+        sample_types=[text(t) for t, _ in sample_types], samples=samples, time_nanos=time_nanos
+    )
+
+
+def fetch_heap_profile_bytes(url: str = PPROF_HEAP_URL, timeout: float = 10.0) -> bytes:
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def fetch_heap_profile(url: str = PPROF_HEAP_URL, timeout: float = 10.0) -> HeapProfile:
+    return parse_profile(fetch_heap_profile_bytes(url, timeout))
+
+
+def load_profile(path: str) -> HeapProfile:
+    with open(path, "rb") as f:
+        return parse_profile(f.read())
+
+
+@dataclass
+class ProfileDiff:
+    sample_type: str
+    total_before: int
+    total_after: int
+    functions: List[Tuple[str, int]]
+    subsystems: List[Tuple[str, int]]
+
+    @property
+    def total_delta(self) -> int:
+        return self.total_after - self.total_before
+
+
+def _delta(before: Dict[str, int], after: Dict[str, int]) -> List[Tuple[str, int]]:
+    deltas = {k: after.get(k, 0) - before.get(k, 0) for k in before.keys() | after.keys()}
+    return sorted(((k, d) for k, d in deltas.items() if d), key=lambda kv: abs(kv[1]), reverse=True)
+
+
+def diff_profiles(
+    before: HeapProfile,
+    after: HeapProfile,
+    sample_type: str = "inuse_space",
+    n: int = 20,
+    cumulative: bool = False,
+) -> ProfileDiff:
+    """Change per function and per subsystem between two snapshots, largest changes first."""
+    return ProfileDiff(
+        sample_type=sample_type,
+        total_before=before.total(sample_type),
+        total_after=after.total(sample_type),
+        functions=_delta(
+            before.by_function(sample_type, cumulative), after.by_function(sample_type, cumulative)
+        )[:n],
+        subsystems=_delta(before.by_subsystem(sample_type), after.by_subsystem(sample_type)),
+    )
+
+
+def _format_amount(value: int, sample_type: str) -> str:
+    if sample_type.endswith("_space"):
+        return f"{value / MIB:10.2f} MB"
+    return f"{value:10d}   "
+
+
+@click.group()
+def cli():
+    """Inspect Weaviate heap profiles without `go tool pprof`."""
+
+
+@cli.command()
+@click.option("--url", default=PPROF_HEAP_URL, show_default=True)
+@click.option("--sample-type", default="inuse_space", show_default=True)
+@click.option("--n", default=15, show_default=True)
+@click.option("--cum", is_flag=True, help="Sort by cumulative rather than flat allocations.")
+def top(url, sample_type, n, cum):
+    """Show the total and the top allocation sites & subsystems."""
+    profile = fetch_heap_profile(url)
+    total = profile.total(sample_type)
+    print(f"{sample_type} total: {_format_amount(total, sample_type).strip()}")
+    for name, value in profile.top(n, sample_type, cumulative=cum):
+        print(f"{_format_amount(value, sample_type)}  {value / total if total else 0:6.1%}  {name}")
+    print()
+    for subsystem, value in profile.by_subsystem(sample_type).items():
+        print(f"{_format_amount(value, sample_type)}  {value / total if total else 0:6.1%}  {subsystem}")
+
+
+@cli.command()
+@click.argument("path")
+@click.option("--url", default=PPROF_HEAP_URL, show_default=True)
+def save(path, url):
+    """Save a heap profile snapshot to PATH."""
+    with open(path, "wb") as f:
+        f.write(fetch_heap_profile_bytes(url))
+    print(f"Saved heap profile to {path} at {time.strftime('%H:%M:%S')}")
+
+
+@cli.command()
+@click.argument("before")
+@click.argument("after", required=False)
+@click.option("--url", default=PPROF_HEAP_URL, show_default=True, help="Used when AFTER is not given.")
+@click.option("--sample-type", default="inuse_space", show_default=True)
+@click.option("--n", default=15, show_default=True)
+@click.option("--cum", is_flag=True, help="Compare cumulative rather than flat allocations.")
+def diff(before, after, url, sample_type, n, cum):
+    """Compare snapshot BEFORE with AFTER (or with the live profile)."""
+    after_profile = load_profile(after) if after else fetch_heap_profile(url)
+    result = diff_profiles(load_profile(before), after_profile, sample_type, n, cumulative=cum)
+
+    print(
+        f"{sample_type}: {_format_amount(result.total_before, sample_type).strip()} -> "
+        f"{_format_amount(result.total_after, sample_type).strip()} "
+        f"({_format_amount(result.total_delta, sample_type).strip()})"
+    )
+    print("\nBy subsystem:")
+    for name, delta in result.subsystems:
+        print(f"{_format_amount(delta, sample_type)}  {name}")
+    print("\nBy function:")
+    for name, delta in result.functions:
+        print(f"{_format_amount(delta, sample_type)}  {name}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -2,17 +2,27 @@
 
 from enum import Enum
 from datasets import load_dataset
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil import parser
-from typing import Dict, Union, List, Literal, Optional
-from collections.abc import Iterator
-import subprocess
-import json
+from typing import Callable, Dict, FrozenSet, Union, List, Literal, Optional, Tuple
+from dataclasses import dataclass, field, replace
 from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
 import weaviate
 from weaviate import WeaviateClient
 from weaviate.collections import Collection
-from weaviate.classes.query import Filter
+from weaviate.classes.query import Filter, MetadataQuery, Metrics
+from weaviate.collections.classes.filters import _Filters
+from weaviate.util import generate_uuid5
+import pyarrow as pa
+import pyarrow.compute as pc
+from hdf5_io import Slab
+from query_cache import QueryCache
+from embeddings import EmbeddingCache, embedder_from_spec
+from heap_profile import HeapProfile, PPROF_HEAP_URL, fetch_heap_profile
 import os
 
 
@@ -22,9 +32,15 @@ class CollectionName(str, Enum):
     SUPPORTCHAT = "SupportChat"
 
 
-def connect_to_weaviate() -> WeaviateClient:
+def connect_to_weaviate(
+    host: str = "localhost",
+    port: int = 8080,  # For Kubernetes, use 80
+    grpc_port: int = 50051,
+) -> WeaviateClient:
     client = weaviate.connect_to_local(
-        port=8080,  # For Kubernetes, use 80
+        host=host,
+        port=port,
+        grpc_port=grpc_port,
         headers={
             "X-ANTHROPIC-API-KEY": os.environ["ANTHROPIC_API_KEY"],
             "X-OPENAI-API-KEY": os.environ["OPENAI_API_KEY"],
@@ -40,68 +56,204 @@ def get_collection_names() -> List[str]:
     return collections.keys()
 
 
+DATASET_NAME = "Rakuto/twitter_customer_support_dialogue"
+DATASET_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"  # e.g. "Tue Oct 31 22:10:47 +0000 2017"
+
+
 def _parse_time(time_string: str) -> datetime:
     # Parse the string into a datetime object
     dt = parser.parse(time_string)
     return dt
 
 
+# Parsed by dateutil, so that it carries the same tzinfo dateutil picks for "+0000" on this machine
+_UTC_EPOCH = _parse_time("Thu Jan 01 00:00:00 +0000 1970")
+
+
+def _parse_times(time_strings: pa.Array) -> List[datetime]:
+    # Parse a whole column in one go; only rows in an unexpected format go through dateutil.
+    # The fast path is limited to "+0000" rows, so that its results (incl. tzinfo) are identical
+    # to `_parse_time`, and `generate_uuid5` of an object does not change
+    is_utc = pc.fill_null(pc.match_substring(time_strings, " +0000 "), False)
+    parsed = pc.strptime(time_strings, format=DATASET_TIME_FORMAT, unit="s", error_is_null=True)
+    seconds = pc.if_else(is_utc, parsed.cast(pa.int64()), pa.scalar(None, pa.int64()))
+
+    return [
+        _UTC_EPOCH + timedelta(seconds=s) if s is not None else _parse_time(raw)
+        for s, raw in zip(seconds.to_pylist(), time_strings.to_pylist())
+    ]
+
+
+def get_data_batches(
+    max_text_length: int = 10**5,
+    batch_size: int = 10_000,
+    start: int = 0,
+    stop: Optional[int] = None,
+    streaming: bool = False,
+) -> Iterator[Slab]:
+    """Yield the dataset as column-wise slabs, with a deterministic UUID per object.
+
+    With `streaming=True`, the dataset is read lazily from the Hub instead of being
+    downloaded (and held) in full first.
+    """
+    columns = ["text", "dialogue_id", "company_author", "created_at"]
+    ds = load_dataset(DATASET_NAME, split="train", streaming=streaming)
+
+    if streaming:
+        ds = ds.select_columns(columns).skip(start)
+        if stop is not None:
+            ds = ds.take(max(0, stop - start))
+    else:
+        ds = ds.select_columns(columns)
+        stop = len(ds) if stop is None else min(stop, len(ds))
+        ds = ds.select(range(min(start, stop), stop))
+
+    offset = start
+    for batch in ds.with_format("arrow").iter(batch_size=batch_size):
+        if not isinstance(batch, pa.Table):
+            batch = pa.table(batch)
+
+        properties = {
+            "text": pc.utf8_slice_codeunits(batch["text"], 0, max_text_length).to_pylist(),
+            "dialogue_id": batch["dialogue_id"].to_pylist(),
+            "company_author": batch["company_author"].to_pylist(),
+            "created_at": _parse_times(batch["created_at"].combine_chunks()),
+        }
+        # Generate a UUID based on each object's properties
+        objects = (dict(zip(properties, values)) for values in zip(*properties.values()))
+        uuids = [generate_uuid5(obj) for obj in objects]
+
+        yield Slab(start=offset, uuids=uuids, properties=properties, vectors={})
+        offset += len(uuids)
+
+
 def get_data_objects(
     max_text_length: int = 10**5,
+    start: int = 0,
 ) -> Iterator[Dict[str, Union[datetime, str, int]]]:
-    ds = load_dataset("Rakuto/twitter_customer_support_dialogue")["train"]
-    for item in ds:
-        yield {
-            "text": item["text"][:max_text_length],
-            "dialogue_id": item["dialogue_id"],
-            "company_author": item["company_author"],
-            "created_at": _parse_time(item["created_at"]),
-        }
+    for slab in get_data_batches(max_text_length=max_text_length, start=start):
+        for _, properties, _ in slab.rows():
+            yield properties
 
 
-def get_top_companies(collection: Collection, top_n: int, get_counts: bool = True, recalculate_stats = True, save_outputs = True) -> List[tuple[str, int]]:
+@dataclass
+class _CachedStats:
+    fetched_at: float
+    object_count: int
+    top_n: int
+    top_companies: List[Tuple[str, int]]
 
-    if os.path.exists("top_companies.json") and not recalculate_stats:
-        with open("top_companies.json") as f:
-            top_companies = json.load(f)
-    else:
-        response = collection.query.fetch_objects(limit=200)
-        companies = [str(c.properties["company_author"]) for c in response.objects if c.properties["company_author"] != ""]
-        top_companies = Counter(companies).most_common(15)
 
-    if save_outputs:
-        with open("top_companies.json", "w") as f:
-            json.dump(top_companies, f)
+# Keyed by (collection name, tenant); shared by every session of the app
+_top_companies_cache: Dict[Tuple[str, Optional[str]], _CachedStats] = {}
 
-    top_companies = top_companies[:top_n]
 
-    actual_company_counts = dict()
+def _cached_top_companies(
+    key: Tuple[str, Optional[str]], top_n: int, ttl_seconds: float
+) -> Tuple[Optional[_CachedStats], bool]:
+    # Returns the usable cache entry (if any), and whether it is still fresh
+    cached = _top_companies_cache.get(key)
+    if cached is None or cached.top_n < top_n:
+        return None, False
+    return cached, time.monotonic() - cached.fetched_at < ttl_seconds
 
-    if get_counts:
-        for company, _ in top_companies:
-            count = collection.aggregate.over_all(
-                filters=Filter.by_property("company_author").equal(company),
-                total_count=True,
-            )
-            actual_company_counts[company] = count.total_count
-    else:
-        actual_company_counts = top_companies
 
-    return actual_company_counts
+def _top_companies_metrics(top_n: int) -> Metrics:
+    return Metrics("company_author").text(
+        top_occurrences_count=True,
+        top_occurrences_value=True,
+        min_occurrences=top_n + 1,  # One spare, in case the empty string is among them
+    )
 
 
-def weaviate_query(
-    collection: Collection,
-    query: str,
+def _store_top_companies(key: Tuple[str, Optional[str]], top_n: int, response) -> Dict[str, int]:
+    top_occurrences = response.properties["company_author"].top_occurrences
+    top_companies = [(o.value, o.count) for o in top_occurrences if o.value != ""][:top_n]
+
+    _top_companies_cache[key] = _CachedStats(
+        fetched_at=time.monotonic(),
+        object_count=response.total_count,
+        top_n=top_n,
+        top_companies=top_companies,
+    )
+    return dict(top_companies)
+
+
+def get_top_companies(
+    collection: Collection, top_n: int, ttl_seconds: float = 60.0
+) -> Dict[str, int]:
+    """Exact object counts of the `top_n` most common companies, from a single aggregation.
+
+    Results are cached per collection & tenant. After `ttl_seconds`, the object count is
+    checked, and the counts are only recalculated if it has changed.
+    """
+    _note_tenant_access(collection)
+    key = (collection.name, collection.tenant)
+    cached, fresh = _cached_top_companies(key, top_n, ttl_seconds)
+
+    if cached is not None and fresh:
+        return dict(cached.top_companies[:top_n])
+
+    if cached is not None and _object_count(collection) == cached.object_count:
+        cached.fetched_at = time.monotonic()
+        return dict(cached.top_companies[:top_n])
+
+    response = collection.aggregate.over_all(
+        total_count=True, return_metrics=_top_companies_metrics(top_n)
+    )
+    return _store_top_companies(key, top_n, response)
+
+
+def _object_count(collection: Collection) -> int:
+    return collection.aggregate.over_all(total_count=True).total_count
+
+
+TARGET_VECTOR = "text_with_metadata"
+
+# Shared by every session of the app; set `query_cache.cache_generative = True` to also cache RAG responses
+query_cache = QueryCache()
+
+# Set QUERY_EMBEDDER (e.g. "cohere:embed-multilingual-light-v3.0") to embed & cache query vectors client-side.
+# It must match the collection's vectorizer model
+embedding_cache: Optional[EmbeddingCache] = (
+    EmbeddingCache(
+        embedder_from_spec(os.environ["QUERY_EMBEDDER"]),
+        disk_path="cache/query_embeddings.sqlite",
+    )
+    if os.environ.get("QUERY_EMBEDDER")
+    else None
+)
+
+
+# Called with (collection name, tenant) before each query on a tenant, e.g. to activate
+# idle tenants on demand (see `TenantLifecycleManager.on_access` in tenant_lifecycle.py)
+tenant_access_hook: Optional[Callable[[str, str], None]] = None
+
+
+def _note_tenant_access(collection: Collection):
+    if collection.tenant is not None and tenant_access_hook is not None:
+        tenant_access_hook(collection.name, collection.tenant)
+
+
+def _search_options(
     company_filter: str,
-    limit: int,
     search_type: Literal["Hybrid", "Vector", "Keyword"],
-    rag_query: Optional[str] = None,
-):
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Tuple[Optional[_Filters], float]:
+    filters = []
     if company_filter and company_filter != "Any":
-        company_filter_obj = Filter.by_property("company_author").equal(company_filter)
+        filters.append(Filter.by_property("company_author").equal(company_filter))
+    # `created_after` is inclusive, `created_before` exclusive
+    if created_after is not None:
+        filters.append(Filter.by_property("created_at").greater_or_equal(created_after))
+    if created_before is not None:
+        filters.append(Filter.by_property("created_at").less_than(created_before))
+
+    if len(filters) > 1:
+        company_filter_obj = Filter.all_of(filters)
     else:
-        company_filter_obj = None
+        company_filter_obj = filters[0] if filters else None
 
     if search_type == "Hybrid":
         alpha = 0.5
@@ -110,35 +262,342 @@ def weaviate_query(
     elif search_type == "Keyword":
         alpha = 0
 
-    if rag_query:
-        search_response = collection.generate.hybrid(
-            query=query,
-            target_vector="text_with_metadata",
-            filters=company_filter_obj,
-            alpha=alpha,
-            limit=limit,
-            grouped_task=rag_query
+    return company_filter_obj, alpha
+
+
+def weaviate_query(
+    collection: Collection,
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    rag_query: Optional[str] = None,
+    use_cache: bool = True,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    _note_tenant_access(collection)
+    company_filter_obj, alpha = _search_options(company_filter, search_type, created_after, created_before)
+
+    def run_query():
+        # A cached (or client-side) query vector; None means Weaviate vectorizes the query
+        if embedding_cache is not None and alpha > 0:
+            vector = embedding_cache.get(query)
+        else:
+            vector = None
+
+        if rag_query:
+            search_response = collection.generate.hybrid(
+                query=query,
+                vector=vector,
+                target_vector=TARGET_VECTOR,
+                filters=company_filter_obj,
+                alpha=alpha,
+                limit=limit,
+                return_metadata=MetadataQuery(score=True),
+                grouped_task=rag_query
+            )
+        else:
+            search_response = collection.query.hybrid(
+                query=query,
+                vector=vector,
+                target_vector=TARGET_VECTOR,
+                filters=company_filter_obj,
+                alpha=alpha,
+                limit=limit,
+                return_metadata=MetadataQuery(score=True),
+            )
+        return search_response
+
+    if not use_cache or (rag_query and not query_cache.cache_generative):
+        return run_query()
+
+    scope = (collection.name, collection.tenant)
+    key = (*scope, query, company_filter, created_after, created_before, alpha, limit, TARGET_VECTOR, rag_query)
+    return query_cache.get_or_compute(
+        key, scope, run_query, get_version=lambda: _object_count(collection)
+    )
+
+
+# ===== Company-partitioned layout =====
+# Instead of one HNSW graph searched with a `company_author` filter, each high-volume
+# company gets its own tenant (and graph), and the long tail shares a catch-all tenant.
+# Company-scoped searches then go to one small, unfiltered graph; see `partitioned_query`.
+
+# Not a valid Twitter handle, so it can't clash with a company's own partition
+CATCH_ALL_TENANT = "long-tail"
+
+
+def company_tenant_name(company_author: str) -> str:
+    """The tenant name for a company, e.g. `AppleSupport`."""
+    # Tenant names may only contain letters, digits, `-` and `_` (handles already do)
+    return re.sub(r"[^A-Za-z0-9_-]", "_", company_author)[:64] or "unknown"
+
+
+@dataclass(frozen=True)
+class CompanyPartitions:
+    """The companies with a partition (tenant) of their own; all others are in `CATCH_ALL_TENANT`."""
+
+    tenants: FrozenSet[str] = field(default_factory=frozenset)
+
+    @property
+    def all_tenants(self) -> List[str]:
+        return sorted(self.tenants) + [CATCH_ALL_TENANT]
+
+    def tenant_for(self, company_author: str) -> str:
+        tenant = company_tenant_name(company_author or "")
+        return tenant if tenant in self.tenants else CATCH_ALL_TENANT
+
+    @classmethod
+    def from_tenants(cls, tenants) -> "CompanyPartitions":
+        return cls(frozenset(t for t in tenants if t != CATCH_ALL_TENANT))
+
+
+# Keyed by collection name; None if the collection doesn't use the partitioned layout
+_partitions_cache: Dict[str, Tuple[float, Optional[CompanyPartitions]]] = {}
+
+# Shared by every fan-out; each partition's search runs in its own thread
+_fanout_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="partition-fanout")
+
+
+def get_partitions(collection: Collection, ttl_seconds: float = 60.0) -> Optional[CompanyPartitions]:
+    """The collection's partitions, or None if it isn't company-partitioned (no catch-all tenant)."""
+    cached = _partitions_cache.get(collection.name)
+    if cached is not None and time.monotonic() - cached[0] < ttl_seconds:
+        return cached[1]
+
+    partitions = None
+    if collection.config.get().multi_tenancy_config.enabled:
+        tenants = collection.tenants.get().keys()
+        if CATCH_ALL_TENANT in tenants:
+            partitions = CompanyPartitions.from_tenants(tenants)
+    _partitions_cache[collection.name] = (time.monotonic(), partitions)
+    return partitions
+
+
+@dataclass
+class PartitionedResponse:
+    """The merged result of a fan-out, with the same `objects` & `generated` as a query response."""
+
+    objects: list
+    generated: Optional[str] = None
+
+
+# (object, BM25 score, vector distance); None where the object wasn't found by that search
+Candidate = Tuple[object, Optional[float], Optional[float]]
+
+
+def _partition_candidates(
+    collection: Collection,
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    use_cache: bool = True,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> List[Candidate]:
+    """The top `limit` keyword and vector hits of one tenant, with their raw scores.
+
+    Hybrid scores are rescaled per search, so every tenant's best hit scores 1.0; raw BM25
+    scores and vector distances can be compared across tenants instead.
+    """
+    _note_tenant_access(collection)
+    company_filter_obj, alpha = _search_options(company_filter, search_type, created_after, created_before)
+
+    def run_searches() -> List[Candidate]:
+        hits: Dict[str, list] = {}
+        if alpha < 1:
+            response = collection.query.bm25(
+                query=query, filters=company_filter_obj, limit=limit, return_metadata=MetadataQuery(score=True)
+            )
+            for o in response.objects:
+                hits[str(o.uuid)] = [o, o.metadata.score, None]
+        if alpha > 0:
+            vector = embedding_cache.get(query) if embedding_cache is not None else None
+            search = dict(
+                target_vector=TARGET_VECTOR,
+                filters=company_filter_obj,
+                limit=limit,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            if vector is not None:
+                response = collection.query.near_vector(near_vector=vector, **search)
+            else:
+                response = collection.query.near_text(query=query, **search)
+            for o in response.objects:
+                hits.setdefault(str(o.uuid), [o, None, None])[2] = o.metadata.distance
+        return [tuple(hit) for hit in hits.values()]
+
+    if not use_cache:
+        return run_searches()
+
+    scope = (collection.name, collection.tenant)
+    key = (*scope, "candidates", query, company_filter, created_after, created_before, alpha, limit, TARGET_VECTOR)
+    return query_cache.get_or_compute(
+        key, scope, run_searches, get_version=lambda: _object_count(collection)
+    )
+
+
+def _rescale(values: List[Optional[float]]) -> List[float]:
+    # To [0, 1] over the whole pool; missing values count as 0, as in relative score fusion
+    present = [v for v in values if v is not None]
+    low, high = min(present, default=0.0), max(present, default=0.0)
+    return [
+        0.0 if v is None else (v - low) / (high - low) if high > low else 1.0
+        for v in values
+    ]
+
+
+def _merge_by_relevance(candidates: List[Candidate], alpha: float, limit: int) -> list:
+    """The top `limit` of every tenant's candidates, fused like a hybrid search over them all."""
+    keyword = _rescale([bm25 for _, bm25, _ in candidates])
+    vector = _rescale([None if distance is None else -distance for _, _, distance in candidates])
+    scores = [alpha * v + (1 - alpha) * k for k, v in zip(keyword, vector)]
+    ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)[:limit]
+    # Copies, as the candidates may be cached
+    return [replace(o, metadata=replace(o.metadata, score=score)) for score, (o, _, _) in ranked]
+
+
+def fan_out_query(
+    collection: Collection,
+    searches: Dict[str, dict],
+    tenant_of: Callable[[object], str],
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    rag_query: Optional[str] = None,
+    use_cache: bool = True,
+) -> PartitionedResponse:
+    """Search several tenants in parallel and merge their top `limit` results by relevance.
+
+    Each tenant returns its top keyword and vector hits with raw scores, and these are
+    fused over all tenants at once (see `_merge_by_relevance`). `searches` maps each
+    tenant to extra search arguments (e.g. date bounds), and `tenant_of(object)` tells
+    which tenant a result came from, for RAG.
+    """
+    candidates = [
+        candidate
+        for tenant_candidates in _fanout_executor.map(
+            lambda tenant: _partition_candidates(
+                collection.with_tenant(tenant),
+                query,
+                company_filter,
+                limit,
+                search_type,
+                use_cache,
+                **searches[tenant],
+            ),
+            searches,
         )
-    else:
-        search_response = collection.query.hybrid(
-            query=query,
-            target_vector="text_with_metadata",
-            filters=company_filter_obj,
-            alpha=alpha,
-            limit=limit,
+        for candidate in tenant_candidates
+    ]
+    _, alpha = _search_options(company_filter, search_type)
+    merged = PartitionedResponse(objects=_merge_by_relevance(candidates, alpha, limit))
+    if rag_query and merged.objects:
+        merged.generated = _generate_per_partition(collection, tenant_of, merged.objects, rag_query)
+    return merged
+
+
+def partitioned_query(
+    collection: Collection,
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    rag_query: Optional[str] = None,
+    use_cache: bool = True,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    """`weaviate_query` for the company-partitioned layout; `collection` is the collection, not a tenant.
+
+    A company with its own partition is searched there without a filter, other companies
+    in the catch-all tenant with one. "Any" fans out to every partition and merges the
+    results by relevance (see `fan_out_query`). Date bounds are filters in every partition.
+    """
+    dates = {"created_after": created_after, "created_before": created_before}
+    partitions = get_partitions(collection)
+    if partitions is None:
+        return weaviate_query(collection, query, company_filter, limit, search_type, rag_query, use_cache, **dates)
+
+    if company_filter and company_filter != "Any":
+        tenant = partitions.tenant_for(company_filter)
+        if tenant != CATCH_ALL_TENANT:
+            company_filter = "Any"  # The whole partition is this company's
+        return weaviate_query(
+            collection.with_tenant(tenant), query, company_filter, limit, search_type, rag_query, use_cache, **dates
         )
-    return search_response
+
+    return fan_out_query(
+        collection,
+        {tenant: dates for tenant in partitions.all_tenants},
+        lambda o: partitions.tenant_for(o.properties["company_author"]),
+        query,
+        "Any",
+        limit,
+        search_type,
+        rag_query,
+        use_cache,
+    )
 
 
-def get_pprof_results() -> str:
-    return subprocess.run(
-        ["go", "tool", "pprof", "-top", "http://localhost:6060/debug/pprof/heap"],
-        capture_output=True,
-        text=True,
-        timeout=10,
+def _generate_per_partition(
+    collection: Collection, tenant_of: Callable[[object], str], objects: list, rag_query: str
+) -> str:
+    # A grouped task can only span one tenant, so each partition in the merged results
+    # generates over its share of them
+    ids_by_tenant: Dict[str, list] = {}
+    for o in objects:
+        ids_by_tenant.setdefault(tenant_of(o), []).append(o.uuid)
+
+    def generate(tenant: str) -> str:
+        response = collection.with_tenant(tenant).generate.fetch_objects(
+            filters=Filter.by_id().contains_any(ids_by_tenant[tenant]),
+            limit=len(ids_by_tenant[tenant]),
+            grouped_task=rag_query,
+        )
+        return response.generated or ""
+
+    tenants = list(ids_by_tenant)
+    if len(tenants) == 1:
+        return generate(tenants[0])
+    return "\n\n".join(
+        f"**{tenant}**: {generated}" for tenant, generated in zip(tenants, _fanout_executor.map(generate, tenants))
     )
 
 
+def partitioned_top_companies(
+    collection: Collection, top_n: int, tenants: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """`get_top_companies` across all partitions (or `tenants`).
+
+    Exact for the company-partitioned layout, where each company is in one partition;
+    otherwise companies below the top `top_n` of some tenants may be undercounted.
+    """
+    if tenants is None:
+        partitions = get_partitions(collection)
+        if partitions is None:
+            return get_top_companies(collection, top_n)
+        tenants = partitions.all_tenants
+    counts = Counter()
+    for top in _fanout_executor.map(
+        lambda tenant: get_top_companies(collection.with_tenant(tenant), top_n), tenants
+    ):
+        counts.update(top)
+    return dict(counts.most_common(top_n))
+
+
+def get_heap_profile(url: str = PPROF_HEAP_URL) -> Optional[HeapProfile]:
+    """Weaviate's current heap profile, or None if the pprof endpoint can't be reached."""
+    try:
+        return fetch_heap_profile(url, timeout=10)
+    except (OSError, ValueError):
+        # requests' exceptions are OSErrors; ValueError covers a malformed profile
+        return None
+
+
 STREAMLIT_STYLING = """
 <style>
     .stHeader {
@@ -0,0 +1,348 @@
+"""Dataset statistics maintained by the importers, so the dashboard doesn't have to query for them.
+
+While importing, each range (or worker) counts the objects it commits: per tenant, the
+objects per company, a histogram of `created_at` months and of text lengths. Like the
+checkpoints, the counts are kept in one file per range in the import's state
+directory, written after every committed slab, so a resumed import continues them.
+`publish_stats` merges the range files into the collection's sidecar,
+`stats/<collection>.json`, during and after the import.
+
+The app serves the sidecar straight away (`StatsStore`), and a background thread
+reconciles it with the cluster: when a scope's object count differs from the live one
+(e.g. objects were added by other means), its counts are replaced by a fresh aggregation.
+Tenants that aren't active are left alone: they can't be aggregated without loading them.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import bisect
+import json
+import os
+import threading
+import time
+
+from weaviate.classes.tenants import TenantActivityStatus
+
+from client_pool import ClientPool, get_pool
+from helpers import CollectionName, get_top_companies
+
+
+STATS_DIR = "stats"
+PUBLISH_INTERVAL = 10.0
+DEFAULT_RECONCILE_INTERVAL = 60.0
+RECONCILE_TOP_N = 50
+
+# Upper bounds of the text length buckets, in characters
+TEXT_LENGTH_BUCKETS = [32, 64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+
+def sidecar_path(collection_name: str = CollectionName.SUPPORTCHAT, stats_dir: str = STATS_DIR) -> Path:
+    return Path(stats_dir) / f"{CollectionName(collection_name).value}.json"
+
+
+def _month(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m")
+    if isinstance(value, str) and len(value) >= 7:
+        return value[:7]  # ISO format, as stored in the export files
+    return None
+
+
+def _text_length_bucket(length: int) -> str:
+    i = bisect.bisect_left(TEXT_LENGTH_BUCKETS, length)
+    return f"<={TEXT_LENGTH_BUCKETS[i]}" if i < len(TEXT_LENGTH_BUCKETS) else f">{TEXT_LENGTH_BUCKETS[-1]}"
+
+
+@dataclass
+class ScopeStats:
+    """Statistics of one tenant (or of the whole collection without multi-tenancy)."""
+
+    objects: int = 0
+    companies: Counter = field(default_factory=Counter)
+    created_at_months: Counter = field(default_factory=Counter)
+    text_lengths: Counter = field(default_factory=Counter)
+    text_length_total: int = 0
+    text_length_max: int = 0
+    reconciled_at: Optional[str] = None
+    # The objects the histograms were counted over, once `objects` is the live count
+    histogram_objects: Optional[int] = None
+
+    @property
+    def mean_text_length(self) -> float:
+        counted = self.objects if self.histogram_objects is None else self.histogram_objects
+        return self.text_length_total / counted if counted else 0.0
+
+    def add(self, properties: Dict[str, Any]):
+        self.objects += 1
+        self.companies[properties.get("company_author") or ""] += 1
+        month = _month(properties.get("created_at"))
+        if month is not None:
+            self.created_at_months[month] += 1
+        length = len(properties.get("text") or "")
+        self.text_lengths[_text_length_bucket(length)] += 1
+        self.text_length_total += length
+        self.text_length_max = max(self.text_length_max, length)
+
+    def merge(self, other: "ScopeStats"):
+        self.objects += other.objects
+        self.companies.update(other.companies)
+        self.created_at_months.update(other.created_at_months)
+        self.text_lengths.update(other.text_lengths)
+        self.text_length_total += other.text_length_total
+        self.text_length_max = max(self.text_length_max, other.text_length_max)
+
+    def top_companies(self, top_n: int) -> Dict[str, int]:
+        # One spare, in case the empty string is among them
+        top = [(c, n) for c, n in self.companies.most_common(top_n + 1) if c != ""]
+        return dict(top[:top_n])
+
+    def text_length_histogram(self) -> List[Tuple[str, int]]:
+        """(bucket, count) in bucket order, e.g. `("<=64", 120)`."""
+        labels = [f"<={b}" for b in TEXT_LENGTH_BUCKETS] + [f">{TEXT_LENGTH_BUCKETS[-1]}"]
+        return [(label, self.text_lengths[label]) for label in labels]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "objects": self.objects,
+            "companies": dict(self.companies),
+            "created_at_months": dict(sorted(self.created_at_months.items())),
+            "text_lengths": dict(self.text_lengths),
+            "text_length_total": self.text_length_total,
+            "text_length_max": self.text_length_max,
+            "reconciled_at": self.reconciled_at,
+            "histogram_objects": self.histogram_objects,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScopeStats":
+        return cls(
+            objects=data["objects"],
+            companies=Counter(data["companies"]),
+            created_at_months=Counter(data["created_at_months"]),
+            text_lengths=Counter(data["text_lengths"]),
+            text_length_total=data["text_length_total"],
+            text_length_max=data["text_length_max"],
+            reconciled_at=data.get("reconciled_at"),
+            histogram_objects=data.get("histogram_objects"),
+        )
+
+
+@dataclass
+class CollectionStats:
+    """Statistics per scope; the key is the tenant name, or "" without multi-tenancy."""
+
+    scopes: Dict[str, ScopeStats] = field(default_factory=dict)
+    updated_at: Optional[str] = None
+
+    @property
+    def objects(self) -> int:
+        return sum(s.objects for s in self.scopes.values())
+
+    @property
+    def tenant_counts(self) -> Dict[str, int]:
+        return {t: s.objects for t, s in self.scopes.items() if t != ""}
+
+    def scope(self, tenant: Optional[str] = None) -> ScopeStats:
+        return self.scopes.setdefault(tenant or "", ScopeStats())
+
+    def add_slab(
+        self,
+        properties: Dict[str, List[Any]],
+        tenants: Optional[Sequence[Optional[str]]] = None,
+        skip: Optional[Set[int]] = None,
+    ):
+        """Count the objects of a column-wise slab, except the row indices in `skip` (e.g. failed ones)."""
+        names = list(properties)
+        columns = [properties[name] for name in names]
+        for i, values in enumerate(zip(*columns)):
+            if skip and i in skip:
+                continue
+            self.scope(tenants[i] if tenants is not None else None).add(dict(zip(names, values)))
+
+    def merge(self, other: "CollectionStats"):
+        for tenant, scope in other.scopes.items():
+            self.scope(tenant).merge(scope)
+
+    @classmethod
+    def load(cls, path) -> "CollectionStats":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            scopes={t: ScopeStats.from_dict(s) for t, s in data["scopes"].items()},
+            updated_at=data.get("updated_at"),
+        )
+
+    def save(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+        data = {"updated_at": self.updated_at, "scopes": {t: s.to_dict() for t, s in self.scopes.items()}}
+        # Write & rename, so that readers never see a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def range_stats_path(state_dir: str, name: str) -> Path:
+    """The statistics file of one import range (e.g. `0-50000`) or worker."""
+    return Path(state_dir) / f"stats-{name}.json"
+
+
+def failed_rows(uuids: Sequence[str], failed_objects: Iterable) -> Set[int]:
+    """Row indices (into `uuids`) of the objects a batch rejected."""
+    failed = {str(f.object_.uuid) for f in failed_objects}
+    return {i for i, u in enumerate(uuids) if u in failed} if failed else set()
+
+
+def publish_stats(state_dir: str, collection_name: str = CollectionName.SUPPORTCHAT) -> CollectionStats:
+    """Merge the range statistics of an import into the collection's sidecar."""
+    merged = CollectionStats()
+    for path in sorted(Path(state_dir).glob("stats-*.json")):
+        merged.merge(CollectionStats.load(path))
+    merged.save(sidecar_path(collection_name))
+    return merged
+
+
+class StatsPublisher:
+    """Publishes the sidecar at most every `interval` seconds while an import runs."""
+
+    def __init__(self, state_dir: str, interval: float = PUBLISH_INTERVAL):
+        self.state_dir = state_dir
+        self.interval = interval
+        self._published_at = time.monotonic()
+
+    def maybe_publish(self):
+        if time.monotonic() - self._published_at >= self.interval:
+            self.publish()
+
+    def publish(self) -> CollectionStats:
+        self._published_at = time.monotonic()
+        return publish_stats(self.state_dir)
+
+
+class StatsStore:
+    """The sidecar for the app: reloaded when an import rewrites it, and reconciled in the background."""
+
+    def __init__(
+        self,
+        collection_name: str = CollectionName.SUPPORTCHAT,
+        reconcile_interval: float = DEFAULT_RECONCILE_INTERVAL,
+        pool: Optional[ClientPool] = None,
+    ):
+        self.collection_name = collection_name
+        self.path = sidecar_path(collection_name)
+        self.reconcile_interval = reconcile_interval
+        self.pool = pool or get_pool()
+        self.reconciliations = 0
+        self.last_error: Optional[str] = None
+
+        self._stats = CollectionStats()
+        self._mtime: Optional[float] = None
+        self._reconciled: Dict[str, ScopeStats] = {}  # Overrides from the cluster, by scope
+        self._watched: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StatsStore":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            stats = CollectionStats.load(self.path)
+            with self._lock:
+                self._stats, self._mtime = stats, mtime
+                # A newer sidecar from an import supersedes the earlier reconciliations
+                self._reconciled.clear()
+
+    def get(self, tenant: Optional[str] = None) -> Optional[ScopeStats]:
+        """The statistics of a scope, or None if the sidecar doesn't cover it (yet)."""
+        self._reload()
+        key = tenant or ""
+        with self._lock:
+            self._watched.add(key)
+            return self._reconciled.get(key) or self._stats.scopes.get(key)
+
+    def top_companies(self, tenant: Optional[str], top_n: int) -> Optional[Dict[str, int]]:
+        scope = self.get(tenant)
+        return scope.top_companies(top_n) if scope is not None and scope.objects else None
+
+    def _run(self):
+        while not self._stop.wait(self.reconcile_interval):
+            with self._lock:
+                watched = sorted(self._watched)
+            try:
+                active = self._active_tenants() if any(watched) else set()
+            except Exception as e:
+                self.last_error = f"{self.collection_name}: {e}"
+                continue
+            for key in watched:
+                if key and key not in active:
+                    continue
+                try:
+                    self.reconcile(key or None)
+                except Exception as e:
+                    self.last_error = f"{key or self.collection_name}: {e}"
+
+    def _active_tenants(self) -> Set[str]:
+        tenants = self.pool.get().collections.get(self.collection_name).tenants.get()
+        return {name for name, t in tenants.items() if t.activity_status == TenantActivityStatus.ACTIVE}
+
+    def reconcile(self, tenant: Optional[str] = None) -> bool:
+        """Replace a scope's counts with the cluster's if its object count differs. Returns True if it did."""
+        collection = self.pool.get().collections.get(self.collection_name)
+        if tenant is not None:
+            collection = collection.with_tenant(tenant)
+        live_count = collection.aggregate.over_all(total_count=True).total_count
+
+        scope = self.get(tenant)
+        if scope is not None and scope.objects == live_count:
+            return False
+
+        reconciled = ScopeStats(
+            objects=live_count,
+            companies=Counter(get_top_companies(collection, RECONCILE_TOP_N)),
+            reconciled_at=datetime.now(timezone.utc).isoformat(),
+        )
+        if scope is not None:
+            # Histograms can't be aggregated cheaply; keep the import's as an approximation
+            reconciled.created_at_months = scope.created_at_months
+            reconciled.text_lengths = scope.text_lengths
+            reconciled.text_length_total = scope.text_length_total
+            reconciled.text_length_max = scope.text_length_max
+            reconciled.histogram_objects = scope.objects if scope.histogram_objects is None else scope.histogram_objects
+        with self._lock:
+            self._reconciled[tenant or ""] = reconciled
+        self.reconciliations += 1
+        return True
+
+
+_stores: Dict[str, StatsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_stats_store(collection_name: str = CollectionName.SUPPORTCHAT) -> StatsStore:
+    """The process-wide stats store for a collection, reconciling in the background."""
+    with _stores_lock:
+        if collection_name not in _stores:
+            _stores[collection_name] = StatsStore(
+                collection_name,
+                reconcile_interval=float(os.environ.get("STATS_RECONCILE_INTERVAL", DEFAULT_RECONCILE_INTERVAL)),
+            ).start()
+        return _stores[collection_name]
@@ -0,0 +1,386 @@
+"""Import engine for the pre-vectorized HDF5 exports.
+
+An import is split into contiguous object ranges. Each range is imported by
+`import_range` with its own Weaviate connection & batcher, so ranges can run in
+separate worker processes (`parallel_import`) and the client side scales with the
+number of workers rather than being limited by one Python thread.
+
+Every slab is sent in its own batch context, and once it is flushed the range's
+checkpoint is advanced and rejected objects go to a dead-letter file (see
+`checkpoints`). An interrupted import can therefore be resumed from the committed
+offsets, and the dead letters replayed on their own.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import multiprocessing
+import queue
+import time
+
+from tqdm import tqdm
+
+from adaptive_batch import AdaptiveBatchController, BatchSettings, node_queue_length
+from helpers import CollectionName, connect_to_weaviate, get_partitions
+from hdf5_io import count_objects, read_slabs
+from import_stats import CollectionStats, StatsPublisher, failed_rows, range_stats_path
+from time_partitions import get_time_partitions
+from checkpoints import (
+    ImportCheckpoint,
+    clear_state,
+    load_committed,
+    read_dead_letters,
+    remaining_intervals,
+    state_dir_for,
+    write_dead_letters,
+)
+
+
+tenant_names = ["AcmeCo", "Globex", "Initech", "UmbrellaCorp", "WayneEnterprises"]
+
+
+@dataclass
+class RangeResult:
+    """Outcome of importing one object range."""
+
+    worker: int
+    start: int
+    stop: int
+    imported: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    failed_sample: List[str] = field(default_factory=list)
+    adaptive_summary: Optional[str] = None
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ImportSummary:
+    total: int
+    workers: int
+    seconds: float
+    ranges: List[RangeResult]
+    skipped: int = 0
+    state_dir: Optional[str] = None
+
+    @property
+    def imported(self) -> int:
+        return sum(r.imported for r in self.ranges)
+
+    @property
+    def failed(self) -> int:
+        return sum(r.failed for r in self.ranges)
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def print(self):
+        print(
+            f"Import completed. {self.imported} of {self.total} objects imported in "
+            f"{self.seconds:.1f}s ({self.objects_per_second:.0f} objects/s) "
+            f"using {self.workers} worker(s)."
+        )
+        if self.skipped > 0:
+            print(f"Skipped {self.skipped} objects already committed by an earlier run.")
+        if len(self.ranges) > 1:
+            for r in self.ranges:
+                print(
+                    f"  Range {r.worker}: objects [{r.start}, {r.stop}) - {r.imported} imported, "
+                    f"{r.failed} failed, {r.objects_per_second:.0f} objects/s"
+                )
+        if self.failed > 0:
+            print("*" * 80)
+            print(f"***** Failed to add {self.failed} objects *****")
+            print("*" * 80)
+            for r in self.ranges:
+                for message in r.failed_sample:
+                    print(message)
+            print(f"Failed objects were saved to {self.state_dir}; replay them with --retry-dead-letters")
+        for r in self.ranges:
+            if r.adaptive_summary:
+                print(r.adaptive_summary)
+
+
+def split_ranges(total: int, parts: int) -> List[Tuple[int, int]]:
+    """Split `[0, total)` into at most `parts` contiguous, near-equal ranges."""
+    parts = max(1, min(parts, total))
+    size, extra = divmod(total, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def split_intervals(intervals: List[Tuple[int, int]], parts: int) -> List[Tuple[int, int]]:
+    """Split a list of intervals into pieces, so that there are roughly `parts` of similar size."""
+    total = sum(stop - start for start, stop in intervals)
+    if total == 0:
+        return []
+    target = -(-total // max(1, parts))  # ceiling division
+    pieces = []
+    for start, stop in intervals:
+        n_pieces = -(-(stop - start) // target)
+        pieces.extend((start + a, start + b) for a, b in split_ranges(stop - start, n_pieces))
+    return pieces
+
+
+def collection_uses_multi_tenancy() -> bool:
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        return collection.config.get().multi_tenancy_config.enabled
+
+
+def collection_is_partitioned() -> bool:
+    """Whether the collection uses the company- or time-partitioned layout (see `helpers`, `time_partitions`)."""
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        return (
+            get_partitions(collection, ttl_seconds=0) is not None
+            or get_time_partitions(collection, ttl_seconds=0) is not None
+        )
+
+
+def import_range(
+    file_path: str,
+    start: int,
+    stop: int,
+    use_multi_tenancy: bool,
+    batch_size: int = 200,
+    worker: int = 0,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    state_dir: Optional[str] = None,
+    adaptive: bool = False,
+) -> RangeResult:
+    """Import objects `[start, stop)` of `file_path` over a dedicated connection.
+
+    `on_progress(n_added, n_failed_so_far)` is called after every slab. With a
+    `state_dir`, a checkpoint and the range's statistics (see `import_stats`) are
+    committed after every slab. With `adaptive=True`, the
+    batch size & concurrency are tuned after every slab (see `adaptive_batch`).
+    """
+    result = RangeResult(worker=worker, start=start, stop=stop)
+    checkpoint = (
+        ImportCheckpoint(state_dir, start, stop, count_objects(file_path))
+        if state_dir is not None
+        else None
+    )
+    stats_path = range_stats_path(state_dir, f"{start}-{stop}") if state_dir is not None else None
+    stats = CollectionStats.load(stats_path) if stats_path is not None else None
+    t0 = time.perf_counter()
+
+    with connect_to_weaviate() as client:
+        controller = (
+            AdaptiveBatchController(
+                BatchSettings(batch_size=batch_size),
+                queue_length=node_queue_length(client),
+                name=f"worker {worker}",
+            )
+            if adaptive
+            else None
+        )
+        for slab in read_slabs(file_path, start=start, stop=stop):
+            if controller is not None:
+                batch_context = controller.batch(client.batch)
+            else:
+                batch_context = client.batch.fixed_size(batch_size=batch_size)
+            slab_t0 = time.perf_counter()
+            slab_tenants = []
+            # One batch context per slab: leaving it flushes everything, which makes a safe commit point
+            with batch_context as batch:
+                for uuid, properties, vectors in slab.rows():
+                    # If using multi-tenancy, assign a tenant (arbitrarily based on the company author length)
+                    if use_multi_tenancy:
+                        tenant_index = len(properties["company_author"]) % 5
+                        tenant = tenant_names[tenant_index]
+                    else:
+                        tenant = None
+                    slab_tenants.append(tenant)
+
+                    batch.add_object(
+                        collection=CollectionName.SUPPORTCHAT,
+                        uuid=uuid,
+                        properties=properties,
+                        vector={"text_with_metadata": vectors["text_with_metadata"]},
+                        tenant=tenant,
+                    )
+
+            failed_objects = client.batch.failed_objects
+            if controller is not None:
+                controller.observe(len(slab), failed_objects, time.perf_counter() - slab_t0)
+            result.failed += len(failed_objects)
+            result.imported += len(slab) - len(failed_objects)
+            if len(result.failed_sample) < 3:
+                result.failed_sample += [str(f) for f in failed_objects[: 3 - len(result.failed_sample)]]
+            if checkpoint is not None:
+                checkpoint.commit(slab.start + len(slab), failed_objects)
+            if stats is not None:
+                stats.add_slab(slab.properties, slab_tenants, failed_rows(slab.uuids, failed_objects))
+                stats.save(stats_path)
+
+            if on_progress is not None:
+                on_progress(len(slab), result.failed)
+
+    result.seconds = time.perf_counter() - t0
+    if controller is not None:
+        result.adaptive_summary = controller.summary()
+    return result
+
+
+def _import_worker(args) -> RangeResult:
+    file_path, start, stop, use_multi_tenancy, batch_size, worker, progress_queue, state_dir, adaptive = args
+
+    def on_progress(n_added: int, n_failed: int):
+        progress_queue.put((worker, n_added, n_failed))
+
+    return import_range(
+        file_path, start, stop, use_multi_tenancy, batch_size, worker, on_progress, state_dir, adaptive
+    )
+
+
+def parallel_import(
+    file_path: str,
+    workers: int = 1,
+    batch_size: int = 200,
+    resume: bool = False,
+    adaptive: bool = False,
+) -> ImportSummary:
+    """Import a whole export file, split into `workers` ranges & processes.
+
+    With `resume=True`, ranges committed by an earlier run are skipped; otherwise the
+    checkpoints & dead letters of earlier runs are discarded first. With
+    `adaptive=True`, each worker tunes its batch settings from cluster feedback.
+    """
+    total = count_objects(file_path)
+    state_dir = state_dir_for(file_path)
+    if resume:
+        todo = remaining_intervals(load_committed(state_dir, total), total)
+    else:
+        clear_state(state_dir)
+        todo = [(0, total)]
+    skipped = total - sum(stop - start for start, stop in todo)
+
+    ranges = split_intervals(todo, workers)
+    workers = max(1, min(workers, len(ranges)))
+    use_multi_tenancy = collection_uses_multi_tenancy()
+
+    t0 = time.perf_counter()
+    progress_bar = tqdm(total=total, initial=skipped, desc="Importing objects", unit="obj")
+    # Keeps the dashboard's statistics sidecar current while the import runs
+    stats_publisher = StatsPublisher(state_dir)
+
+    def on_progress(n_added: int, _):
+        progress_bar.update(n_added)
+        stats_publisher.maybe_publish()
+
+    if workers == 1:
+        results = [
+            import_range(
+                file_path,
+                start,
+                stop,
+                use_multi_tenancy,
+                batch_size,
+                on_progress=on_progress,
+                state_dir=state_dir,
+                adaptive=adaptive,
+            )
+            for start, stop in ranges
+        ]
+    else:
+        # gRPC channels don't survive fork(), so always start fresh interpreters
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager, ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx
+        ) as executor:
+            progress_queue = manager.Queue()
+            futures = [
+                executor.submit(
+                    _import_worker,
+                    (file_path, start, stop, use_multi_tenancy, batch_size, i, progress_queue, state_dir, adaptive),
+                )
+                for i, (start, stop) in enumerate(ranges)
+            ]
+
+            failed_by_worker = {}
+            while not all(f.done() for f in futures) or not progress_queue.empty():
+                try:
+                    worker, n_added, n_failed = progress_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                failed_by_worker[worker] = n_failed
+                on_progress(n_added, n_failed)
+                progress_bar.set_postfix(
+                    failed=sum(failed_by_worker.values()),
+                    rate=f"{(progress_bar.n - skipped) / (time.perf_counter() - t0):.0f}/s",
+                )
+
+            results = [f.result() for f in futures]
+
+    progress_bar.close()
+    stats_publisher.publish()
+    return ImportSummary(
+        total=total,
+        workers=workers,
+        seconds=time.perf_counter() - t0,
+        ranges=results,
+        skipped=skipped,
+        state_dir=state_dir,
+    )
+
+
+def retry_dead_letters(
+    state_dir: str,
+    batch_size: int = 200,
+    max_attempts: int = 5,
+    base_delay: float = 2.0,
+) -> int:
+    """Replay the dead-letter objects in `state_dir`, backing off between attempts.
+
+    Objects that still fail after `max_attempts` are kept as dead letters.
+    Returns the number of objects that could not be imported.
+    """
+    records = read_dead_letters(state_dir)
+    print(f"Retrying {len(records)} dead-letter objects from {state_dir}")
+
+    with connect_to_weaviate() as client:
+        for attempt in range(max_attempts):
+            if not records:
+                break
+            if attempt > 0:
+                delay = base_delay * 2 ** (attempt - 1)
+                print(f"{len(records)} objects still failing; retrying in {delay:.0f}s")
+                time.sleep(delay)
+
+            with client.batch.fixed_size(batch_size=batch_size) as batch:
+                for record in records:
+                    batch.add_object(
+                        collection=record["collection"],
+                        uuid=record["uuid"],
+                        properties=record["properties"],
+                        vector=record["vector"],
+                        tenant=record["tenant"],
+                    )
+
+            failed_objects = {str(f.object_.uuid): f.message for f in client.batch.failed_objects}
+            records = [
+                {**record, "message": failed_objects[record["uuid"]]}
+                for record in records
+                if record["uuid"] in failed_objects
+            ]
+
+    # Only the objects that are still failing remain as dead letters
+    for path in Path(state_dir).glob("deadletter-*.jsonl"):
+        path.unlink()
+    if records:
+        write_dead_letters(Path(state_dir) / "deadletter-retry.jsonl", records)
+        print(f"{len(records)} objects could not be imported; kept in {state_dir}")
+    else:
+        print("All dead-letter objects imported.")
+    return len(records)
@@ -1,45 +1,145 @@
 # File: ./2_add_data.py
-from helpers import CollectionName, get_data_objects, connect_to_weaviate
-from weaviate.util import generate_uuid5
+from helpers import CollectionName, get_data_batches, connect_to_weaviate
+from checkpoints import STATE_ROOT, ImportCheckpoint, clear_state, load_committed, state_dir_for
+from dedup import ExistenceIndex
+from ingest import retry_dead_letters
+from import_stats import CollectionStats, StatsPublisher, failed_rows, range_stats_path
+from adaptive_batch import AdaptiveBatchController, BatchSettings, is_throttled, node_queue_length
 from tqdm import tqdm
+from pathlib import Path
+import click
+import time
+import uuid
 
 
-# Connect to Weaviate
-client = connect_to_weaviate()  # Uses `weaviate.connect_to_local` under the hood
+MAX_OBJECTS = 200000
+CHECKPOINT_EVERY = 2000  # Objects per slab & batch context; a checkpoint is written after each one
 
-chats = client.collections.get(CollectionName.SUPPORTCHAT)
+STATE_DIR = state_dir_for("twitter_customer_support_dialogue")
+EXISTENCE_INDEX_PATH = f"{STATE_ROOT}/known_uuids/{CollectionName.SUPPORTCHAT.value}.npy"
 
 
-MAX_OBJECTS = 200000
+@click.command()
+@click.option("--resume", is_flag=True, help="Skip rows committed by an earlier, interrupted run.")
+@click.option("--retry-dead-letters", "retry_dead_letters_only", is_flag=True, help="Only replay the objects that failed in earlier runs.")
+@click.option("--streaming", is_flag=True, help="Stream the dataset from the Hub instead of loading it into memory.")
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Tune the request rate from vectorizer 429s, errors and indexing queues, instead of a fixed 4800/min.",
+)
+def main(resume, retry_dead_letters_only, streaming, adaptive):
+    if retry_dead_letters_only:
+        retry_dead_letters(STATE_DIR)
+        return
+
+    # Connect to Weaviate
+    client = connect_to_weaviate()  # Uses `weaviate.connect_to_local` under the hood
+
+    chats = client.collections.get(CollectionName.SUPPORTCHAT)
+
+    # Rows are read in order, so the committed offset is all we need to resume
+    if resume:
+        committed = load_committed(STATE_DIR, MAX_OBJECTS)
+        counter = committed[0][1] if committed and committed[0][0] == 0 else 0
+        print(f"Resuming after {counter} committed rows")
+    else:
+        clear_state(STATE_DIR)
+        counter = 0
+    checkpoint = ImportCheckpoint(STATE_DIR, 0, MAX_OBJECTS, MAX_OBJECTS)
+
+    # Identifies this run (kept when resuming), so that only it trusts the UUIDs it saved
+    run_id_path = Path(STATE_DIR) / "run_id"
+    if not run_id_path.exists():
+        run_id_path.write_text(uuid.uuid4().hex)
+    run_id = run_id_path.read_text()
+
+    # Dataset statistics for the dashboard, committed with the checkpoint & published to the sidecar
+    stats_path = range_stats_path(STATE_DIR, f"0-{MAX_OBJECTS}")
+    stats = CollectionStats.load(stats_path)
+    stats_publisher = StatsPublisher(STATE_DIR)
+
+    # Starts at the fixed rate, then backs off on 429s and probes upwards while the cluster keeps up
+    controller = (
+        AdaptiveBatchController(
+            BatchSettings(requests_per_minute=4800), mode="rate_limit", queue_length=node_queue_length(client)
+        )
+        if adaptive
+        else None
+    )
 
-# Add objects to the collection
-counter = 0
-with chats.batch.rate_limit(requests_per_minute=4800) as batch:
-    for obj in tqdm(get_data_objects(max_text_length=8000)):
-        uuid = generate_uuid5(obj)
-
-        if not chats.data.exists(uuid):
-            batch.add_object(
-                properties=obj,
-                uuid=generate_uuid5(
-                    obj
-                ),  # Generate a UUID based on the object's properties
+    # Local set of UUIDs already in the collection, reused when this run is resumed
+    existence_index = ExistenceIndex(chats, EXISTENCE_INDEX_PATH, run_id=run_id).load_or_warm()
+
+    # Add objects to the collection, reading the dataset one column-wise slab at a time
+    slabs = get_data_batches(
+        max_text_length=8000,
+        batch_size=CHECKPOINT_EVERY,
+        start=counter,
+        stop=MAX_OBJECTS,
+        streaming=streaming,
+    )
+    with tqdm(initial=counter, total=MAX_OBJECTS) as progress_bar:
+        for slab in slabs:
+            # Resolve which objects already exist in bulk, rather than one request per object
+            new_uuids = set(existence_index.filter_new(slab.uuids))
+
+            n_sent = n_added = 0
+            t0 = time.perf_counter()
+            if controller is not None:
+                batch_context = controller.batch(chats.batch)
+            else:
+                batch_context = chats.batch.rate_limit(requests_per_minute=4800)
+            with batch_context as batch:
+                for uuid, obj, _ in slab.rows():
+                    if uuid in new_uuids:
+                        batch.add_object(properties=obj, uuid=uuid)
+                        new_uuids.discard(uuid)
+                        n_added += 1
+                    n_sent += 1
+
+                    # The adaptive controller backs off on errors instead
+                    if batch.number_errors > 0 and controller is None:
+                        break
+            if controller is not None:
+                controller.observe(n_added, chats.batch.failed_objects, time.perf_counter() - t0)
+
+            counter = slab.start + n_sent
+            progress_bar.update(n_sent)
+
+            failed_uuids = {str(f.object_.uuid) for f in chats.batch.failed_objects}
+            existence_index.add(u for u in slab.uuids[:n_sent] if u not in failed_uuids)
+
+            # Everything up to `counter` has been flushed; failed objects go to the dead-letter file
+            checkpoint.commit(counter, chats.batch.failed_objects)
+            stats.add_slab(
+                {name: values[:n_sent] for name, values in slab.properties.items()},
+                skip=failed_rows(slab.uuids[:n_sent], chats.batch.failed_objects),
             )
-        counter += 1
+            stats.save(stats_path)
+            stats_publisher.maybe_publish()
+
+            # Throttled objects are kept as dead letters, and the rate is lowered for the next slab
+            if controller is not None:
+                fatal = [f for f in chats.batch.failed_objects if not is_throttled(str(f.message))]
+            else:
+                fatal = chats.batch.failed_objects
+            if len(fatal) > 0:
+                print("*" * 80)
+                print(f"***** Failed to add {len(chats.batch.failed_objects)} objects; breaking *****")
+                print("*" * 80)
+                print(chats.batch.failed_objects[:3])
+                print(f"Failed objects were saved to {STATE_DIR}. Re-run with --resume to continue.")
+                break
 
-        if counter >= MAX_OBJECTS:
-            break
-        if batch.number_errors > 0:
-            print("*" * 80)
-            print(f"***** Failed to add {batch.number_errors} objects; breaking *****")
-            print("*" * 80)
-            break
+    existence_index.save()
+    existence_index.stats.print()
+    stats_publisher.publish()
+    if controller is not None:
+        print(controller.summary())
 
+    client.close()
 
-if len(chats.batch.failed_objects) > 0:
-    print("*" * 80)
-    print(f"***** Failed to add {len(chats.batch.failed_objects)} objects *****")
-    print("*" * 80)
-    print(chats.batch.failed_objects[:3])
 
-client.close()
+if __name__ == "__main__":
+    main()
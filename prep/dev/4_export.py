@@ -1,62 +1,65 @@
 # File: ./4_export.py
+from exporter import parallel_export, tenant_object_counts
+from delta_export import Manifest, compact, export_delta, manifest_path
 from helpers import CollectionName, connect_to_weaviate
-from tqdm import tqdm
-import numpy as np
-import h5py
-import json
-from datetime import datetime
-import os
+import click
 
 
-def export_to_hdf5(model_suffix: str, export_size_max: int):
-    with connect_to_weaviate() as client:  # Uses `weaviate.connect_to_local` under the hood
-        chats = client.collections.get(CollectionName.SUPPORTCHAT)
+@click.command()
+@click.option(
+    "--size",
+    "sizes",
+    multiple=True,
+    type=int,
+    default=[10000, 50000, 100000, 200000],
+    show_default=True,
+    help="Export sizes. All are written from a single read of the collection.",
+)
+@click.option("--model-suffix", default="cohere-embed-multilingual-light-v3.0", show_default=True)
+@click.option("--workers", default=4, show_default=True, help="Parallel cursors over UUID ranges.")
+@click.option("--tenant", "tenants", multiple=True, help="Tenants to export, with multi-tenancy. Default: all.")
+@click.option("--overwrite", is_flag=True, help="Replace existing export files.")
+@click.option(
+    "--vector-dtype",
+    type=click.Choice(["float32", "float16", "int8"]),
+    default="float32",
+    show_default=True,
+    help="Store vectors as float16, or int8 with per-dimension scaling, for smaller files.",
+)
+@click.option("--delta", is_flag=True, help="Only export objects created or updated since the last delta export.")
+@click.option("--compact", "compact_only", is_flag=True, help="Merge the delta segments into the base file.")
+def export_to_hdf5(sizes, model_suffix, workers, tenants, overwrite, vector_dtype, delta, compact_only):
+    if delta or compact_only:
+        export_incremental(model_suffix, tenants, compact_only)
+        return
+
+    summary = parallel_export(
+        sizes,
+        model_suffix,
+        workers=workers,
+        tenants=tenants or None,
+        overwrite=overwrite,
+        vector_dtype=vector_dtype,
+    )
+    summary.print()
 
-        class DateTimeEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                return super().default(obj)
-
-        # Save data to HDF5 file
-        counter = 0
-        actual_size = min(export_size_max, len(chats))
-        print(f"Exporting {actual_size} objects to HDF5 file")
-
-        output_filename = f"export/twitter_customer_support_weaviate_export_{actual_size}_{model_suffix}.h5"
-        if os.path.exists(output_filename):
-            raise FileExistsError(
-                f"File {output_filename} already exists. Please remove it first."
-            )
-        else:
-            with h5py.File(
-                output_filename,
-                "w",
-            ) as hf:
-                for i, wv_obj in tqdm(enumerate(chats.iterator(include_vector=True))):
-                    # Create a group for each pair
-                    uuid = str(wv_obj.uuid)
-                    group = hf.create_group(uuid)
-
-                    # Save the vector(s), object, and UUID
-                    for k, v in wv_obj.vector.items():
-                        vector = np.array(v, dtype=np.float32)
-                        group.create_dataset(f"vector_{k}", data=vector)
-                    group.create_dataset(
-                        "object",
-                        data=json.dumps(wv_obj.properties, cls=DateTimeEncoder),
-                    )
-                    group.create_dataset("uuid", data=uuid)
-
-                    # Check if we should break
-                    counter += 1
-                    if counter >= actual_size:
-                        break
+
+def export_incremental(model_suffix, tenants, compact_only):
+    tenants = list(tenant_object_counts(tenants or None))
+    with connect_to_weaviate() as client:
+        chats = client.collections.get(CollectionName.SUPPORTCHAT)
+        for tenant in tenants:
+            manifest = Manifest.load(manifest_path(model_suffix, tenant))
+            if compact_only:
+                path, count = compact(manifest)
+                print(f"Compacted into {path} ({count} objects)")
+            else:
+                collection = chats.with_tenant(tenant) if tenant else chats
+                export_delta(collection, manifest).print()
 
 
 main = export_to_hdf5
 
 
 if __name__ == "__main__":
-    for size in [10000, 50000, 100000, 200000]:
-        main(model_suffix="cohere-embed-multilingual-light-v3.0", export_size_max=size)
+    main()
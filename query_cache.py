@@ -0,0 +1,119 @@
+"""Bounded LRU + TTL cache for query responses.
+
+Entries are grouped by scope, i.e. (collection name, tenant). Each scope has a version,
+the object count, which is re-read at most every `version_check_seconds`; when it
+changes, all cached responses of that scope are discarded.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+
+
+T = TypeVar("T")
+Scope = Tuple[str, Optional[str]]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    scope: Scope
+    version: int
+    stored_at: float
+
+
+class QueryCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        version_check_seconds: float = 5.0,
+        cache_generative: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        # Generated (RAG) responses are only cached if this is set
+        self.cache_generative = cache_generative
+        self.stats = CacheStats()
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._versions: Dict[Scope, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _current_version(self, scope: Scope, get_version: Callable[[], int]) -> int:
+        now = time.monotonic()
+        checked = self._versions.get(scope)
+        if checked is None or now - checked[0] > self.version_check_seconds:
+            version = get_version()
+            if checked is not None and checked[1] != version:
+                self.invalidate(scope)
+            self._versions[scope] = (now, version)
+            return version
+        return checked[1]
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        scope: Scope,
+        compute: Callable[[], T],
+        get_version: Callable[[], int],
+    ) -> T:
+        version = self._current_version(scope, get_version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version != version:
+                    del self._entries[key]
+                elif time.monotonic() - entry.stored_at > self.ttl_seconds:
+                    self.stats.expirations += 1
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return entry.value
+            self.stats.misses += 1
+
+        # Run the query outside the lock, so that a slow query doesn't block others
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = _Entry(value, scope, version, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return value
+
+    def invalidate(self, scope: Optional[Scope] = None):
+        """Drop all entries, or only those of one (collection, tenant) scope."""
+        with self._lock:
+            if scope is None:
+                self.stats.invalidations += len(self._entries)
+                self._entries.clear()
+                self._versions.clear()
+                return
+            stale = [k for k, e in self._entries.items() if e.scope == scope]
+            for k in stale:
+                del self._entries[k]
+            self.stats.invalidations += len(stale)
@@ -0,0 +1,198 @@
+"""Process-wide background sampler for the dashboard's cluster statistics.
+
+Every browser session used to poll the cluster itself (heap profile, object/tenant
+counts, node stats) from its own fragments. Instead, one daemon thread per process
+samples everything every `interval` seconds into fixed-size ring buffers, and all
+sessions read from those. The polling load therefore doesn't grow with the number of
+open dashboards.
+
+Configure with `TELEMETRY_INTERVAL` (seconds, default 2) and `TELEMETRY_RETENTION`
+(seconds of history kept, default 300).
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+from client_pool import ClientPool, get_pool
+from heap_profile import MIB
+from helpers import CollectionName, get_heap_profile
+
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_RETENTION = 300.0
+
+
+@dataclass
+class ShardSample:
+    node: str
+    collection: str
+    name: str
+    object_count: int
+    indexing_status: str
+    queue_length: int
+
+
+@dataclass
+class NodeSample:
+    name: str
+    status: str
+    object_count: int
+    shard_count: int
+
+
+@dataclass
+class TelemetrySample:
+    """One tick of the sampler. Fields are None when that source couldn't be read."""
+
+    timestamp: float
+    memory_mb: Optional[float] = None
+    object_count: Optional[int] = None
+    tenant_count: Optional[int] = None
+    nodes: Optional[List[NodeSample]] = None
+    shards: Optional[List[ShardSample]] = None
+
+    @property
+    def queue_length(self) -> Optional[int]:
+        if self.shards is None:
+            return None
+        return sum(s.queue_length for s in self.shards)
+
+
+@dataclass
+class SamplerStats:
+    ticks: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+    last_tick_seconds: float = 0.0
+
+
+class TelemetrySampler:
+    def __init__(
+        self,
+        collection_name: str = CollectionName.SUPPORTCHAT,
+        interval: float = DEFAULT_INTERVAL,
+        retention: float = DEFAULT_RETENTION,
+        pool: Optional[ClientPool] = None,
+    ):
+        self.collection_name = collection_name
+        self.interval = interval
+        self.retention = retention
+        self.pool = pool or get_pool()
+        self.stats = SamplerStats()
+
+        self._samples: Deque[TelemetrySample] = deque(maxlen=max(1, int(retention / interval)))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._multi_tenancy: Optional[bool] = None
+
+    def start(self) -> "TelemetrySampler":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            self.sample_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - t0)))
+
+    def _record_error(self, source: str, e: Exception):
+        self.stats.errors += 1
+        self.stats.last_error = f"{source}: {e}"
+
+    def sample_once(self) -> TelemetrySample:
+        """Collect one sample; each source fails independently."""
+        t0 = time.perf_counter()
+        sample = TelemetrySample(timestamp=time.time())
+
+        profile = get_heap_profile()
+        if profile is not None:
+            sample.memory_mb = profile.total("inuse_space") / MIB
+
+        try:
+            client = self.pool.get()
+            collection = client.collections.get(self.collection_name)
+            if self._multi_tenancy is None:
+                self._multi_tenancy = collection.config.get().multi_tenancy_config.enabled
+            if self._multi_tenancy:
+                sample.tenant_count = len(collection.tenants.get())
+            else:
+                sample.object_count = collection.aggregate.over_all(total_count=True).total_count
+        except Exception as e:
+            # The collection may have been recreated with different settings
+            self._multi_tenancy = None
+            self._record_error("counts", e)
+
+        try:
+            nodes = self.pool.get().cluster.nodes(output="verbose")
+            sample.nodes = [
+                NodeSample(n.name, n.status, n.stats.object_count, n.stats.shard_count) for n in nodes
+            ]
+            sample.shards = [
+                ShardSample(
+                    node=s.node,
+                    collection=s.collection,
+                    name=s.name,
+                    object_count=s.object_count,
+                    indexing_status=s.vector_indexing_status,
+                    queue_length=s.vector_queue_length,
+                )
+                for n in nodes
+                for s in n.shards
+                if s.collection == self.collection_name
+            ]
+        except Exception as e:
+            self._record_error("nodes", e)
+
+        with self._lock:
+            self._samples.append(sample)
+            self.stats.ticks += 1
+            self.stats.last_tick_seconds = time.perf_counter() - t0
+        return sample
+
+    def latest(self) -> Optional[TelemetrySample]:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def history(self) -> List[TelemetrySample]:
+        with self._lock:
+            return list(self._samples)
+
+    def series(self, name: str) -> Tuple[List[float], List[Any]]:
+        """(timestamps, values) of one `TelemetrySample` field, skipping ticks where it's missing."""
+        times, values = [], []
+        for sample in self.history():
+            value = getattr(sample, name)
+            if value is not None:
+                times.append(sample.timestamp)
+                values.append(value)
+        return times, values
+
+
+_samplers: Dict[str, TelemetrySampler] = {}
+_samplers_lock = threading.Lock()
+
+
+def get_sampler(collection_name: str = CollectionName.SUPPORTCHAT) -> TelemetrySampler:
+    """The process-wide, running sampler for a collection, shared by every session."""
+    with _samplers_lock:
+        if collection_name not in _samplers:
+            _samplers[collection_name] = TelemetrySampler(
+                collection_name,
+                interval=float(os.environ.get("TELEMETRY_INTERVAL", DEFAULT_INTERVAL)),
+                retention=float(os.environ.get("TELEMETRY_RETENTION", DEFAULT_RETENTION)),
+            ).start()
+        return _samplers[collection_name]
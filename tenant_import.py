@@ -0,0 +1,349 @@
+"""Tenant-aware import for multi-tenant collections.
+
+Rather than mixing all tenants in one batch stream and relying on
+`auto_tenant_creation`, this:
+
+1. assigns every object to a tenant with a configurable function (reading only the
+   properties it needs), and creates all missing tenants in bulk up front;
+2. splits the tenants over worker processes, balanced by object count;
+3. in each worker, buffers objects per tenant and sends each tenant's objects in their
+   own batch context, so every batch request writes to a single tenant shard.
+
+Per-tenant object counts, failures and throughput are reported, to see how the
+number of tenants affects ingestion speed.
+
+Tenant functions are only called in the main process, so any callable will do. With
+`plan_partitions`, high-volume companies get a tenant of their own and the rest share a
+catch-all tenant (the company-partitioned layout, see `helpers.partitioned_query`).
+`time_partitioned_import` assigns objects to one tenant per `created_at` month or
+quarter instead (see `time_partitions`).
+"""
+
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import multiprocessing
+import queue
+import time
+
+from tqdm import tqdm
+from weaviate.classes.tenants import Tenant
+
+from checkpoints import clear_state, dead_letter_record, state_dir_for, write_dead_letters
+from helpers import (
+    CATCH_ALL_TENANT,
+    CollectionName,
+    CompanyPartitions,
+    company_tenant_name,
+    connect_to_weaviate,
+    get_partitions,
+)
+from hdf5_io import read_property, read_rows
+from import_stats import CollectionStats, failed_rows, publish_stats, range_stats_path
+from ingest import tenant_names
+from time_partitions import BUCKET_FUNCTIONS, Granularity
+
+
+TenantFunction = Callable[[str], str]
+
+TENANT_CREATE_CHUNK = 100
+DEFAULT_FLUSH_ROWS = 2000
+DEFAULT_MAX_BUFFERED_ROWS = 20_000
+DEFAULT_PARTITION_MIN_OBJECTS = 20_000
+
+
+def tenant_by_author_length(company_author: str) -> str:
+    """The workshop's arbitrary assignment: one of five fixed tenants."""
+    return tenant_names[len(company_author) % len(tenant_names)]
+
+
+def tenant_by_company(company_author: str) -> str:
+    """One tenant per company account, e.g. `AppleSupport`."""
+    return company_tenant_name(company_author)
+
+
+TENANT_FUNCTIONS: Dict[str, TenantFunction] = {
+    "author-length": tenant_by_author_length,
+    "company": tenant_by_company,
+}
+
+
+def plan_partitions(file_path: str, min_objects: int = DEFAULT_PARTITION_MIN_OBJECTS) -> CompanyPartitions:
+    """Give every company with at least `min_objects` objects in the file a partition of its own.
+
+    If the collection already has partitions, they are kept as they are, so that
+    importing more data never moves a company to another partition.
+    """
+    with connect_to_weaviate() as client:
+        existing = get_partitions(client.collections.get(CollectionName.SUPPORTCHAT), ttl_seconds=0)
+    if existing is not None:
+        return existing
+    counts = Counter(read_property(file_path, "company_author"))
+    return CompanyPartitions(
+        frozenset(company_tenant_name(c) for c, n in counts.items() if c and n >= min_objects)
+    )
+
+
+@dataclass
+class TenantStats:
+    tenant: str
+    objects: int = 0
+    imported: int = 0
+    failed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class TenantImportSummary:
+    total: int
+    workers: int
+    seconds: float
+    tenants_created: int
+    create_seconds: float
+    tenants: Dict[str, TenantStats] = field(default_factory=dict)
+    state_dir: Optional[str] = None
+
+    @property
+    def imported(self) -> int:
+        return sum(t.imported for t in self.tenants.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(t.failed for t in self.tenants.values())
+
+    def print(self, top_n: int = 20):
+        print(
+            f"Imported {self.imported} of {self.total} objects into {len(self.tenants)} tenants in "
+            f"{self.seconds:.1f}s ({self.imported / self.seconds if self.seconds else 0:.0f} objects/s) "
+            f"using {self.workers} worker(s)."
+        )
+        print(f"Created {self.tenants_created} tenants in {self.create_seconds:.2f}s.")
+        by_size = sorted(self.tenants.values(), key=lambda t: t.objects, reverse=True)
+        for t in by_size[:top_n]:
+            print(
+                f"  {t.tenant:30} {t.imported:8} imported {t.failed:6} failed "
+                f"{t.batches:4} batches {t.objects_per_second:8.0f} objects/s"
+            )
+        if len(by_size) > top_n:
+            print(f"  ... and {len(by_size) - top_n} more tenants")
+        if self.failed:
+            print(f"Failed objects were saved to {self.state_dir}; replay them with --retry-dead-letters")
+
+
+def tenant_state_dir_for(file_path: str) -> str:
+    """The state directory of tenant imports, apart from the one `ingest` resumes from."""
+    return str(Path(state_dir_for(file_path)) / "tenants")
+
+
+def assign_tenants(file_path: str, tenant_fn: TenantFunction, tenant_property: str = "company_author") -> List[str]:
+    """The tenant of every object in the file, in file order, from one of its properties."""
+    return [tenant_fn(value or "") for value in read_property(file_path, tenant_property)]
+
+
+def create_tenants(tenants: Sequence[str]) -> int:
+    """Create the tenants that don't exist yet, in bulk. Returns how many were created."""
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        existing = set(collection.tenants.get().keys())
+        missing = sorted(set(tenants) - existing)
+        for i in range(0, len(missing), TENANT_CREATE_CHUNK):
+            collection.tenants.create([Tenant(name=t) for t in missing[i : i + TENANT_CREATE_CHUNK]])
+    return len(missing)
+
+
+def balance_tenants(counts: Dict[str, int], workers: int) -> List[List[str]]:
+    """Split tenants over `workers` groups of similar object counts (largest first, to the lightest group)."""
+    groups: List[List[str]] = [[] for _ in range(max(1, min(workers, len(counts))))]
+    loads = [0] * len(groups)
+    for tenant, count in sorted(counts.items(), key=lambda kv: kv[1], reverse=True):
+        i = loads.index(min(loads))
+        groups[i].append(tenant)
+        loads[i] += count
+    return groups
+
+
+def import_tenants(
+    file_path: str,
+    assignments: List[str],
+    tenants: Sequence[str],
+    batch_size: int = 200,
+    worker: int = 0,
+    on_progress: Optional[Callable[[int], None]] = None,
+    state_dir: Optional[str] = None,
+    flush_rows: int = DEFAULT_FLUSH_ROWS,
+    max_buffered_rows: int = DEFAULT_MAX_BUFFERED_ROWS,
+) -> Dict[str, TenantStats]:
+    """Import the objects of `tenants` from `file_path`, one tenant per batch context.
+
+    Only the rows assigned to `tenants` are read. Objects are buffered per tenant and sent once a tenant has `flush_rows` of them, or
+    when more than `max_buffered_rows` are buffered in total (largest tenants first).
+    """
+    mine = set(tenants)
+    stats = {t: TenantStats(t) for t in tenants}
+    buffers: Dict[str, List[tuple]] = defaultdict(list)
+    buffered = 0
+    dead_letter_path = Path(state_dir) / f"deadletter-tenants-{worker}.jsonl" if state_dir else None
+    stats_path = range_stats_path(state_dir, f"tenants-{worker}") if state_dir else None
+    collection_stats = CollectionStats()
+
+    with connect_to_weaviate() as client:
+
+        def send(tenant: str):
+            nonlocal buffered
+            rows = buffers.pop(tenant)
+            buffered -= len(rows)
+            t0 = time.perf_counter()
+            with client.batch.fixed_size(batch_size=batch_size) as batch:
+                for uuid, properties, vectors in rows:
+                    batch.add_object(
+                        collection=CollectionName.SUPPORTCHAT,
+                        uuid=uuid,
+                        properties=properties,
+                        vector={"text_with_metadata": vectors["text_with_metadata"]},
+                        tenant=tenant,
+                    )
+            failed_objects = client.batch.failed_objects
+
+            s = stats[tenant]
+            s.seconds += time.perf_counter() - t0
+            s.batches += -(-len(rows) // batch_size)
+            s.failed += len(failed_objects)
+            s.imported += len(rows) - len(failed_objects)
+            if failed_objects and dead_letter_path is not None:
+                write_dead_letters(dead_letter_path, map(dead_letter_record, failed_objects))
+            if stats_path is not None:
+                skip = failed_rows([uuid for uuid, _, _ in rows], failed_objects)
+                scope = collection_stats.scope(tenant)
+                for i, (_, properties, _) in enumerate(rows):
+                    if i not in skip:
+                        scope.add(properties)
+                collection_stats.save(stats_path)
+            if on_progress is not None:
+                on_progress(len(rows))
+
+        indices = [i for i, tenant in enumerate(assignments) if tenant in mine]
+        position = 0
+        for slab in read_rows(file_path, indices):
+            for i in range(len(slab)):
+                tenant = assignments[indices[position + i]]
+                buffers[tenant].append(slab.row(i))
+                stats[tenant].objects += 1
+                buffered += 1
+                if len(buffers[tenant]) >= flush_rows:
+                    send(tenant)
+            position += len(slab)
+            while buffered > max_buffered_rows:
+                send(max(buffers, key=lambda t: len(buffers[t])))
+
+        for tenant in list(buffers):
+            send(tenant)
+
+    return stats
+
+
+def _tenant_worker(args) -> Dict[str, TenantStats]:
+    file_path, assignments, tenants, batch_size, worker, progress_queue, state_dir = args
+    return import_tenants(
+        file_path, assignments, tenants, batch_size, worker, progress_queue.put, state_dir
+    )
+
+
+def tenant_import(
+    file_path: str,
+    tenant_fn: TenantFunction = tenant_by_author_length,
+    workers: int = 1,
+    batch_size: int = 200,
+    tenants: Sequence[str] = (),
+    tenant_property: str = "company_author",
+) -> TenantImportSummary:
+    """Import an export file into a multi-tenant collection, tenant by tenant.
+
+    `tenant_fn` is called with each object's `tenant_property`. `tenants` are created
+    even if no object is assigned to them.
+    """
+    assignments = assign_tenants(file_path, tenant_fn, tenant_property)
+    counts: Dict[str, int] = defaultdict(int)
+    for tenant in assignments:
+        counts[tenant] += 1
+
+    t0 = time.perf_counter()
+    created = create_tenants(list(counts) + list(tenants))
+    create_seconds = time.perf_counter() - t0
+
+    state_dir = tenant_state_dir_for(file_path)
+    clear_state(state_dir)
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+
+    groups = balance_tenants(counts, workers)
+    progress_bar = tqdm(total=len(assignments), desc="Importing objects", unit="obj")
+    t0 = time.perf_counter()
+
+    stats: Dict[str, TenantStats] = {}
+    if len(groups) == 1:
+        stats = import_tenants(
+            file_path, assignments, groups[0], batch_size, on_progress=progress_bar.update, state_dir=state_dir
+        )
+    else:
+        # gRPC channels don't survive fork(), so always start fresh interpreters
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager, ProcessPoolExecutor(
+            max_workers=len(groups), mp_context=ctx
+        ) as executor:
+            progress_queue = manager.Queue()
+            futures = [
+                executor.submit(
+                    _tenant_worker,
+                    (file_path, assignments, group, batch_size, i, progress_queue, state_dir),
+                )
+                for i, group in enumerate(groups)
+            ]
+            while not all(f.done() for f in futures) or not progress_queue.empty():
+                try:
+                    progress_bar.update(progress_queue.get(timeout=0.5))
+                except queue.Empty:
+                    continue
+            for f in futures:
+                stats.update(f.result())
+
+    progress_bar.close()
+    publish_stats(state_dir)
+    return TenantImportSummary(
+        total=len(assignments),
+        workers=len(groups),
+        seconds=time.perf_counter() - t0,
+        tenants_created=created,
+        create_seconds=create_seconds,
+        tenants=stats,
+        state_dir=state_dir,
+    )
+
+
+def partitioned_import(
+    file_path: str,
+    min_objects: int = DEFAULT_PARTITION_MIN_OBJECTS,
+    workers: int = 1,
+    batch_size: int = 200,
+) -> TenantImportSummary:
+    """Import an export file into the company-partitioned layout."""
+    partitions = plan_partitions(file_path, min_objects)
+    print(f"{len(partitions.tenants)} companies get a partition of their own; the rest go to {CATCH_ALL_TENANT}.")
+    return tenant_import(file_path, partitions.tenant_for, workers, batch_size, tenants=[CATCH_ALL_TENANT])
+
+
+def time_partitioned_import(
+    file_path: str,
+    granularity: Granularity = "month",
+    workers: int = 1,
+    batch_size: int = 200,
+) -> TenantImportSummary:
+    """Import an export file into the time-partitioned layout, one tenant per `created_at` bucket."""
+    return tenant_import(
+        file_path, BUCKET_FUNCTIONS[granularity], workers, batch_size, tenant_property="created_at"
+    )
@@ -0,0 +1,266 @@
+"""Keep only recently used tenants active.
+
+An ACTIVE tenant's shard (and its HNSW index) stays loaded in memory whether or not
+anyone queries it. With thousands of tenants, and only a few in use at a time, the
+manager:
+
+- tracks tenant accesses (every `weaviate_query` / `get_top_companies` call on a
+  tenant, via `helpers.tenant_access_hook`) in an LRU of active tenants;
+- deactivates tenants that have been idle longer than `idle_seconds`, and the least
+  recently used ones while there are more than `max_active` active tenants or Weaviate's
+  heap is over `memory_budget_mb`;
+- reactivates a tenant on its first access, waiting until its shard is loaded.
+
+Tenants are set INACTIVE (kept on local disk) by default, or OFFLOADED to cloud
+storage with `offload=True`, which needs an offload module (e.g. `offload-s3`) enabled.
+
+Configure the app's manager with `TENANT_IDLE_SECONDS` (default 600),
+`TENANT_MAX_ACTIVE` (default 0, no limit), `TENANT_MEMORY_BUDGET_MB` (default 0, no
+limit) and `TENANT_OFFLOAD` (`1` to offload).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import os
+import threading
+import time
+
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+from client_pool import ClientPool, get_pool
+from helpers import CollectionName
+from telemetry import get_sampler
+
+
+DEFAULT_IDLE_SECONDS = 600.0
+DEFAULT_SWEEP_INTERVAL = 30.0
+ACTIVATION_TIMEOUT = 300.0
+ACTIVATION_POLL_INTERVAL = 0.5
+
+_LOADED = {TenantActivityStatus.ACTIVE, TenantActivityStatus.HOT}
+
+
+@dataclass
+class LifecycleStats:
+    hits: int = 0  # Accesses to a tenant that was already active
+    misses: int = 0  # Accesses that had to activate the tenant first
+    activations: int = 0
+    deactivations: int = 0
+    activation_seconds_total: float = 0.0
+    max_activation_seconds: float = 0.0
+    errors: int = 0
+    last_error: Optional[str] = None
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def mean_activation_ms(self) -> float:
+        if self.activations == 0:
+            return 0.0
+        return 1000 * self.activation_seconds_total / self.activations
+
+
+class TenantLifecycleManager:
+    def __init__(
+        self,
+        collection_name: str = CollectionName.SUPPORTCHAT,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        max_active: int = 0,
+        memory_budget_mb: float = 0.0,
+        offload: bool = False,
+        memory_mb: Optional[Callable[[], Optional[float]]] = None,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL,
+        pool: Optional[ClientPool] = None,
+    ):
+        self.collection_name = collection_name
+        self.idle_seconds = idle_seconds
+        self.max_active = max_active
+        self.memory_budget_mb = memory_budget_mb
+        self.offload = offload
+        self.memory_mb = memory_mb
+        self.sweep_interval = sweep_interval
+        self.pool = pool or get_pool()
+        self.stats = LifecycleStats()
+
+        # Active tenants -> last access (monotonic), least recently used first
+        self._active: "OrderedDict[str, float]" = OrderedDict()
+        self._activating: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _collection(self):
+        return self.pool.get().collections.get(self.collection_name)
+
+    @property
+    def idle_status(self) -> TenantActivityStatus:
+        return TenantActivityStatus.OFFLOADED if self.offload else TenantActivityStatus.INACTIVE
+
+    def start(self) -> "TenantLifecycleManager":
+        """Seed the LRU with the currently active tenants and start sweeping in the background."""
+        now = time.monotonic()
+        tenants = self._collection().tenants.get()
+        with self._lock:
+            for name, tenant in sorted(tenants.items()):
+                if tenant.activity_status in _LOADED:
+                    self._active.setdefault(name, now)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="tenant-lifecycle", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sweep_interval + 10)
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self._record_error("sweep", e)
+
+    def _record_error(self, source: str, e: Exception):
+        self.stats.errors += 1
+        self.stats.last_error = f"{source}: {e}"
+
+    def active_tenants(self) -> List[str]:
+        """Active tenants, least recently used first."""
+        with self._lock:
+            return list(self._active)
+
+    def touch(self, tenant: str):
+        """Record an access to `tenant`, activating it first if needed."""
+        while True:
+            with self._lock:
+                if tenant in self._active:
+                    self._active[tenant] = time.monotonic()
+                    self._active.move_to_end(tenant)
+                    self.stats.hits += 1
+                    return
+                pending = self._activating.get(tenant)
+                if pending is None:
+                    pending = self._activating[tenant] = threading.Event()
+                    self.stats.misses += 1
+                    break
+            # Another session is activating it already
+            pending.wait(ACTIVATION_TIMEOUT)
+            with self._lock:
+                if tenant in self._active:
+                    self._active[tenant] = time.monotonic()
+                    self._active.move_to_end(tenant)
+                    self.stats.hits += 1
+                    return
+
+        try:
+            seconds = self._activate(tenant)
+            with self._lock:
+                self._active[tenant] = time.monotonic()
+                self.stats.activations += 1
+                self.stats.activation_seconds_total += seconds
+                self.stats.max_activation_seconds = max(self.stats.max_activation_seconds, seconds)
+        finally:
+            with self._lock:
+                del self._activating[tenant]
+            pending.set()
+        # Make room for it right away, rather than at the next sweep
+        self._enforce_limits(keep=tenant)
+
+    def on_access(self, collection_name: str, tenant: str):
+        """For `helpers.tenant_access_hook`: `touch` tenants of this manager's collection."""
+        if collection_name == self.collection_name:
+            self.touch(tenant)
+
+    def _activate(self, tenant: str) -> float:
+        """Set `tenant` ACTIVE and wait until it's loaded; returns the seconds taken."""
+        t0 = time.perf_counter()
+        collection = self._collection()
+        current = collection.tenants.get_by_name(tenant)
+        if current is None:
+            raise ValueError(f"Tenant {tenant} does not exist")
+        if current.activity_status not in _LOADED:
+            collection.tenants.update(Tenant(name=tenant, activity_status=TenantActivityStatus.ACTIVE))
+            # Offloaded tenants are downloaded asynchronously (ONLOADING) before becoming ACTIVE
+            current = collection.tenants.get_by_name(tenant)
+            while current.activity_status not in _LOADED:
+                if time.perf_counter() - t0 > ACTIVATION_TIMEOUT:
+                    raise TimeoutError(f"Tenant {tenant} is still {current.activity_status.value}")
+                time.sleep(ACTIVATION_POLL_INTERVAL)
+                current = collection.tenants.get_by_name(tenant)
+        return time.perf_counter() - t0
+
+    def _deactivate(self, tenants: List[str]):
+        if not tenants:
+            return
+        self._collection().tenants.update(
+            [Tenant(name=t, activity_status=self.idle_status) for t in tenants]
+        )
+        self.stats.deactivations += len(tenants)
+
+    def _pop_lru(self, keep: Optional[str]) -> Optional[str]:
+        for tenant in self._active:
+            if tenant != keep:
+                del self._active[tenant]
+                return tenant
+        return None
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Deactivate least recently used tenants while over `max_active`, or one if over the memory budget."""
+        evicted = []
+        with self._lock:
+            while self.max_active and len(self._active) > self.max_active:
+                tenant = self._pop_lru(keep)
+                if tenant is None:
+                    break
+                evicted.append(tenant)
+        if not evicted and self.memory_budget_mb and self.memory_mb is not None:
+            # Heap usage only drops after the shards unload, so evict one tenant per check
+            used = self.memory_mb()
+            if used is not None and used > self.memory_budget_mb:
+                with self._lock:
+                    tenant = self._pop_lru(keep)
+                if tenant is not None:
+                    evicted.append(tenant)
+        self._deactivate(evicted)
+
+    def sweep(self) -> List[str]:
+        """Deactivate idle tenants, then enforce the limits. Returns the idle tenants deactivated."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [t for t, last in self._active.items() if last < cutoff]
+            for tenant in idle:
+                del self._active[tenant]
+        self._deactivate(idle)
+        self._enforce_limits()
+        return idle
+
+
+_managers: Dict[str, TenantLifecycleManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_lifecycle_manager(collection_name: str = CollectionName.SUPPORTCHAT) -> TenantLifecycleManager:
+    """The process-wide, running lifecycle manager for a multi-tenant collection."""
+    with _managers_lock:
+        if collection_name not in _managers:
+            sampler = get_sampler(collection_name)
+
+            def memory_mb() -> Optional[float]:
+                sample = sampler.latest()
+                return sample.memory_mb if sample is not None else None
+
+            _managers[collection_name] = TenantLifecycleManager(
+                collection_name,
+                idle_seconds=float(os.environ.get("TENANT_IDLE_SECONDS", DEFAULT_IDLE_SECONDS)),
+                max_active=int(os.environ.get("TENANT_MAX_ACTIVE", 0)),
+                memory_budget_mb=float(os.environ.get("TENANT_MEMORY_BUDGET_MB", 0)),
+                offload=os.environ.get("TENANT_OFFLOAD", "") == "1",
+                memory_mb=memory_mb,
+            ).start()
+        return _managers[collection_name]
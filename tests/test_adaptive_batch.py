@@ -0,0 +1,115 @@
+"""How `AdaptiveBatchController.observe` moves the batch settings from one window to the next."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from adaptive_batch import AdaptiveBatchController, AdaptiveLimits, BatchSettings
+
+
+def _controller(**kwargs) -> AdaptiveBatchController:
+    return AdaptiveBatchController(initial=BatchSettings(batch_size=200, concurrent_requests=2), log=None, **kwargs)
+
+
+def _failed(n: int, message: str = "invalid property"):
+    return [SimpleNamespace(message=message)] * n
+
+
+def test_healthy_windows_increase_batch_size_then_concurrency():
+    controller = _controller(limits=AdaptiveLimits(max_batch_size=400))
+
+    actions = [controller.observe(1000, [], 1.0).action for _ in range(4)]
+
+    assert actions == ["increase"] * 4
+    assert (controller.settings.batch_size, controller.settings.concurrent_requests) == (400, 4)
+
+
+def test_rate_limit_mode_increases_the_request_rate():
+    controller = _controller(mode="rate_limit")
+    controller.observe(1000, [], 1.0)
+    assert controller.settings.requests_per_minute == 4800 + 1200
+
+
+@pytest.mark.parametrize(
+    "failed, reason",
+    [(_failed(1, "429 Too Many Requests"), "throttled"), (_failed(20), "error rate")],
+)
+def test_throttling_and_errors_halve_the_settings(failed, reason):
+    controller = _controller()
+
+    decision = controller.observe(1000, failed, 1.0)
+
+    assert decision.action == "decrease" and reason in decision.reason
+    assert controller.settings == BatchSettings(batch_size=100, concurrent_requests=1, requests_per_minute=2400)
+
+
+def test_a_few_errors_are_tolerated():
+    assert _controller().observe(1000, _failed(5), 1.0).action == "increase"
+
+
+def test_decreases_stop_at_the_lower_limits():
+    controller = _controller()
+    for _ in range(5):
+        controller.observe(1000, _failed(1, "rate limit exceeded"), 1.0)
+    assert controller.settings == BatchSettings(batch_size=50, concurrent_requests=1, requests_per_minute=600)
+
+
+def test_a_growing_indexing_queue_backs_off_gently():
+    queue = iter([60_000, 70_000, 65_000])
+    controller = _controller(queue_length=lambda: next(queue))
+
+    first = controller.observe(1000, [], 1.0)
+    assert first.action == "decrease" and first.queue_length == 60_000
+    assert controller.settings.batch_size == 150
+    assert controller.observe(1000, [], 1.0).action == "decrease"
+    # Still long, but draining
+    assert "indexing queue" not in controller.observe(1000, [], 1.0).reason
+
+
+def test_rising_latency_backs_off_gently():
+    controller = _controller()
+    controller.observe(1000, [], 1.0)  # Baseline: 2 ms per object
+    batch_size = controller.settings.batch_size
+
+    decision = controller.observe(1000, [], 5.0)
+
+    assert decision.action == "decrease" and "latency" in decision.reason
+    assert controller.settings.batch_size == int(batch_size * 0.75)
+
+
+def test_an_increase_that_lowers_throughput_is_reverted_then_held():
+    controller = _controller(limits=AdaptiveLimits(cooldown_windows=2))
+    controller.observe(1000, [], 1.0)
+    before = controller.settings
+    controller.observe(1000, [], 1.0)
+
+    decision = controller.observe(1000, [], 1.5)
+    assert decision.action == "revert" and controller.settings == before
+
+    # Cooling down: no probing, even though throughput is fine again
+    assert [controller.observe(1000, [], 1.0).action for _ in range(3)] == ["hold", "hold", "increase"]
+    assert controller.settings.batch_size == before.batch_size + 100
+
+
+def test_a_decrease_is_followed_by_a_cooldown():
+    controller = _controller(limits=AdaptiveLimits(cooldown_windows=1))
+    controller.observe(1000, _failed(1, "429"), 1.0)
+    assert [controller.observe(1000, [], 1.0).action for _ in range(2)] == ["hold", "increase"]
+
+
+def test_empty_windows_and_upper_limits_hold():
+    controller = _controller(limits=AdaptiveLimits(max_batch_size=200, max_concurrency=2))
+
+    assert controller.observe(0, [], 0.0).reason == "empty window"
+    assert controller.observe(1000, [], 1.0).reason == "at the upper limits"
+    assert controller.settings == BatchSettings(batch_size=200, concurrent_requests=2)
+
+
+def test_best_is_the_fastest_setting_without_failures():
+    controller = _controller()
+    controller.observe(1000, [], 1.0)  # 1000/s at batch_size 200
+    controller.observe(1000, [], 0.5)  # 2000/s at 300
+    controller.observe(1000, _failed(1, "429"), 0.25)  # Faster, but with failures
+
+    assert controller.best.batch_size == 300 and controller.best_objects_per_second == 2000
+    assert "best 2000 objects/s" in controller.summary()
@@ -0,0 +1,127 @@
+"""Memory estimates, profile recommendation and sizing of a (fake) live collection."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from weaviate.classes.tenants import TenantActivityStatus
+
+import capacity_planner
+from capacity_planner import (
+    BASE_MB,
+    GC_OVERHEAD,
+    PROFILES,
+    ClusterShape,
+    DatasetShape,
+    estimate,
+    parse_memory_mb,
+    recommend,
+)
+from heap_profile import MIB
+
+
+DATASET = DatasetShape(objects=100_000, dimensions=384, source="test")
+
+
+@pytest.mark.parametrize(
+    "quantity, expected",
+    [("3000Mi", 3000), ("4Gi", 4096), ("2G", 2e9 / MIB), ("512Ki", 0.5), (f"{MIB}", 1), (" 1.5Gi ", 1536)],
+)
+def test_parse_memory_mb(quantity, expected):
+    assert parse_memory_mb(quantity) == pytest.approx(expected)
+
+
+def test_parse_memory_mb_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_memory_mb("lots")
+
+
+def test_estimate_of_an_uncompressed_index():
+    e = estimate(PROFILES["default"], DATASET, ClusterShape())
+
+    assert e.objects_per_node == 100_000
+    assert e.vectors_mb == pytest.approx(100_000 * 4 * 384 / MIB)
+    assert e.graph_mb == pytest.approx(100_000 * 2 * 32 * 10 / MIB)
+    assert e.training_mb == 0
+    assert e.total_mb == pytest.approx(BASE_MB + GC_OVERHEAD * (e.vectors_mb + e.graph_mb))
+
+
+def test_estimate_spreads_replicas_over_the_nodes():
+    e = estimate(PROFILES["bq"], DATASET, ClusterShape(nodes=4, replication_factor=2))
+
+    assert e.objects_per_node == 50_000
+    assert e.vectors_mb == pytest.approx(50_000 * 48 / MIB)
+
+
+def test_quantizers_are_provisioned_for_their_training_peak():
+    e = estimate(PROFILES["sq"], DATASET, ClusterShape(nodes=3, replication_factor=3))
+
+    # One shard per node, each with a replica on every node; each replica trains on its
+    # first 25k objects, uncompressed
+    assert e.vectors_mb == pytest.approx(100_000 * 384 / MIB)
+    assert e.training_mb == pytest.approx(3 * 25_000 * 4 * 384 / MIB)
+    assert e.total_mb == pytest.approx(BASE_MB + GC_OVERHEAD * (e.training_mb + e.graph_mb))
+
+
+def test_recommend_picks_the_first_profile_that_fits():
+    estimates = [estimate(p, DATASET, ClusterShape()) for p in PROFILES.values()]
+
+    assert recommend(estimates, None) is estimates[0]
+    limit = estimate(PROFILES["sq"], DATASET, ClusterShape()).total_mb / (1 - 0.2)
+    assert recommend(estimates, limit, headroom=0.2).profile.name == "sq"
+    assert recommend(estimates, 1.0) is None
+
+
+class FakePart:
+    def __init__(self, objects, active=True):
+        self.objects, self.active = objects, active
+        self.query = SimpleNamespace(fetch_objects=self.fetch_objects)
+
+    def __len__(self):
+        if not self.active:
+            raise RuntimeError("tenant not active")
+        return self.objects
+
+    def fetch_objects(self, limit, include_vector):
+        if not self.active:
+            raise RuntimeError("tenant not active")
+        vector = {name: [0.0] * 8 for name in include_vector}
+        return SimpleNamespace(objects=[SimpleNamespace(vector=vector)] if self.objects else [])
+
+
+def test_live_shapes_only_counts_active_tenants(monkeypatch):
+    statuses = {
+        "created-2017-01": TenantActivityStatus.OFFLOADED,
+        "created-2017-02": TenantActivityStatus.INACTIVE,
+        "created-2017-03": TenantActivityStatus.ACTIVE,
+        "created-2017-04": TenantActivityStatus.ACTIVE,
+    }
+    parts = {
+        name: FakePart(100 * (i + 1), active=status == TenantActivityStatus.ACTIVE)
+        for i, (name, status) in enumerate(statuses.items())
+    }
+    index_config = SimpleNamespace(quantizer=None, max_connections=32, ef=-1, ef_construction=128)
+    collection = SimpleNamespace(
+        name="SupportChat",
+        with_tenant=parts.__getitem__,
+        tenants=SimpleNamespace(get=lambda: {n: SimpleNamespace(activity_status=s) for n, s in statuses.items()}),
+        config=SimpleNamespace(
+            get=lambda: SimpleNamespace(
+                multi_tenancy_config=SimpleNamespace(enabled=True),
+                replication_config=SimpleNamespace(factor=1),
+                vector_config={"text_with_metadata": SimpleNamespace(vector_index_config=index_config)},
+            )
+        ),
+    )
+    client = SimpleNamespace(
+        collections=SimpleNamespace(get=lambda name: collection),
+        cluster=SimpleNamespace(nodes=lambda: ["node-1"]),
+    )
+    monkeypatch.setattr(capacity_planner, "connect_to_weaviate", contextmanager(lambda: (yield client)))
+
+    dataset, cluster, profile = capacity_planner.live_shapes()
+
+    assert (dataset.objects, dataset.dimensions) == (300 + 400, 8)
+    assert "2 of 4 tenants active" in dataset.source
+    assert cluster.nodes == 1
+    assert profile.name == "default"
@@ -0,0 +1,90 @@
+"""Committed offsets, what's left to import, and dead letters, for resumable imports."""
+
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import UUID
+
+import numpy as np
+import pytest
+
+from checkpoints import (
+    ImportCheckpoint,
+    clear_state,
+    load_committed,
+    read_dead_letters,
+    remaining_intervals,
+    state_dir_for,
+)
+
+
+def test_state_dir_is_named_after_the_source():
+    assert state_dir_for("data/support_chats.h5").endswith("support_chats")
+
+
+def test_resuming_skips_what_was_committed(tmp_path):
+    state_dir = str(tmp_path / "state")
+    ImportCheckpoint(state_dir, 0, 100, total=300).commit(40)
+    ImportCheckpoint(state_dir, 100, 200, total=300).commit(200)
+    ImportCheckpoint(state_dir, 200, 300, total=300)  # Started, nothing flushed yet
+
+    committed = load_committed(state_dir, total=300)
+    assert committed == [(0, 40), (100, 200)]
+    assert remaining_intervals(committed, 300) == [(40, 100), (200, 300)]
+
+
+def test_overlapping_ranges_are_merged(tmp_path):
+    state_dir = str(tmp_path)
+    ImportCheckpoint(state_dir, 0, 50, total=100).commit(50)
+    ImportCheckpoint(state_dir, 40, 100, total=100).commit(70)
+
+    assert load_committed(state_dir, total=100) == [(0, 70)]
+    assert remaining_intervals([(0, 70)], 100) == [(70, 100)]
+    assert remaining_intervals([], 100) == [(0, 100)]
+    assert remaining_intervals([(0, 100)], 100) == []
+
+
+def test_a_checkpoint_for_another_source_is_refused(tmp_path):
+    ImportCheckpoint(str(tmp_path), 0, 100, total=100).commit(10)
+    with pytest.raises(ValueError):
+        load_committed(str(tmp_path), total=120)
+
+
+def test_the_latest_commit_wins(tmp_path):
+    checkpoint = ImportCheckpoint(str(tmp_path), 0, 100, total=100)
+    checkpoint.commit(10)
+    checkpoint.commit(60)
+
+    assert load_committed(str(tmp_path), total=100) == [(0, 60)]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def _error_object(i: int):
+    obj = SimpleNamespace(
+        uuid=UUID(int=i),
+        collection="SupportChat",
+        tenant=None,
+        properties={"text": f"text {i}", "created_at": datetime(2017, 1, i + 1), "score": np.float32(0.5)},
+        vector={"text_with_metadata": np.array([float(i), 1.0], dtype=np.float32)},
+    )
+    return SimpleNamespace(object_=obj, message="rejected")
+
+
+def test_rejected_objects_go_to_the_dead_letter_file(tmp_path):
+    ImportCheckpoint(str(tmp_path), 0, 10, total=20).commit(10, [_error_object(0), _error_object(1)])
+    ImportCheckpoint(str(tmp_path), 10, 20, total=20).commit(20, [_error_object(2)])
+
+    records = read_dead_letters(str(tmp_path))
+    assert [r["uuid"] for r in records] == [str(UUID(int=i)) for i in range(3)]
+    assert records[0]["properties"] == {"text": "text 0", "created_at": "2017-01-01T00:00:00", "score": 0.5}
+    assert records[1]["vector"] == {"text_with_metadata": [1.0, 1.0]}
+    assert records[2]["message"] == "rejected"
+
+
+def test_clear_state(tmp_path):
+    state_dir = tmp_path / "state"
+    ImportCheckpoint(str(state_dir), 0, 10, total=10).commit(5)
+
+    clear_state(str(state_dir))
+    assert not state_dir.exists()
+    assert load_committed(str(state_dir), total=10) == []
+    clear_state(str(state_dir))  # Nothing to clear
@@ -0,0 +1,81 @@
+"""Bulk existence checks against a fake collection, and when the saved UUID set is trusted."""
+
+from types import SimpleNamespace
+import uuid
+
+import pytest
+
+from dedup import ExistenceIndex
+
+
+def _uuid(i: int) -> str:
+    return str(uuid.UUID(int=i))
+
+
+class FakeCollection:
+    def __init__(self, uuids):
+        self.uuids = set(uuids)
+        self.scans = 0
+        self.query = SimpleNamespace(fetch_objects=self.fetch_objects)
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def iterator(self, return_properties, cache_size):
+        self.scans += 1
+        return [SimpleNamespace(uuid=uuid.UUID(u)) for u in sorted(self.uuids)]
+
+    def fetch_objects(self, filters, limit, return_properties):
+        found = [u for u in filters.value if u in self.uuids][:limit]
+        return SimpleNamespace(objects=[SimpleNamespace(uuid=uuid.UUID(u)) for u in found])
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "known.npy"
+
+
+def test_filter_new_resolves_unknown_uuids_in_pages(path):
+    collection = FakeCollection([_uuid(i) for i in range(5)])
+    index = ExistenceIndex(collection, path, page_size=2)
+    index._known = {uuid.UUID(_uuid(0)).bytes}
+
+    candidates = [_uuid(i) for i in (0, 1, 2, 7, 8, 8)]
+    assert index.filter_new(candidates) == [_uuid(7), _uuid(8)]
+
+    assert (index.stats.known_locally, index.stats.found_remotely, index.stats.new) == (2, 2, 2)
+    assert index.stats.requests == 2  # 4 unknown UUIDs, 2 per page
+    # Found remotely, so known locally from now on
+    assert index.filter_new([_uuid(1)]) == [] and index.stats.requests == 2
+
+
+def test_a_resumed_run_reuses_its_saved_set(path):
+    collection = FakeCollection([_uuid(i) for i in range(3)])
+    ExistenceIndex(collection, path, run_id="run-1").load_or_warm().save()
+
+    index = ExistenceIndex(collection, path, run_id="run-1").load_or_warm()
+    assert len(index) == 3 and collection.scans == 1
+
+
+def test_another_run_rebuilds_the_set(path):
+    collection = FakeCollection([_uuid(i) for i in range(3)])
+    ExistenceIndex(collection, path, run_id="run-1").load_or_warm().save()
+
+    # Same object count, different objects
+    collection.uuids = {_uuid(0), _uuid(1), _uuid(9)}
+    index = ExistenceIndex(collection, path, run_id="run-2").load_or_warm()
+
+    assert collection.scans == 2
+    assert index.filter_new([_uuid(2)]) == [_uuid(2)]
+    # Nor is a set trusted without a run ID
+    ExistenceIndex(collection, path).load_or_warm()
+    assert collection.scans == 3
+
+
+def test_a_changed_object_count_rebuilds_the_set(path):
+    collection = FakeCollection([_uuid(i) for i in range(3)])
+    ExistenceIndex(collection, path, run_id="run-1").load_or_warm().save()
+
+    collection.uuids.add(_uuid(5))
+    assert len(ExistenceIndex(collection, path, run_id="run-1").load_or_warm()) == 4
+    assert collection.scans == 2
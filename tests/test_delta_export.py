@@ -0,0 +1,129 @@
+"""Incremental exports against a fake collection: changes, deletions, the mark, and compaction."""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import uuid
+
+import pytest
+
+import delta_export
+from delta_export import Manifest, compact, export_delta
+from hdf5_io import read_slabs
+
+
+OLD = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _uuid(i: int) -> str:
+    return str(uuid.UUID(int=i))
+
+
+class FakeCollection:
+    """Objects by UUID; the UUID scan yields them in UUID order, like Weaviate's cursor."""
+
+    def __init__(self):
+        self.objects = {}
+        self.during_scan = {}  # Position in the scan -> callback run before yielding it
+
+    def put(self, i: int, text: str, updated: datetime = OLD):
+        self.objects[_uuid(i)] = SimpleNamespace(
+            uuid=uuid.UUID(_uuid(i)),
+            properties={"text": text},
+            vector={"default": [float(i), 1.0]},
+            metadata=SimpleNamespace(last_update_time=updated),
+        )
+
+    def iterator(self, include_vector=False, return_properties=None, return_metadata=None, cache_size=None):
+        position = 0
+        cursor = ""
+        while True:
+            remaining = sorted(u for u in self.objects if u > cursor)
+            if not remaining:
+                return
+            if position in self.during_scan:
+                self.during_scan.pop(position)()
+                continue
+            cursor = remaining[0]
+            position += 1
+            yield self.objects[cursor]
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(
+        delta_export, "fetch_objects", lambda c, uuids, page_size: [c.objects[u] for u in uuids]
+    )
+    monkeypatch.setattr(delta_export, "tqdm", lambda iterable, **kwargs: iterable)
+    return collection
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest.load(str(tmp_path / "export.manifest.json"))
+
+
+def _texts(path):
+    return {u: t for slab in read_slabs(path) for u, t in zip(slab.uuids, slab.properties["text"])}
+
+
+def test_first_export_writes_the_base_and_an_unchanged_run_writes_nothing(collection, manifest):
+    for i in range(1, 4):
+        collection.put(i, f"v1 {i}")
+
+    first = export_delta(collection, manifest)
+    assert first.changed == 3
+    assert manifest.base is not None and manifest.base_count == 3
+
+    second = export_delta(collection, Manifest.load(manifest.path))
+    assert (second.changed, second.deleted, second.segment) == (0, 0, None)
+
+
+def test_changes_and_deletions_go_to_a_segment_and_compact_applies_them(collection, manifest):
+    for i in range(1, 4):
+        collection.put(i, f"v1 {i}")
+    export_delta(collection, manifest)
+
+    collection.put(2, "v2 2", updated=OLD + timedelta(days=1))
+    collection.put(4, "v1 4", updated=OLD + timedelta(days=1))
+    del collection.objects[_uuid(3)]
+    summary = export_delta(collection, manifest)
+
+    assert (summary.changed, summary.deleted) == (2, 1)
+    assert manifest.segments[0].deleted == [_uuid(3)]
+    path, count = compact(manifest)
+    assert count == 3
+    assert _texts(path) == {_uuid(1): "v1 1", _uuid(2): "v2 2", _uuid(4): "v1 4"}
+
+
+def test_an_object_written_behind_the_cursor_during_the_scan_is_exported_next_time(collection, manifest):
+    for i in (2, 4, 6):
+        collection.put(i, f"v1 {i}")
+    export_delta(collection, manifest)
+
+    now = datetime.now(timezone.utc)
+    # After the scan has passed UUID 2: create UUID 1 behind the cursor, then update UUID 6
+    # ahead of it, with a later update time than UUID 1
+    collection.during_scan[1] = lambda: collection.put(1, "created mid-scan", updated=now + timedelta(seconds=1))
+    collection.during_scan[2] = lambda: collection.put(6, "v2 6", updated=now + timedelta(seconds=2))
+    during = export_delta(collection, manifest)
+    assert during.changed == 1  # UUID 6; UUID 1 wasn't scanned
+
+    export_delta(collection, manifest)
+    # UUID 6 is exported again too, being newer than the mark (the start of the last scan)
+    assert set(_texts(manifest.segments[-1].path)) == {_uuid(1), _uuid(6)}
+
+    _, count = compact(manifest)
+    assert count == 4
+
+
+def test_a_new_uuid_with_an_old_update_time_is_exported(collection, manifest):
+    collection.put(1, "v1 1", updated=OLD + timedelta(days=2))
+    export_delta(collection, manifest)
+
+    # e.g. restored from a backup, with its original timestamp
+    collection.put(2, "restored", updated=OLD)
+    summary = export_delta(collection, manifest)
+
+    assert summary.changed == 1
+    assert _texts(manifest.segments[-1].path) == {_uuid(2): "restored"}
@@ -0,0 +1,50 @@
+"""Exact ground truth, and recall against it, for small datasets."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from evaluate_recall import evaluate, exact_neighbors
+
+
+VECTORS = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9], [0.7, 0.7]], dtype=np.float32)
+
+
+def test_exact_neighbors_across_blocks():
+    neighbors = exact_neighbors(VECTORS, np.array([0, 2]), k=2, block_size=2)
+    np.testing.assert_array_equal(neighbors, [[1, 4], [3, 4]])
+
+
+def test_exact_neighbors_with_fewer_vectors_than_k():
+    neighbors = exact_neighbors(VECTORS[:3], np.array([0, 1, 2]), k=10)
+    assert neighbors.shape == (3, 2)
+    assert (neighbors >= 0).all()
+
+
+def test_exact_neighbors_needs_two_vectors():
+    with pytest.raises(ValueError):
+        exact_neighbors(VECTORS[:1], np.array([0]), k=1)
+
+
+class FakeCollection:
+    """Exact search, so recall is 1."""
+
+    def __init__(self, uuids, vectors):
+        self.uuids, self.vectors = uuids, vectors
+        self.query = SimpleNamespace(near_vector=self.near_vector)
+
+    def near_vector(self, near_vector, target_vector, limit, return_properties):
+        order = np.argsort(-(self.vectors @ np.array(near_vector)) / np.linalg.norm(self.vectors, axis=1))
+        return SimpleNamespace(objects=[SimpleNamespace(uuid=self.uuids[i]) for i in order[:limit]])
+
+
+def test_evaluate_caps_k_at_the_true_neighbours():
+    uuids = [f"uuid-{i}" for i in range(3)]
+    query_idx = np.array([0, 1, 2])
+    neighbors = exact_neighbors(VECTORS[:3], query_idx, k=10)
+
+    recall, latencies, _ = evaluate(FakeCollection(uuids, VECTORS[:3]), uuids, VECTORS[:3], query_idx, neighbors, k=10)
+
+    assert recall == pytest.approx(1.0)
+    assert len(latencies) == 3
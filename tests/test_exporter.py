@@ -0,0 +1,47 @@
+"""Filling the tier files from the exported parts, including int8 calibration across parts."""
+
+import numpy as np
+import pytest
+
+from exporter import uuid_ranges, write_tiers
+from hdf5_io import ColumnarWriter, read_vectors, vector_encoding
+
+
+def test_uuid_ranges_cover_the_uuid_space():
+    ranges = uuid_ranges(4, tenant="created-2017-01")
+
+    assert ranges[0].after is None and ranges[-1].last is None
+    assert [r.after for r in ranges[1:]] == [r.last for r in ranges[:-1]]
+    assert [r.index for r in ranges] == [0, 1, 2, 3]
+
+
+@pytest.fixture
+def parts(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(30, 8)).astype(np.float32)
+    vectors[25] *= 20  # An outlier in the last part only
+    paths = []
+    for p, rows in enumerate([range(0, 10), range(10, 10), range(10, 30)]):  # The middle part is empty
+        path = str(tmp_path / f"part-{p}.h5")
+        with ColumnarWriter(path) as writer:
+            for i in rows:
+                writer.add(f"uuid-{i:02d}", {"text": str(i)}, {"text_with_metadata": vectors[i]})
+        paths.append(path)
+    return paths, vectors
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0), ("int8", 0.5)])
+def test_write_tiers(parts, tmp_path, dtype, tolerance):
+    part_paths, vectors = parts
+    tier_paths = {5: str(tmp_path / "tier-5.h5"), 15: str(tmp_path / "tier-15.h5"), 100: str(tmp_path / "tier-100.h5")}
+
+    outputs = write_tiers(part_paths, tier_paths, vector_dtype=dtype)
+
+    assert outputs == {tier_paths[5]: 5, tier_paths[15]: 15, tier_paths[100]: 30}
+    for size, path in tier_paths.items():
+        assert vector_encoding(path) == dtype
+        uuids, restored = read_vectors(path, "text_with_metadata")
+        n = min(size, len(vectors))
+        assert uuids == [f"uuid-{i:02d}" for i in range(n)]
+        # int8 scales are calibrated on every part, so the late outlier isn't clipped
+        np.testing.assert_allclose(restored, vectors[:n], rtol=0, atol=tolerance)
@@ -0,0 +1,115 @@
+"""Reading & writing the export files: whole columns, selected rows, both layouts, quantization."""
+
+import json
+
+import h5py
+import numpy as np
+import pytest
+
+from hdf5_io import (
+    ColumnarWriter,
+    convert_to_columnar,
+    read_property,
+    read_rows,
+    read_slabs,
+    read_vectors,
+    vector_encoding,
+    vector_ranges,
+)
+
+
+@pytest.fixture
+def columnar_file(tmp_path):
+    path = str(tmp_path / "columnar.h5")
+    with ColumnarWriter(path, buffer_rows=4) as writer:
+        for i in range(10):
+            properties = {"text": f"text {i}", "company_author": f"company{i % 3}" if i % 4 else None}
+            writer.add(f"uuid-{i}", properties, {"text_with_metadata": [float(i), 1.0]})
+    return path
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    path = str(tmp_path / "legacy.h5")
+    with h5py.File(path, "w") as hf:
+        for i in range(5):
+            group = hf.create_group(f"uuid-{i}")
+            group["object"] = json.dumps({"text": f"text {i}"})
+            group["vector_text_with_metadata"] = np.array([float(i), 1.0], dtype=np.float32)
+    return path
+
+
+def test_read_property_of_a_columnar_file(columnar_file):
+    assert read_property(columnar_file, "text") == [f"text {i}" for i in range(10)]
+    assert read_property(columnar_file, "company_author") == [
+        None if i % 4 == 0 else f"company{i % 3}" for i in range(10)
+    ]
+    assert read_property(columnar_file, "missing") == [None] * 10
+
+
+def test_read_property_of_a_legacy_file(legacy_file):
+    assert read_property(legacy_file, "text", slab_size=2) == [f"text {i}" for i in range(5)]
+    assert read_property(legacy_file, "company_author") == [None] * 5
+
+
+def test_read_property_of_an_empty_file(tmp_path):
+    path = str(tmp_path / "empty.h5")
+    ColumnarWriter(path).close()
+    assert read_property(path, "text") == []
+
+
+@pytest.mark.parametrize("layout", ["columnar_file", "legacy_file"])
+def test_read_rows_reads_only_the_selected_rows(layout, request):
+    path = request.getfixturevalue(layout)
+    slabs = list(read_rows(path, [0, 2, 3, 4], slab_size=3))
+
+    assert [slab.start for slab in slabs] == [0, 4]
+    assert [u for slab in slabs for u in slab.uuids] == ["uuid-0", "uuid-2", "uuid-3", "uuid-4"]
+    assert [t for slab in slabs for t in slab.properties["text"]] == ["text 0", "text 2", "text 3", "text 4"]
+    vectors = np.concatenate([slab.vectors["text_with_metadata"] for slab in slabs])
+    np.testing.assert_array_equal(vectors[:, 0], [0, 2, 3, 4])
+
+
+def test_read_slabs_splits_the_file(columnar_file):
+    slabs = list(read_slabs(columnar_file, start=2, stop=9, slab_size=3))
+    assert [(slab.start, len(slab)) for slab in slabs] == [(2, 3), (5, 3), (8, 1)]
+
+
+@pytest.fixture
+def float32_file(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    vectors[150] *= 10  # An outlier late in the file
+    path = str(tmp_path / "float32.h5")
+    with ColumnarWriter(path, buffer_rows=50) as writer:
+        for i, vector in enumerate(vectors):
+            writer.add(f"uuid-{i}", {"text": str(i)}, {"text_with_metadata": vector})
+    return path, vectors
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0), ("float16", 1e-2), ("int8", 0.2)])
+def test_quantized_vectors_round_trip(float32_file, tmp_path, dtype, tolerance):
+    path, vectors = float32_file
+    converted = str(tmp_path / f"converted-{dtype}.h5")
+
+    assert convert_to_columnar(path, converted, slab_size=50, vector_dtype=dtype) == len(vectors)
+
+    assert vector_encoding(converted) == dtype
+    uuids, restored = read_vectors(converted, "text_with_metadata")
+    assert uuids == [f"uuid-{i}" for i in range(len(vectors))]
+    assert restored.dtype == np.float32
+    # int8 error is at most half a step of each dimension's range, outliers included
+    np.testing.assert_allclose(restored, vectors, rtol=0, atol=tolerance)
+
+
+def test_int8_needs_the_vector_ranges(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarWriter(str(tmp_path / "int8.h5"), vector_dtype="int8")
+    assert not (tmp_path / "int8.h5").exists()
+
+    vectors = np.array([[-1.0, 0.0], [1.0, 4.0]], dtype=np.float32)
+    path = str(tmp_path / "int8.h5")
+    with ColumnarWriter(path, vector_dtype="int8", vector_ranges={"v": vector_ranges(vectors)}) as writer:
+        for i, vector in enumerate(vectors):
+            writer.add(f"uuid-{i}", {}, {"v": vector})
+    np.testing.assert_allclose(read_vectors(path, "v")[1], vectors, atol=1e-6)
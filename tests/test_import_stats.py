@@ -0,0 +1,145 @@
+"""Counting, merging & publishing import statistics, and reconciling them with a (fake) cluster."""
+
+from types import SimpleNamespace
+
+import pytest
+from weaviate.classes.tenants import TenantActivityStatus
+
+import import_stats
+from helpers import CollectionName
+from import_stats import (
+    CollectionStats,
+    ScopeStats,
+    StatsStore,
+    failed_rows,
+    publish_stats,
+    range_stats_path,
+    sidecar_path,
+)
+
+
+def _scope(*texts, company="acme", created_at="2017-03-04T10:00:00Z") -> ScopeStats:
+    scope = ScopeStats()
+    for text in texts:
+        scope.add({"text": text, "company_author": company, "created_at": created_at})
+    return scope
+
+
+def test_add_counts_companies_months_and_text_lengths():
+    scope = _scope("a" * 10, "b" * 100)
+    scope.add({"text": None, "company_author": None, "created_at": None})
+
+    assert scope.objects == 3
+    assert scope.companies == {"acme": 2, "": 1}
+    assert scope.created_at_months == {"2017-03": 2}
+    assert dict(scope.text_length_histogram())["<=32"] == 2
+    assert dict(scope.text_length_histogram())["<=128"] == 1
+    assert (scope.text_length_total, scope.text_length_max) == (110, 100)
+    assert scope.mean_text_length == pytest.approx(110 / 3)
+    assert scope.top_companies(1) == {"acme": 2}
+
+
+def test_merge_and_round_trip():
+    scope = _scope("a" * 10)
+    scope.merge(_scope("b" * 5000, company="globex", created_at="2017-04-01"))
+
+    assert scope.objects == 2
+    assert scope.companies == {"acme": 1, "globex": 1}
+    assert scope.created_at_months == {"2017-03": 1, "2017-04": 1}
+    assert scope.text_lengths == {"<=32": 1, "<=8192": 1}
+    assert scope.text_length_max == 5000
+    assert ScopeStats.from_dict(scope.to_dict()) == scope
+
+
+def test_mean_text_length_uses_the_objects_the_histograms_counted():
+    scope = _scope("a" * 10, "a" * 30)
+    scope.objects, scope.histogram_objects = 1000, 2
+    assert scope.mean_text_length == 20
+
+
+def test_slabs_skip_failed_rows_and_ranges_merge_into_the_sidecar(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    uuids = ["uuid-0", "uuid-1", "uuid-2"]
+    skip = failed_rows(uuids, [SimpleNamespace(object_=SimpleNamespace(uuid="uuid-1"))])
+    assert skip == {1}
+
+    first = CollectionStats()
+    first.add_slab(
+        {"text": ["x", "yy", "zzz"], "company_author": ["acme", "acme", "globex"]},
+        tenants=["created-2017-01", "created-2017-01", "created-2017-02"],
+        skip=skip,
+    )
+    first.save(range_stats_path("state", "0-3"))
+    second = CollectionStats()
+    second.add_slab({"text": ["w"], "company_author": ["acme"]}, tenants=["created-2017-01"])
+    second.save(range_stats_path("state", "3-4"))
+
+    published = publish_stats("state", CollectionName.SUPPORTCHAT)
+
+    assert published.tenant_counts == {"created-2017-01": 2, "created-2017-02": 1}
+    loaded = CollectionStats.load(sidecar_path(CollectionName.SUPPORTCHAT))
+    assert loaded.scopes == published.scopes
+    assert loaded.scope("created-2017-01").companies == {"acme": 2}
+
+
+class FakeCollection:
+    def __init__(self, counts, statuses):
+        self.counts, self.statuses, self.tenant = counts, statuses, None
+        self.tenants = SimpleNamespace(
+            get=lambda: {name: SimpleNamespace(activity_status=s) for name, s in self.statuses.items()}
+        )
+        self.aggregate = SimpleNamespace(
+            over_all=lambda total_count: SimpleNamespace(total_count=self.counts[self.tenant])
+        )
+
+    def with_tenant(self, tenant):
+        if self.statuses[tenant] != TenantActivityStatus.ACTIVE:
+            raise RuntimeError(f"tenant {tenant} is not active")
+        part = FakeCollection(self.counts, self.statuses)
+        part.tenant = tenant
+        return part
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(import_stats, "get_top_companies", lambda collection, top_n: {"globex": 7})
+    stats = CollectionStats()
+    stats.scope("created-2017-01").merge(_scope("a" * 10, "a" * 30))
+    stats.scope("created-2017-02").merge(_scope("a"))
+    stats.save(sidecar_path(CollectionName.SUPPORTCHAT))
+
+    collection = FakeCollection(
+        counts={"created-2017-01": 2, "created-2017-02": 5},
+        statuses={"created-2017-01": TenantActivityStatus.ACTIVE, "created-2017-02": TenantActivityStatus.ACTIVE},
+    )
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection))
+    store = StatsStore(CollectionName.SUPPORTCHAT, pool=SimpleNamespace(get=lambda: client))
+    store.collection = collection
+    return store
+
+
+def test_reconcile_replaces_only_scopes_whose_count_differs(store):
+    assert store.reconcile("created-2017-01") is False
+
+    assert store.reconcile("created-2017-02") is True
+    scope = store.get("created-2017-02")
+    assert scope.objects == 5 and scope.companies == {"globex": 7}
+    assert scope.reconciled_at is not None
+    # The import's histograms are kept, and the mean is over the objects they counted
+    assert scope.histogram_objects == 1 and scope.mean_text_length == 1
+    assert store.reconciliations == 1
+
+
+def test_the_reconciler_skips_tenants_that_are_not_active(store, monkeypatch):
+    store.collection.statuses["created-2017-02"] = TenantActivityStatus.INACTIVE
+    store.collection.counts["created-2017-01"] = 3
+    store.get("created-2017-01"), store.get("created-2017-02")  # Watched by the app
+
+    windows = iter([False, True])  # Run one pass, then stop
+    monkeypatch.setattr(store._stop, "wait", lambda timeout: next(windows))
+    store._run()
+
+    assert store.last_error is None
+    assert store.get("created-2017-01").objects == 3
+    assert store.get("created-2017-02").objects == 1
@@ -0,0 +1,114 @@
+"""The "Any" fan-out of the company-partitioned layout, against fake partitions."""
+
+from datetime import datetime
+from types import SimpleNamespace
+import uuid
+
+import pytest
+from weaviate.collections.classes.internal import MetadataReturn, Object
+
+import helpers
+from helpers import CATCH_ALL_TENANT, CompanyPartitions
+
+
+def _hit(company, bm25=None, distance=None):
+    return Object(
+        uuid=uuid.uuid4(),
+        metadata=MetadataReturn(score=bm25, distance=distance),
+        properties={"company_author": company},
+        references=None,
+        vector={},
+        collection="SupportChat",
+    )
+
+
+class FakePartition:
+    """One tenant: its BM25 hits and its nearest neighbours, best first."""
+
+    def __init__(self, keyword, vector):
+        self.keyword = keyword
+        self.vector = vector
+        self.filters = []
+        self.query = SimpleNamespace(bm25=self.bm25, near_text=self.near, near_vector=self.near)
+
+    def bm25(self, query, filters, limit, return_metadata):
+        self.filters.append(filters)
+        return SimpleNamespace(objects=self.keyword[:limit])
+
+    def near(self, target_vector, filters, limit, return_metadata, **query):
+        self.filters.append(filters)
+        return SimpleNamespace(objects=self.vector[:limit])
+
+
+class FakeCollection:
+    name = "SupportChat"
+    tenant = None
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+
+    def with_tenant(self, tenant):
+        partition = self.partitions[tenant]
+        partition.name, partition.tenant = self.name, tenant
+        return partition
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    # "a-weak" sorts first but only has weak matches; "b-strong" has the relevant ones
+    weak = FakePartition(
+        keyword=[_hit("a", bm25=0.4), _hit("a", bm25=0.3)],
+        vector=[_hit("a", distance=0.7), _hit("a", distance=0.8)],
+    )
+    strong = FakePartition(
+        keyword=[_hit("b", bm25=6.0), _hit("b", bm25=5.0)],
+        vector=[_hit("b", distance=0.1), _hit("b", distance=0.2)],
+    )
+    monkeypatch.setattr(helpers, "embedding_cache", None)
+    monkeypatch.setattr(helpers, "tenant_access_hook", None)
+    return FakeCollection({"a-weak": weak, "b-strong": strong})
+
+
+@pytest.mark.parametrize("search_type", ["Hybrid", "Vector", "Keyword"])
+def test_merge_follows_relevance_not_tenant_order(collection, search_type):
+    response = helpers.fan_out_query(
+        collection,
+        {"a-weak": {}, "b-strong": {}},
+        lambda o: o.properties["company_author"],
+        "my order never arrived",
+        "Any",
+        2,
+        search_type,
+        use_cache=False,
+    )
+
+    assert [o.properties["company_author"] for o in response.objects] == ["b", "b"]
+    scores = [o.metadata.score for o in response.objects]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_hybrid_fuses_keyword_and_vector_hits_across_partitions(collection):
+    both = _hit("a", bm25=5.8, distance=0.12)
+    collection.partitions["a-weak"].keyword = [both]
+    collection.partitions["a-weak"].vector = [both]
+
+    response = helpers.fan_out_query(
+        collection, {"a-weak": {}, "b-strong": {}}, lambda o: "", "refund", "Any", 3, "Hybrid", use_cache=False
+    )
+
+    # Found by both searches, it outranks the other partition's hits, each found by only one
+    assert response.objects[0].uuid == both.uuid
+
+
+def test_partitioned_query_filters_every_partition_by_date(collection, monkeypatch):
+    collection.partitions[CATCH_ALL_TENANT] = FakePartition(keyword=[], vector=[])
+    monkeypatch.setattr(
+        helpers, "get_partitions", lambda c: CompanyPartitions(frozenset({"a-weak", "b-strong"}))
+    )
+
+    helpers.partitioned_query(
+        collection, "refund", "Any", 2, "Hybrid", use_cache=False, created_after=datetime(2017, 10, 1)
+    )
+
+    for partition in collection.partitions.values():
+        assert len(partition.filters) == 2 and all(f is not None for f in partition.filters)
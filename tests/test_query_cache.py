@@ -0,0 +1,107 @@
+"""LRU eviction, TTL expiry & invalidation on object-count changes of the query cache."""
+
+import pytest
+
+import query_cache
+from query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    return clock
+
+
+SCOPE = ("SupportChat", None)
+
+
+class Calls:
+    """A query that returns, and counts, how often it ran for each key."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def query(self, key):
+        def compute():
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return f"result {key}"
+
+        return compute
+
+
+def _get(cache, calls, key, version=100, scope=SCOPE):
+    return cache.get_or_compute(key, scope, calls.query(key), lambda: version)
+
+
+def test_hits_are_served_from_the_cache(clock):
+    cache, calls = QueryCache(), Calls()
+
+    assert _get(cache, calls, "a") == "result a"
+    assert _get(cache, calls, "a") == "result a"
+
+    assert calls.counts == {"a": 1}
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.hit_rate) == (1, 1, 0.5)
+
+
+def test_the_least_recently_used_entry_is_evicted(clock):
+    cache, calls = QueryCache(max_entries=2), Calls()
+    _get(cache, calls, "a")
+    _get(cache, calls, "b")
+    _get(cache, calls, "a")  # "b" is now the least recently used
+    _get(cache, calls, "c")
+
+    assert len(cache) == 2 and cache.stats.evictions == 1
+    _get(cache, calls, "a")
+    _get(cache, calls, "b")
+    assert calls.counts == {"a": 1, "b": 2, "c": 1}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache, calls = QueryCache(ttl_seconds=10), Calls()
+    _get(cache, calls, "a")
+
+    clock.now = 10
+    _get(cache, calls, "a")
+    assert calls.counts == {"a": 1}
+
+    clock.now = 10.5
+    _get(cache, calls, "a")
+    assert calls.counts == {"a": 2} and cache.stats.expirations == 1
+
+
+def test_a_changed_object_count_invalidates_the_scope(clock):
+    cache, calls = QueryCache(ttl_seconds=600, version_check_seconds=5), Calls()
+    other_scope = ("SupportChat", "created-2017-01")
+    _get(cache, calls, "a")
+    _get(cache, calls, "b", scope=other_scope)
+
+    # Not re-read before `version_check_seconds` have passed
+    clock.now = 5
+    _get(cache, calls, "a", version=101)
+    assert calls.counts["a"] == 1
+
+    clock.now = 6
+    _get(cache, calls, "a", version=101)
+    _get(cache, calls, "b", scope=other_scope)
+    assert calls.counts == {"a": 2, "b": 1}
+    assert cache.stats.invalidations == 1
+
+
+def test_invalidate_everything(clock):
+    cache, calls = QueryCache(), Calls()
+    _get(cache, calls, "a")
+    _get(cache, calls, "b", scope=("SupportChat", "created-2017-01"))
+
+    cache.invalidate()
+    assert len(cache) == 0 and cache.stats.invalidations == 2
+    _get(cache, calls, "a")
+    assert calls.counts["a"] == 2
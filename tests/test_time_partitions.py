@@ -0,0 +1,53 @@
+"""Which buckets `TimePartitions.prune` leaves to search, given their status and retention."""
+
+from datetime import datetime, timezone
+
+from weaviate.classes.tenants import TenantActivityStatus
+
+from time_partitions import (
+    UNDATED_TENANT,
+    TimePartitions,
+    clear_retention_cutoff,
+    load_retention_cutoff,
+    save_retention_cutoff,
+)
+
+
+ACTIVE, INACTIVE, OFFLOADED = TenantActivityStatus.ACTIVE, TenantActivityStatus.INACTIVE, TenantActivityStatus.OFFLOADED
+
+
+def _layout(retired_before=None):
+    return TimePartitions.from_tenants(
+        {
+            "created-2017-01": OFFLOADED,  # Retired by retention
+            "created-2017-02": INACTIVE,  # Idle
+            "created-2017-03": ACTIVE,
+            UNDATED_TENANT: ACTIVE,
+        },
+        retired_before,
+    )
+
+
+def test_prune_skips_inactive_buckets():
+    assert list(_layout().prune()) == ["created-2017-03", UNDATED_TENANT]
+
+
+def test_prune_skips_retired_buckets_even_if_they_can_be_activated():
+    layout = _layout(retired_before=datetime(2017, 2, 1, tzinfo=timezone.utc))
+    assert list(layout.prune(include_inactive=True)) == ["created-2017-02", "created-2017-03", UNDATED_TENANT]
+    assert layout.prune(datetime(2017, 2, 15), include_inactive=True) == {
+        "created-2017-02": {"created_after": datetime(2017, 2, 15, tzinfo=timezone.utc), "created_before": None},
+        "created-2017-03": {},
+    }
+
+
+def test_the_retention_cutoff_is_kept_until_the_collection_is_recreated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert load_retention_cutoff("SupportChat") is None
+
+    save_retention_cutoff("SupportChat", datetime(2017, 6, 1), "offload")
+    assert load_retention_cutoff("SupportChat") == datetime(2017, 6, 1, tzinfo=timezone.utc)
+
+    clear_retention_cutoff("SupportChat")
+    assert load_retention_cutoff("SupportChat") is None
+    clear_retention_cutoff("SupportChat")  # Nothing to clear
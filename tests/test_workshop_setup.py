@@ -0,0 +1,163 @@
+"""The resumable downloader, against a local HTTP server with Range support."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import os
+import re
+import threading
+
+import pytest
+
+import workshop_setup
+
+
+CHUNK_SIZE = 1024
+DATA = os.urandom(10 * CHUNK_SIZE + 100)
+
+
+class RangeServer(ThreadingHTTPServer):
+    """Serves `DATA` at any path; range requests starting at `fail_from` get a 500."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.fail_from = None
+        self.ranges = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/data.h5"
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.endswith(".sha256"):
+            self.send_error(404)
+            return
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match is None:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(DATA)))
+            self.end_headers()
+            self.wfile.write(DATA)
+            return
+
+        start, end = int(match[1]), min(int(match[2]), len(DATA) - 1)
+        with self.server.lock:
+            self.server.ranges.append(start)
+        if self.server.fail_from is not None and start >= self.server.fail_from:
+            self.send_error(500)
+            return
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(DATA[start : end + 1])
+
+
+@pytest.fixture
+def server():
+    server = RangeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    # The checksum manifests live next to the files, in ./data
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data"
+
+
+def test_interrupted_download_resumes_from_completed_chunks(server, data_dir):
+    target = data_dir / "data.h5"
+    server.fail_from = 6 * CHUNK_SIZE
+
+    with pytest.raises(Exception):
+        workshop_setup.download_file(server.url, target, connections=2, chunk_size=CHUNK_SIZE)
+    assert not target.exists()
+    assert target.with_suffix(".part.json").exists()
+
+    server.fail_from = None
+    server.ranges.clear()
+    workshop_setup.download_file(server.url, target, connections=2, chunk_size=CHUNK_SIZE)
+
+    assert target.read_bytes() == DATA
+    # The probe, then only the chunks that failed the first time
+    fetched = sorted(start for start in server.ranges if start > 0)
+    assert fetched == list(range(6 * CHUNK_SIZE, len(DATA), CHUNK_SIZE))
+    assert not target.with_suffix(".part").exists()
+    assert not target.with_suffix(".part.json").exists()
+    manifest = data_dir / workshop_setup.CHECKSUM_MANIFEST
+    assert workshop_setup.read_checksums(manifest)["data.h5"] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_changed_download_settings_restart_the_download(server, data_dir):
+    target = data_dir / "data.h5"
+    server.fail_from = 6 * CHUNK_SIZE
+    with pytest.raises(Exception):
+        workshop_setup.download_file(server.url, target, connections=1, chunk_size=CHUNK_SIZE)
+
+    # A different chunk size doesn't match the saved state, so nothing is reused
+    server.fail_from = None
+    server.ranges.clear()
+    workshop_setup.download_file(server.url, target, connections=1, chunk_size=2 * CHUNK_SIZE)
+
+    assert target.read_bytes() == DATA
+    assert sorted(s for s in server.ranges if s > 0) == list(range(2 * CHUNK_SIZE, len(DATA), 2 * CHUNK_SIZE))
+
+
+def test_converted_file_still_verifies(server, data_dir):
+    target = data_dir / "data.h5"
+    workshop_setup.download_file(server.url, target, connections=2, chunk_size=CHUNK_SIZE)
+    assert workshop_setup.verify_file(target)
+
+    target.write_bytes(b"converted" + DATA)  # What convert_hdf5.py does, in effect
+    assert not workshop_setup.verify_file(target)
+
+    workshop_setup.record_local_checksum(target)
+    assert workshop_setup.verify_file(target)
+
+
+def test_manifests_are_found_from_any_directory(server, data_dir, tmp_path, monkeypatch):
+    target = data_dir / "data.h5"
+    workshop_setup.download_file(server.url, target, connections=2, chunk_size=CHUNK_SIZE)
+
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    target.write_bytes(b"converted" + DATA)
+    assert not workshop_setup.verify_file(target)
+
+    workshop_setup.record_local_checksum(target)
+    assert workshop_setup.verify_file(target)
+    assert not (elsewhere / "data").exists()
+
+
+def test_link_or_copy_without_fcntl(data_dir, monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_fcntl(name, *args, **kwargs):
+        if name == "fcntl":
+            raise ImportError("No module named 'fcntl'")
+        return real_import(name, *args, **kwargs)
+
+    src = data_dir / "src.h5"
+    src.write_bytes(DATA)
+    monkeypatch.setattr(builtins, "__import__", no_fcntl)
+    method = workshop_setup.link_or_copy(src, data_dir / "dst.h5")
+
+    assert method in ("hardlink", "copy")
+    assert (data_dir / "dst.h5").read_bytes() == DATA
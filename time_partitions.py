@@ -0,0 +1,335 @@
+"""Time-partitioned layout: one tenant per month or quarter of `created_at`.
+
+A date-range filter over one big collection still searches its whole index, and old
+data can only be removed object by object. Here, every object is stored in the tenant
+of its `created_at` bucket, e.g. `created-2017-10` (month) or `created-2017-Q4`
+(quarter); objects without a date go to `created-undated`. Import with
+`python 2_add_data_with_vectors.py --time-partitioned month`.
+
+`time_partitioned_query` skips the buckets outside the requested date range. Buckets
+entirely inside it are searched without a date filter, and only the partly covered
+ones at the edges are filtered. The buckets are searched in parallel and the top
+results merged by relevance. Retention drops (or offloads) whole buckets, and records
+its cutoff in `retention/<collection>.json` so that searches leave retired buckets alone
+(0_reset_cluster.py and 1_create_collection.py clear it with the collection):
+
+    python time_partitions.py buckets
+    python time_partitions.py retention --keep-months 12 --dry-run
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Literal, Mapping, Optional, Tuple
+import json
+import re
+import time
+
+import click
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+from weaviate.collections import Collection
+
+import helpers
+from helpers import CollectionName, connect_to_weaviate, fan_out_query
+
+
+Granularity = Literal["month", "quarter"]
+
+TENANT_PREFIX = "created-"
+UNDATED_TENANT = "created-undated"
+BUCKET_PATTERN = re.compile(r"^created-(\d{4})-(?:(\d{2})|Q([1-4]))$")
+RETENTION_DIR = "retention"
+
+
+def _utc(value: datetime) -> datetime:
+    # Dates without a timezone are taken to be UTC, like the dataset's
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _parse_created_at(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return _utc(value)
+    if isinstance(value, str) and value:
+        return _utc(datetime.fromisoformat(value))  # ISO format, as stored in the export files
+    return None
+
+
+def bucket_name(created_at, granularity: Granularity = "month") -> str:
+    """The tenant of an object, from its `created_at` (a datetime or an ISO string)."""
+    dt = _parse_created_at(created_at)
+    if dt is None:
+        return UNDATED_TENANT
+    dt = dt.astimezone(timezone.utc)
+    if granularity == "quarter":
+        return f"{TENANT_PREFIX}{dt.year}-Q{(dt.month - 1) // 3 + 1}"
+    return f"{TENANT_PREFIX}{dt.year}-{dt.month:02d}"
+
+
+def tenant_by_month(created_at) -> str:
+    return bucket_name(created_at, "month")
+
+
+def tenant_by_quarter(created_at) -> str:
+    return bucket_name(created_at, "quarter")
+
+
+BUCKET_FUNCTIONS = {"month": tenant_by_month, "quarter": tenant_by_quarter}
+
+
+@dataclass(frozen=True)
+class TimeBucket:
+    """One partition, holding the objects created in `[start, end)`."""
+
+    tenant: str
+    start: datetime
+    end: datetime
+
+    @classmethod
+    def parse(cls, tenant: str) -> Optional["TimeBucket"]:
+        match = BUCKET_PATTERN.match(tenant)
+        if match is None:
+            return None
+        year, month, quarter = match.groups()
+        first_month = int(month) if month else 3 * int(quarter) - 2
+        months = 1 if month else 3
+        start = datetime(int(year), first_month, 1, tzinfo=timezone.utc)
+        end_month = first_month + months
+        end = datetime(int(year) + (end_month - 1) // 12, (end_month - 1) % 12 + 1, 1, tzinfo=timezone.utc)
+        return cls(tenant, start, end)
+
+    def overlaps(self, after: Optional[datetime], before: Optional[datetime]) -> bool:
+        return (before is None or self.start < before) and (after is None or self.end > after)
+
+    def within(self, after: Optional[datetime], before: Optional[datetime]) -> bool:
+        return (after is None or after <= self.start) and (before is None or self.end <= before)
+
+
+@dataclass(frozen=True)
+class TimePartitions:
+    buckets: Tuple[TimeBucket, ...]
+    undated: bool = False
+    # The activity status of every bucket, and the cutoff of the last retention
+    statuses: Mapping[str, TenantActivityStatus] = field(default_factory=dict)
+    retired_before: Optional[datetime] = None
+
+    @classmethod
+    def from_tenants(
+        cls, tenants: Mapping[str, TenantActivityStatus], retired_before: Optional[datetime] = None
+    ) -> Optional["TimePartitions"]:
+        """The layout of a collection's tenants (name -> status), or None if they aren't all time buckets."""
+        buckets = [TimeBucket.parse(t) for t in tenants if t != UNDATED_TENANT]
+        if not tenants or any(b is None for b in buckets):
+            return None
+        return cls(
+            tuple(sorted(buckets, key=lambda b: b.start)), UNDATED_TENANT in tenants, dict(tenants), retired_before
+        )
+
+    def active(self, tenant: str) -> bool:
+        return self.statuses.get(tenant, TenantActivityStatus.ACTIVE) == TenantActivityStatus.ACTIVE
+
+    def retired(self, bucket: TimeBucket) -> bool:
+        return self.retired_before is not None and bucket.end <= self.retired_before
+
+    def tenant_for(self, created_at) -> str:
+        dt = _parse_created_at(created_at)
+        if dt is not None:
+            for bucket in self.buckets:
+                if bucket.start <= dt < bucket.end:
+                    return bucket.tenant
+        return UNDATED_TENANT
+
+    def prune(
+        self, after: Optional[datetime] = None, before: Optional[datetime] = None, include_inactive: bool = False
+    ) -> Dict[str, dict]:
+        """The buckets to search for `[after, before)`, with the date bounds each one still needs.
+
+        Buckets retired by `apply_retention` are skipped, and so are the other inactive ones
+        unless `include_inactive` (i.e. something activates tenants on access).
+        """
+        after = _utc(after) if after is not None else None
+        before = _utc(before) if before is not None else None
+        searches = {}
+        for bucket in self.buckets:
+            if not bucket.overlaps(after, before) or self.retired(bucket):
+                continue
+            if not include_inactive and not self.active(bucket.tenant):
+                continue
+            if bucket.within(after, before):
+                searches[bucket.tenant] = {}
+            else:
+                searches[bucket.tenant] = {"created_after": after, "created_before": before}
+        if self.undated and after is None and before is None and (include_inactive or self.active(UNDATED_TENANT)):
+            searches[UNDATED_TENANT] = {}
+        return searches
+
+
+# Keyed by collection name; None if the collection isn't time-partitioned
+_layout_cache: Dict[str, Tuple[float, Optional[TimePartitions]]] = {}
+
+
+def retention_path(collection_name: str = CollectionName.SUPPORTCHAT, retention_dir: str = RETENTION_DIR) -> Path:
+    return Path(retention_dir) / f"{CollectionName(collection_name).value}.json"
+
+
+def load_retention_cutoff(collection_name: str = CollectionName.SUPPORTCHAT) -> Optional[datetime]:
+    """The cutoff of the last retention applied to the collection, if any."""
+    try:
+        with open(retention_path(collection_name)) as f:
+            return datetime.fromisoformat(json.load(f)["cutoff"])
+    except FileNotFoundError:
+        return None
+
+
+def save_retention_cutoff(collection_name: str, cutoff: datetime, action: str):
+    path = retention_path(collection_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"cutoff": _utc(cutoff).isoformat(), "action": action}))
+
+
+def clear_retention_cutoff(collection_name: str = CollectionName.SUPPORTCHAT):
+    """Forget the collection's retention, e.g. when it's deleted or created again."""
+    retention_path(collection_name).unlink(missing_ok=True)
+    _layout_cache.pop(CollectionName(collection_name).value, None)
+
+
+def get_time_partitions(collection: Collection, ttl_seconds: float = 60.0) -> Optional[TimePartitions]:
+    cached = _layout_cache.get(collection.name)
+    if cached is not None and time.monotonic() - cached[0] < ttl_seconds:
+        return cached[1]
+
+    partitions = None
+    if collection.config.get().multi_tenancy_config.enabled:
+        statuses = {name: t.activity_status for name, t in collection.tenants.get().items()}
+        partitions = TimePartitions.from_tenants(statuses, load_retention_cutoff(collection.name))
+    _layout_cache[collection.name] = (time.monotonic(), partitions)
+    return partitions
+
+
+def time_partitioned_query(
+    collection: Collection,
+    query: str,
+    company_filter: str,
+    limit: int,
+    search_type: Literal["Hybrid", "Vector", "Keyword"],
+    rag_query: Optional[str] = None,
+    use_cache: bool = True,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    """`weaviate_query` over the buckets that overlap `[created_after, created_before)`, via `fan_out_query`.
+
+    Inactive buckets are only searched if `helpers.tenant_access_hook` can activate them.
+    """
+    partitions = get_time_partitions(collection)
+    if partitions is None:
+        raise ValueError(f"{collection.name} is not time-partitioned")
+    return fan_out_query(
+        collection,
+        partitions.prune(created_after, created_before, include_inactive=helpers.tenant_access_hook is not None),
+        lambda o: partitions.tenant_for(o.properties["created_at"]),
+        query,
+        company_filter,
+        limit,
+        search_type,
+        rag_query,
+        use_cache,
+    )
+
+
+def expired_buckets(partitions: TimePartitions, cutoff: datetime) -> List[TimeBucket]:
+    """The buckets that only hold objects created before `cutoff`."""
+    return [b for b in partitions.buckets if b.end <= _utc(cutoff)]
+
+
+def apply_retention(
+    collection: Collection, cutoff: datetime, action: Literal["drop", "offload", "deactivate"] = "drop"
+) -> List[TimeBucket]:
+    """Drop (or offload, or deactivate) every bucket older than `cutoff`, as a whole.
+
+    The cutoff is recorded, so that searches skip these buckets even when tenants are
+    otherwise activated on access.
+    """
+    partitions = get_time_partitions(collection, ttl_seconds=0)
+    if partitions is None:
+        raise ValueError(f"{collection.name} is not time-partitioned")
+    expired = expired_buckets(partitions, cutoff)
+    if not expired:
+        return expired
+
+    if action == "drop":
+        collection.tenants.remove([b.tenant for b in expired])
+    else:
+        status = TenantActivityStatus.OFFLOADED if action == "offload" else TenantActivityStatus.INACTIVE
+        collection.tenants.update([Tenant(name=b.tenant, activity_status=status) for b in expired])
+    save_retention_cutoff(collection.name, cutoff, action)
+    _layout_cache.pop(collection.name, None)
+    return expired
+
+
+def _months_ago(months: int) -> datetime:
+    now = datetime.now(timezone.utc)
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+@click.group()
+def cli():
+    """Inspect the time-partitioned layout and apply retention."""
+
+
+@cli.command()
+def buckets():
+    """List the buckets, with their activity status and object counts."""
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        partitions = get_time_partitions(collection, ttl_seconds=0)
+        if partitions is None:
+            raise click.ClickException(f"{CollectionName.SUPPORTCHAT.value} is not time-partitioned")
+        for bucket in partitions.buckets:
+            _print_bucket(collection, partitions, bucket.tenant, "retired" if partitions.retired(bucket) else "")
+        if partitions.undated:
+            _print_bucket(collection, partitions, UNDATED_TENANT)
+
+
+def _print_bucket(collection: Collection, partitions: TimePartitions, name: str, note: str = ""):
+    status = partitions.statuses[name]
+    if status == TenantActivityStatus.ACTIVE:
+        count = collection.with_tenant(name).aggregate.over_all(total_count=True).total_count
+    else:
+        count = "-"
+    print(f"{name:20} {status.value:12} {count!s:10} {note}".rstrip())
+
+
+@cli.command()
+@click.option("--keep-months", type=int, default=None, help="Keep the buckets of the last N months.")
+@click.option("--before", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Or: the cutoff date.")
+@click.option(
+    "--action",
+    type=click.Choice(["drop", "offload", "deactivate"]),
+    default="drop",
+    show_default=True,
+    help="Offloading needs an offload module, e.g. offload-s3.",
+)
+@click.option("--dry-run", is_flag=True, help="Only list the buckets that would be affected.")
+def retention(keep_months, before, action, dry_run):
+    """Drop, offload or deactivate whole buckets older than the cutoff."""
+    if (keep_months is None) == (before is None):
+        raise click.UsageError("Give either --keep-months or --before.")
+    cutoff = _utc(before) if before is not None else _months_ago(keep_months)
+
+    with connect_to_weaviate() as client:
+        collection = client.collections.get(CollectionName.SUPPORTCHAT)
+        if dry_run:
+            partitions = get_time_partitions(collection, ttl_seconds=0)
+            if partitions is None:
+                raise click.ClickException(f"{CollectionName.SUPPORTCHAT.value} is not time-partitioned")
+            expired = expired_buckets(partitions, cutoff)
+        else:
+            expired = apply_retention(collection, cutoff, action)
+
+    verb = f"Would {action}" if dry_run else {"drop": "Dropped", "offload": "Offloaded", "deactivate": "Deactivated"}[action]
+    print(f"{verb} {len(expired)} buckets before {cutoff.date()}: {', '.join(b.tenant for b in expired) or '-'}")
+
+
+if __name__ == "__main__":
+    cli()
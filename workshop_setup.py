@@ -1,16 +1,36 @@
 import os
+import re
+import json
 import click
+import hashlib
 import requests
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 
 
+# Override to download from a mirror, or a local server for testing
+DATA_BASE_URL = os.environ.get(
+    "WORKSHOP_DATA_URL", "https://weaviate-workshops.s3.eu-west-2.amazonaws.com/odsc-europe-2024"
+)
+# Kept next to the files they describe, e.g. data/checksums.sha256
+CHECKSUM_MANIFEST = "checksums.sha256"
+# Checksums of files rewritten locally (e.g. by convert_hdf5.py), accepted as intact
+LOCAL_CHECKSUM_MANIFEST = "checksums.local.sha256"
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes per range request
+READ_SIZE = 1024 * 1024
+CHUNK_RETRIES = 3
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, XFS, ...)
+
+
 @click.command()
 @click.option("--provider", default="cohere", help="Which model provider to use.")
 @click.option("--dataset-size", default="100000", help="Size of the dataset to use.")
-@click.option("--use-cache", is_flag=True, default=True, help="Use cached files if available.")
-def setup(provider, dataset_size, use_cache):
+@click.option("--use-cache/--no-use-cache", default=True, help="Use cached files if available (and intact).")
+@click.option("--connections", default=4, show_default=True, help="Parallel connections for the download.")
+def setup(provider, dataset_size, use_cache, connections):
     """Set up collection with the specified provider configuration."""
     available_dataset_sizes = ["10000", "50000", "100000", "200000"]
     available_providers = ["ollama", "openai", "cohere"]
@@ -26,7 +46,7 @@ def setup(provider, dataset_size, use_cache):
         return
 
     # Download dataset
-    download_dataset(provider, dataset_size, use_cache)
+    download_dataset(provider, dataset_size, use_cache, connections)
 
     # Update configurations in both files
     update_configurations(provider)
@@ -35,7 +55,7 @@ def setup(provider, dataset_size, use_cache):
     os.system("python 0_reset_cluster.py")
 
 
-def download_dataset(provider, dataset_size, use_cache):
+def download_dataset(provider, dataset_size, use_cache, connections=4):
     """Download the dataset for the specified provider."""
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
@@ -54,18 +74,19 @@ def download_dataset(provider, dataset_size, use_cache):
 
     dl_filename = f"twitter_customer_support_{provider_suffixes[provider]}_{dataset_size}.h5"
     out_filename = "twitter_customer_support.h5"
+    url = f"{DATA_BASE_URL}/twitter_customer_support_weaviate_export_{dataset_size}_{url_suffixes[provider]}.h5"
 
-    if (data_dir / dl_filename).exists() and use_cache:
+    if (data_dir / dl_filename).exists() and use_cache and verify_file(data_dir / dl_filename):
         print(f"Using cached file {dl_filename}...")
     else:
         if use_cache:
-            print(f"No cached file {dl_filename} found.")
-        url = f"https://weaviate-workshops.s3.eu-west-2.amazonaws.com/odsc-europe-2024/twitter_customer_support_weaviate_export_{dataset_size}_{url_suffixes[provider]}.h5"
-        download_file(url, data_dir / dl_filename)
+            print(f"No intact cached file {dl_filename} found.")
+        download_file(url, data_dir / dl_filename, connections=connections)
 
-    # Copy to standardized filename
+    # Link to the standardized filename, rather than copying hundreds of MB
     if dl_filename != out_filename:
-        shutil.copy(data_dir / dl_filename, data_dir / out_filename)
+        method = link_or_copy(data_dir / dl_filename, data_dir / out_filename)
+        print(f"Using {dl_filename} as {out_filename} ({method})")
 
 
 def update_configurations(selected_provider):
@@ -128,8 +149,8 @@ def update_import_file_path(file_path):
     modified_lines = []
     for line in lines:
         if 'import_from_hdf5("data/twitter_customer_support' in line:
-            # Use the standardized filename
-            new_line = '    import_from_hdf5("data/twitter_customer_support.h5")\n'
+            # Use the standardized filename, keeping any other arguments
+            new_line = re.sub(r'"data/twitter_customer_support[^"]*"', '"data/twitter_customer_support.h5"', line)
             modified_lines.append(new_line)
         else:
             modified_lines.append(line)
@@ -141,27 +162,223 @@ def update_import_file_path(file_path):
     print(f"Updated {file_path} with standardized file path")
 
 
-def download_file(url, filepath):
-    """Download a file with progress bar."""
+def sha256_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while block := f.read(READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def checksum_manifests(filepath):
+    """The (download, local) checksum manifests of a file, in its directory."""
+    directory = Path(filepath).parent
+    return directory / CHECKSUM_MANIFEST, directory / LOCAL_CHECKSUM_MANIFEST
+
+
+def read_checksums(manifest):
+    """`sha256sum`-style manifest: `<hex digest>  <filename>` per line."""
+    if not Path(manifest).exists():
+        return {}
+    checksums = {}
+    for line in Path(manifest).read_text().splitlines():
+        if line.strip():
+            digest, name = line.split(maxsplit=1)
+            checksums[name.lstrip("*")] = digest
+    return checksums
+
+
+def record_checksum(filename, digest, manifest):
+    checksums = read_checksums(manifest)
+    checksums[filename] = digest
+    Path(manifest).parent.mkdir(parents=True, exist_ok=True)
+    Path(manifest).write_text("".join(f"{d}  {n}\n" for n, d in sorted(checksums.items())))
+
+
+def expected_checksum(url, filepath, session=None):
+    """The file's SHA-256 from the local manifest, or else from a `<url>.sha256` file next to it."""
+    checksums = read_checksums(checksum_manifests(filepath)[0])
+    if Path(filepath).name in checksums:
+        return checksums[Path(filepath).name]
+    try:
+        response = (session or requests).get(url + ".sha256", timeout=10)
+        if response.status_code == 200 and response.text.strip():
+            return response.text.split()[0].lower()
+    except requests.RequestException:
+        pass
+    return None
+
+
+def verify_file(filepath):
+    """Check a file against the checksum manifests. Files without an entry are trusted.
+
+    Checksums are recorded on first download (unless the server publishes them), so they
+    protect against corrupt or truncated files, not against a tampered first download.
+    A file converted in place matches the checksum `convert_hdf5.py` recorded for it.
+    """
+    name = Path(filepath).name
+    manifest, local_manifest = checksum_manifests(filepath)
+    expected = read_checksums(manifest).get(name)
+    if expected is None:
+        return True
+    print(f"Verifying {name}...")
+    return sha256_file(filepath) in (expected, read_checksums(local_manifest).get(name))
+
+
+def record_local_checksum(filepath):
+    """Accept a downloaded file's new contents after it was rewritten locally, e.g. converted."""
+    filepath = Path(filepath)
+    manifest, local_manifest = checksum_manifests(filepath)
+    if filepath.name in read_checksums(manifest):
+        record_checksum(filepath.name, sha256_file(filepath), local_manifest)
+
+
+def link_or_copy(src, dst):
+    """Make `dst` a copy of `src`: a copy-on-write clone if possible, else a hardlink, else a copy.
+
+    Scripts that rewrite the dataset (e.g. `convert_hdf5.py`) replace the file rather than
+    writing into it, so a hardlinked cache file is never modified through `dst`.
+    """
+    src, dst = Path(src), Path(dst)
+    if dst.exists() and os.path.samefile(src, dst):
+        return "already linked"
+    tmp = dst.with_suffix(".linking")
+    tmp.unlink(missing_ok=True)
+    try:
+        import fcntl  # Not available on Windows
+
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        method = "reflink"
+    except (ImportError, OSError):
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            shutil.copyfile(src, tmp)
+            method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+def _probe(url, session):
+    """(size, supports_ranges, etag) of a remote file."""
+    response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=30)
+    response.raise_for_status()
+    response.close()
+    etag = response.headers.get("ETag")
+    if response.status_code == 206 and "/" in response.headers.get("Content-Range", ""):
+        return int(response.headers["Content-Range"].rsplit("/", 1)[1]), True, etag
+    return int(response.headers.get("content-length", 0)), False, etag
+
+
+def _download_single_stream(url, temp_filepath, session, progress_bar):
+    response = session.get(url, stream=True, timeout=30)
+    response.raise_for_status()
+    with open(temp_filepath, "wb") as file:
+        for data in response.iter_content(chunk_size=READ_SIZE):
+            progress_bar.update(file.write(data))
+
+
+def _download_ranges(url, temp_filepath, state_filepath, size, etag, connections, chunk_size, progress_bar):
+    """Fetch `size` bytes in `chunk_size` ranges over `connections` threads, resuming from the state file."""
+    chunks = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+    state = {"url": url, "size": size, "etag": etag, "chunk_size": chunk_size, "done": []}
+    if temp_filepath.exists() and state_filepath.exists():
+        saved = json.loads(state_filepath.read_text())
+        if all(saved.get(k) == state[k] for k in ("url", "size", "etag", "chunk_size")):
+            state["done"] = saved["done"]
+    if not state["done"]:
+        with open(temp_filepath, "wb") as file:
+            file.truncate(size)
+
+    done = set(state["done"])
+    progress_bar.update(sum(end - start + 1 for i, (start, end) in enumerate(chunks) if i in done))
+    if done:
+        print(f"Resuming: {len(done)} of {len(chunks)} chunks already downloaded")
+
+    lock = threading.Lock()
+    local = threading.local()
+
+    def fetch(index):
+        start, end = chunks[index]
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        for attempt in range(CHUNK_RETRIES):
+            written = 0
+            try:
+                response = local.session.get(
+                    url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=30
+                )
+                if response.status_code != 206:
+                    raise requests.HTTPError(f"Expected 206 for a range request, got {response.status_code}")
+                with open(temp_filepath, "r+b") as file:
+                    file.seek(start)
+                    for data in response.iter_content(chunk_size=READ_SIZE):
+                        written += file.write(data)
+                        progress_bar.update(len(data))
+                if written != end - start + 1:
+                    raise IOError(f"Short read for bytes {start}-{end}: {written} bytes")
+                break
+            except (requests.RequestException, IOError):
+                progress_bar.update(-written)
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+
+        with lock:
+            state["done"].append(index)
+            tmp = state_filepath.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state))
+            os.replace(tmp, state_filepath)
+
+    todo = [i for i in range(len(chunks)) if i not in done]
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        list(executor.map(fetch, todo))
+
+
+def download_file(url, filepath, connections=4, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Download a file with progress bar, over parallel range requests where the server allows.
+
+    Interrupted downloads resume from the completed chunks of the `.part` file. The result
+    is checked against the expected size and SHA-256 (see `expected_checksum`); files
+    without a known checksum have theirs recorded in the manifest for later runs.
+    """
+    filepath = Path(filepath)
     temp_filepath = filepath.with_suffix(".part")
+    state_filepath = filepath.with_suffix(".part.json")
+    session = requests.Session()
 
     print(f"Downloading {url}...")
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    total_size = int(response.headers.get("content-length", 0))
+    size, supports_ranges, etag = _probe(url, session)
 
-    with open(temp_filepath, "wb") as file, tqdm(
+    with tqdm(
         desc=filepath.name,
-        total=total_size,
+        total=size,
         unit="iB",
         unit_scale=True,
         unit_divisor=1024,
     ) as progress_bar:
-        for data in response.iter_content(chunk_size=1024):
-            size = file.write(data)
-            progress_bar.update(size)
+        if supports_ranges and size > 0:
+            _download_ranges(url, temp_filepath, state_filepath, size, etag, connections, chunk_size, progress_bar)
+        else:
+            _download_single_stream(url, temp_filepath, session, progress_bar)
+
+    actual_size = temp_filepath.stat().st_size
+    if size and actual_size != size:
+        raise IOError(f"Downloaded {actual_size} bytes of {url}, expected {size}")
+
+    digest = sha256_file(temp_filepath)
+    expected = expected_checksum(url, filepath, session)
+    if expected is not None and digest != expected:
+        temp_filepath.unlink()
+        state_filepath.unlink(missing_ok=True)
+        raise IOError(f"Checksum mismatch for {url}: got {digest}, expected {expected}")
 
     temp_filepath.rename(filepath)
+    state_filepath.unlink(missing_ok=True)
+    record_checksum(filepath.name, digest, checksum_manifests(filepath)[0])
     print(f"File downloaded to {filepath}")
 
 